@@ -6,16 +6,39 @@ und speichert die gefundenen Daten in einer MySQL-Datenbank.
 """
 
 import os
-import re
+import json
 import sys
+import time
+import atexit
+import ctypes
+import ctypes.util
+import select
+import struct
+import sqlite3
+import threading
 import logging
+import argparse
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
 from dotenv import load_dotenv
-from tqdm import tqdm
 from datetime import datetime
-from pathlib import Path
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pymediainfo import MediaInfo
+from extraction_cache import ExtractionCache, EXTRACTION_CACHE_PATH
+from media_headers import parse_media_headers, SUPPORTED_EXTENSIONS as HEADER_EXTENSIONS
+from ingest_pipeline import run_pipeline, interleave
+from device_lanes import DeviceLanes, DirectoryDevices, DEVICE_READERS, format_device
+from scan_leases import LeaseManager
+from run_metrics import METRICS, format_bytes
+from run_estimate import RunEstimate, log_projection, format_duration
+from io_budget import IOBudget, ThrottledReader, MB
+from refresh_scheduler import (RefreshScheduler, MISSING_FIELDS_CONDITION, TIER_NAMES as REFRESH_TIERS,
+                               parse_position as parse_refresh_position)
+from schema_migrations import migrate as migrate_schema
+from content_fingerprint import content_fingerprint
+from filename_parser import parse_episode_name, parse_season_name, common_title_prefix
 
 # Laden der Umgebungsvariablen
 load_dotenv()
@@ -25,8 +48,42 @@ DB_HOST = os.getenv('DB_HOST', '192.168.178.9')
 DB_USER = os.getenv('DB_USER', 'aniworld')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'aniworld')
 DB_NAME = os.getenv('DB_NAME', 'animeloads')
+# Ein oder mehrere Medienverzeichnisse, getrennt durch ':' (z.B. /mnt/platte1:/mnt/platte2)
 MEDIA_PATH = os.getenv('MEDIA_PATH', '/mnt/mediathek')
 MAX_RECURSION_DEPTH = int(os.getenv('MAX_RECURSION_DEPTH', '5'))
+# Lesebudget der Metadatenextraktion, damit Mediaplayer am selben NAS nicht ruckeln (0 = unbegrenzt)
+IO_BUDGET_MBPS = float(os.getenv('IO_BUDGET_MBPS', '0'))
+IO_MAX_OPEN_FILES = int(os.getenv('IO_MAX_OPEN_FILES', '0'))
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '500'))
+DB_COMMIT_INTERVAL = float(os.getenv('DB_COMMIT_INTERVAL', '5'))
+PARSE_MODE = os.getenv('PARSE_MODE', 'full')
+# MediaInfo-ParseSpeed je Modus (0 = nur Header, 1 = gesamte Datei)
+PARSE_SPEED = {
+    'fast': float(os.getenv('FAST_PARSE_SPEED', '0')),
+    'full': float(os.getenv('FULL_PARSE_SPEED', '0.5')),
+}
+FAST_READ_LIMIT_MB = float(os.getenv('FAST_READ_LIMIT_MB', '16'))
+# Matroska/MP4-Kopfdaten ohne MediaInfo lesen (0 = immer MediaInfo verwenden)
+NATIVE_HEADERS = os.getenv('NATIVE_HEADERS', '1') == '1'
+WATCH_DEBOUNCE_SECONDS = float(os.getenv('WATCH_DEBOUNCE_SECONDS', '30'))
+WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', '60'))
+# Abgleich nach dem Scan: Episoden verschwundener Dateien löschen (0 = aus)
+RECONCILE = os.getenv('RECONCILE', '1') == '1'
+# Höchstens dieser Anteil der Episoden darf in einem Lauf gelöscht werden (Schutz vor nicht eingehängten Freigaben)
+RECONCILE_MAX_DELETE_RATIO = float(os.getenv('RECONCILE_MAX_DELETE_RATIO', '0.5'))
+RECONCILE_CHUNK_SIZE = 1000
+# Inhalts-Fingerabdruck beim Scan berechnen: Verschiebe- und Duplikaterkennung (0 = aus)
+CONTENT_FINGERPRINT = os.getenv('CONTENT_FINGERPRINT', '1') == '1'
+# Episoden je Seite bei der Metadatenaktualisierung (Keyset-Paginierung)
+UPDATE_PAGE_SIZE = int(os.getenv('UPDATE_PAGE_SIZE', '1000'))
+# Höchstzahl der Episoden je Metadatenaktualisierung, die wichtigsten zuerst (0 = unbegrenzt)
+UPDATE_BUDGET = int(os.getenv('UPDATE_BUDGET', '0'))
+# Fortschrittsjournal für --resume
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archiver_checkpoint.json'))
+# JSON-Laufbericht mit Laufzeiten je Stufe (leer = keiner)
+RUN_REPORT_PATH = os.getenv('RUN_REPORT_PATH', '')
 
 # Logging konfigurieren
 log_format = '%(asctime)s - %(levelname)s - %(message)s'
@@ -39,175 +96,108 @@ STATS = {
     'animes': 0,
     'seasons': 0,
     'episodes': 0,
-    'skipped_files': 0
+    'skipped_files': 0,
+    'unchanged_files': 0,
+    'changed_files': 0,
+    'removed_files': 0,
+    'moved_files': 0,
+    'fingerprinted_files': 0
+}
+
+# Zähler des Verzeichnisdurchlaufs (stat-Aufrufe gegenüber dem früheren Path.iterdir-Scan)
+WALK_STATS = {
+    'entries': 0,
+    'video_files': 0,
+    'stat_calls': 0
 }
 
+# Ergebnis des Abgleichs einer Datei mit den bereits archivierten Episoden
+FILE_NEW = 'new'
+FILE_CHANGED = 'changed'
+FILE_UNCHANGED = 'unchanged'
+FILE_MTIME_MISSING = 'mtime_missing'
+
+# Version von extract_media_info; bei Änderungen an der Extraktion erhöhen,
+# damit zwischengespeicherte Ergebnisse nicht mehr verwendet werden
+# (2: Analysemodus fast/full mit metadata_mode, eigener Header-Parser für Matroska/MP4)
+EXTRACTOR_VERSION = 2
+
+# Token-Bucket und Dateilimit für alle Lesezugriffe der Extraktion (neu angelegt, wenn main die Werte ändert)
+IO_BUDGET = IOBudget(IO_BUDGET_MBPS * MB, IO_MAX_OPEN_FILES)
+
+# Extraktions-Cache, wird beim ersten Zugriff geöffnet
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+# Nur lesend geöffneter Cache für --estimate (False = noch nicht geöffnet)
+_estimate_cache = False
+
+# Ende des Zeitbudgets (time.monotonic), gesetzt über --max-duration
+RUN_DEADLINE = None
+
+def media_roots():
+    """
+    Die Medienverzeichnisse aus MEDIA_PATH (durch os.pathsep getrennt), ohne Duplikate.
+    """
+    roots = []
+    for root in MEDIA_PATH.split(os.pathsep):
+        root = root.rstrip(os.sep) or root
+        if root and root not in roots:
+            roots.append(root)
+    return roots
+
+def containing_root(path):
+    """
+    Das Medienverzeichnis, in dem path liegt (oder das path selbst ist), sonst None.
+    """
+    for root in media_roots():
+        if path == root or in_directories(path, [root]):
+            return root
+    return None
+
+def budget_exhausted():
+    """
+    Prüft, ob das Zeitbudget des Laufs (--max-duration) aufgebraucht ist.
+    """
+    return RUN_DEADLINE is not None and time.monotonic() >= RUN_DEADLINE
+
+def parse_duration(value):
+    """
+    Wandelt eine Zeitangabe wie '90', '45m' oder '2h' (ohne Einheit: Minuten) in Sekunden um.
+    """
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    value = value.strip().lower()
+    try:
+        if value and value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value) * 60
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültige Dauer: {value} (z.B. 90m oder 2h)")
+
 def setup_database():
     """
-    Erstellt die benötigten Tabellen in der Datenbank, falls sie nicht existieren,
-    oder aktualisiert bestehende Tabellen um neue Spalten hinzuzufügen.
+    Verbindet sich mit der Datenbank (legt sie bei Bedarf an) und bringt das Schema über
+    die versionierten Migrationen aus schema_migrations.py auf den neuesten Stand.
+    Ist das Schema aktuell, kostet das eine einzige Abfrage.
     """
     try:
-        connection = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cursor = connection.cursor(buffered=True)
-        
-        # Datenbank erstellen, falls sie nicht existiert
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-        cursor.execute(f"USE {DB_NAME}")
-        
-        # Tabellen erstellen oder aktualisieren
-        
-        # 1. Anime-Tabelle
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS animes (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                directory_path VARCHAR(511) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_anime_name (name),
-                UNIQUE KEY unique_anime_path (directory_path)
-            )
-        """)
-        
-        # 2. Seasons-Tabelle
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS seasons (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                anime_id INT NOT NULL,
-                name VARCHAR(255) NOT NULL,
-                season_number INT,
-                directory_path VARCHAR(511) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (anime_id) REFERENCES animes(id),
-                UNIQUE KEY unique_season_path (directory_path)
+        try:
+            connection = connect_database()
+        except Error as e:
+            if e.errno != errorcode.ER_BAD_DB_ERROR:
+                raise
+            # Datenbank erstellen, falls sie nicht existiert
+            connection = mysql.connector.connect(
+                host=DB_HOST,
+                user=DB_USER,
+                password=DB_PASSWORD
             )
-        """)
+            cursor = connection.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+            cursor.execute(f"USE {DB_NAME}")
+            cursor.close()
+            logging.info(f"Datenbank {DB_NAME} erstellt.")
         
-        # 3. Episodes-Tabelle (hier muss möglicherweise aktualisiert werden)
-        # Zuerst prüfen, ob die Tabelle existiert
-        cursor.execute("SHOW TABLES LIKE 'episodes'")
-        episodes_exists = cursor.fetchone() is not None
-        
-        if not episodes_exists:
-            # Neue Tabelle erstellen mit allen Spalten
-            cursor.execute("""
-                CREATE TABLE episodes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    season_id INT NOT NULL,
-                    name VARCHAR(255) NOT NULL,
-                    episode_number INT,
-                    file_path VARCHAR(511) NOT NULL,
-                    file_size BIGINT,
-                    file_extension VARCHAR(10),
-                    
-                    -- Grundlegende Videometadaten
-                    duration_ms BIGINT,
-                    video_format VARCHAR(50),
-                    video_codec VARCHAR(50),
-                    video_bitrate BIGINT,
-                    resolution_width INT,
-                    resolution_height INT,
-                    framerate FLOAT,
-                    
-                    -- Erweiterte Videometadaten
-                    aspect_ratio VARCHAR(20),
-                    color_depth VARCHAR(10),
-                    hdr_format VARCHAR(30),
-                    color_space VARCHAR(30),
-                    scan_type VARCHAR(20),
-                    encoder VARCHAR(100),
-                    
-                    -- Grundlegende Audiometadaten
-                    audio_codec VARCHAR(50),
-                    audio_channels INT,
-                    audio_bitrate BIGINT,
-                    audio_sample_rate INT,
-                    
-                    -- Erweiterte Audiometadaten
-                    audio_language VARCHAR(50),
-                    audio_tracks_count INT,
-                    audio_languages VARCHAR(255),
-                    
-                    -- Untertitelmetadaten
-                    subtitles_language VARCHAR(255),
-                    subtitles_formats VARCHAR(255),
-                    subtitles_count INT,
-                    forced_subtitles BOOLEAN,
-                    
-                    -- Dateiinformationen
-                    container_format VARCHAR(50),
-                    creation_time DATETIME,
-                    
-                    -- Systemfelder
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (season_id) REFERENCES seasons(id),
-                    UNIQUE KEY unique_episode_path (file_path)
-                )
-            """)
-            logging.info("Neue Episodes-Tabelle mit Videometadaten-Spalten erstellt.")
-        else:
-            # Tabelle existiert, fehlende Spalten hinzufügen
-            # Alle neuen Spalten für die Videometadaten prüfen und hinzufügen
-            for column_info in [
-                # Grundlegende Videometadaten (bereits vorhanden)
-                ("duration_ms", "BIGINT"),
-                ("video_format", "VARCHAR(50)"),
-                ("video_codec", "VARCHAR(50)"),
-                ("video_bitrate", "BIGINT"),
-                ("resolution_width", "INT"),
-                ("resolution_height", "INT"),
-                ("framerate", "FLOAT"),
-                ("audio_codec", "VARCHAR(50)"),
-                ("audio_channels", "INT"),
-                ("audio_bitrate", "BIGINT"),
-                ("audio_sample_rate", "INT"),
-                ("subtitles_language", "VARCHAR(255)"),
-                ("creation_time", "DATETIME"),
-                
-                # Erweiterte Videometadaten (neu)
-                ("aspect_ratio", "VARCHAR(20)"),
-                ("color_depth", "VARCHAR(10)"),
-                ("hdr_format", "VARCHAR(30)"),
-                ("color_space", "VARCHAR(30)"),
-                ("scan_type", "VARCHAR(20)"),
-                ("encoder", "VARCHAR(100)"),
-                
-                # Erweiterte Audiometadaten (neu)
-                ("audio_language", "VARCHAR(50)"),
-                ("audio_tracks_count", "INT"),
-                ("audio_languages", "VARCHAR(255)"),
-                
-                # Erweiterte Untertitelmetadaten (neu)
-                ("subtitles_formats", "VARCHAR(255)"),
-                ("subtitles_count", "INT"),
-                ("forced_subtitles", "BOOLEAN"),
-                
-                # Containerformat (neu)
-                ("container_format", "VARCHAR(50)")
-            ]:
-                column_name, column_type = column_info
-                # Prüfen ob die Spalte bereits existiert
-                cursor.execute(f"SHOW COLUMNS FROM episodes LIKE '{column_name}'")
-                column_exists = cursor.fetchone() is not None
-                
-                if not column_exists:
-                    # Spalte hinzufügen, falls sie nicht existiert
-                    try:
-                        cursor.execute(f"ALTER TABLE episodes ADD COLUMN {column_name} {column_type}")
-                        logging.info(f"Spalte {column_name} ({column_type}) zur Episodes-Tabelle hinzugefügt.")
-                    except Error as e:
-                        logging.error(f"Fehler beim Hinzufügen der Spalte {column_name}: {e}")
-            
-            logging.info("Bestehende Episodes-Tabelle wurde mit Videometadaten-Spalten aktualisiert.")
-        
-        connection.commit()
+        migrate_schema(connection)
         logging.info("Datenbankstruktur erfolgreich eingerichtet.")
         
         return connection
@@ -216,41 +206,29 @@ def setup_database():
         logging.error(f"Fehler beim Einrichten der Datenbank: {e}")
         sys.exit(1)
 
+def connect_database():
+    """
+    Öffnet eine zusätzliche Verbindung zur bereits eingerichteten Datenbank.
+    """
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME
+    )
+
 def extract_season_number(season_name):
     """
     Extrahiert die Staffelnummer aus dem Staffelnamen.
     """
-    match = re.search(r'staffel\s*(\d+)', season_name.lower())
-    if match:
-        return int(match.group(1))
-    
-    # Alternativer Versuch über "S01", "S1" Formate
-    match = re.search(r's(?:eason)?\s*(\d+)', season_name.lower())
-    if match:
-        return int(match.group(1))
-    
-    # Versuchen, einfach nur eine Zahl zu finden
-    match = re.search(r'^(\d+)$', season_name.strip())
-    if match:
-        return int(match.group(1))
-    
-    return None
+    return parse_season_name(season_name)
 
-def extract_episode_number(episode_name):
+def extract_episode_number(episode_name, title_prefix=''):
     """
     Extrahiert die Episodennummer aus dem Episodennamen.
+    title_prefix: Gemeinsamer Titel der Dateien im Verzeichnis (siehe common_title_prefix)
     """
-    # Typische Episodenformate: E01, EP01, Episode 01, 01 - Titel
-    match = re.search(r'e(?:p(?:isode)?)?\s*(\d+)', episode_name.lower())
-    if match:
-        return int(match.group(1))
-    
-    # Format: 01 - Titel oder 01.Titel oder 01_Titel
-    match = re.search(r'^(\d+)(?:\s*[\-_\.]\s*.+)?', os.path.splitext(episode_name)[0])
-    if match:
-        return int(match.group(1))
-    
-    return None
+    return parse_episode_name(episode_name, title_prefix).episode
 
 def is_video_file(filename):
     """
@@ -265,14 +243,73 @@ def is_video_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in video_extensions
 
-def extract_media_info(file_path):
+class CappedReader:
+    """
+    Dateiobjekt für MediaInfo.parse, das die gelesenen Bytes zählt und nach
+    limit Bytes das Dateiende meldet. MediaInfo wertet dann nur das bis dahin
+    Gelesene aus (Header, erste Pakete) statt z.B. ganze .ts-Dateien zu lesen.
+    """
+    def __init__(self, file, limit=None):
+        self._file = file
+        self.limit = limit
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        if self.limit is not None:
+            remaining = self.limit - self.bytes_read
+            if remaining <= 0:
+                return b''
+            size = remaining if size is None or size < 0 else min(size, remaining)
+        data = self._file.read(size)
+        self.bytes_read += len(data)
+        return data
+    
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+    
+    def tell(self):
+        return self._file.tell()
+
+def parse_media_file(file_path, parse_mode):
+    """
+    Liest eine Datei mit MediaInfo im angegebenen Modus.
+    Im Modus fast wird nur der Header analysiert und höchstens FAST_READ_LIMIT_MB gelesen.
+    Matroska- und MP4-Dateien werden zuerst mit media_headers gelesen; MediaInfo wird nur
+    verwendet, wenn das nicht gelingt oder (im Modus full) Bitraten oder Dauer fehlen.
+    Alle Lesezugriffe zählen gegen das Lesebudget (IO_BUDGET).
+    """
+    with IO_BUDGET.reading() as counter:
+        if NATIVE_HEADERS and os.path.splitext(file_path)[1].lower() in HEADER_EXTENSIONS:
+            media_info = parse_media_headers(file_path)
+            if media_info and (parse_mode == 'fast' or media_info.complete):
+                return media_info
+            logging.debug(f"Kopfdaten unvollständig, verwende MediaInfo: {file_path}")
+        
+        # Mit Bandbreitenbudget liest MediaInfo über ein Dateiobjekt, das jeden Lesezugriff bremst
+        throttled = IO_BUDGET.rate > 0
+        if parse_mode != 'fast' and not throttled:
+            return MediaInfo.parse(file_path, parse_speed=PARSE_SPEED['full'])
+        
+        with open(file_path, 'rb') as file:
+            source = ThrottledReader(file, IO_BUDGET, counter) if throttled else file
+            if parse_mode != 'fast':
+                return MediaInfo.parse(source, parse_speed=PARSE_SPEED['full'])
+            reader = CappedReader(source, int(FAST_READ_LIMIT_MB * 1024 * 1024))
+            media_info = MediaInfo.parse(reader, parse_speed=PARSE_SPEED['fast'])
+        logging.debug(f"{reader.bytes_read} Bytes gelesen (fast): {file_path}")
+        return media_info
+
+def extract_media_info(file_path, parse_mode=None):
     """
     Extrahiert erweiterte Metadaten aus einer Videodatei mit MediaInfo.
     Angepasst für verschiedene pymediainfo-Versionen mit verbesserten Attributen.
+    parse_mode ist 'fast' oder 'full' (Standard: PARSE_MODE) und wird als
+    metadata_mode im Ergebnis vermerkt.
     """
+    parse_mode = parse_mode or PARSE_MODE
     try:
         logging.debug(f"Extrahiere Metadaten aus: {file_path}")
-        media_info = MediaInfo.parse(file_path)
+        media_info = parse_media_file(file_path, parse_mode)
         result = {
             # Allgemeine Metadaten
             'duration_ms': None,
@@ -305,7 +342,8 @@ def extract_media_info(file_path):
             'forced_subtitles': False,  # Gibt es erzwungene Untertitel?
             # Dateiinformationen
             'creation_time': None,
-            'container_format': None    # z.B. Matroska, MP4
+            'container_format': None,   # z.B. Matroska, MP4
+            'metadata_mode': parse_mode
         }
         
         # Allgemeine Informationen
@@ -629,143 +667,555 @@ def get_creation_time(general_track):
     
     return None
 
-def update_episodes_metadata(connection, filter_path=None, reprocess_all=False):
+
+def get_extraction_cache():
     """
-    Aktualisiert die Metadaten aller vorhandener Episoden mit den erweiterten Metadatenfeldern.
+    Öffnet den Extraktions-Cache beim ersten Zugriff; er wird beim Programmende geschlossen.
+    Gibt None zurück, wenn der Cache deaktiviert ist oder nicht geöffnet werden kann.
+    """
+    global _extraction_cache, EXTRACTION_CACHE_PATH
+    with _extraction_cache_lock:
+        if _extraction_cache is None and EXTRACTION_CACHE_PATH:
+            try:
+                _extraction_cache = ExtractionCache(EXTRACTION_CACHE_PATH, extractor_version=EXTRACTOR_VERSION)
+                atexit.register(close_extraction_cache)
+            except (sqlite3.Error, OSError) as e:
+                logging.warning(f"Extraktions-Cache {EXTRACTION_CACHE_PATH} nicht verfügbar: {e}")
+                EXTRACTION_CACHE_PATH = ''
+        return _extraction_cache
+
+def close_extraction_cache():
+    """
+    Schreibt den Extraktions-Cache fest und protokolliert die Trefferquote.
+    """
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            return
+        cache = _extraction_cache
+        _extraction_cache = None
+    if cache.hits or cache.misses:
+        logging.info(f"Extraktions-Cache: {cache.hits} Treffer, {cache.misses} Dateien neu analysiert.")
+    cache.close()
+
+def timed_media_info(file_path, parse_mode):
+    """
+    extract_media_info mit Messung von Laufzeit und gelesenen Bytes (Stufe extract).
+    """
+    with METRICS.timed('extract', measure_bytes=True):
+        return extract_media_info(file_path, parse_mode)
+
+def cached_media_info(file_path, file_stat=None, parse_mode=None):
+    """
+    Wie extract_media_info, verwendet aber ein gespeichertes Ergebnis, solange die
+    Datei (Gerät, Inode, Größe, Änderungszeit) unverändert ist. Ein Ergebnis im
+    Modus full gilt auch für fast, umgekehrt nicht.
+    """
+    parse_mode = parse_mode or PARSE_MODE
+    cache = get_extraction_cache()
+    if cache is None:
+        return timed_media_info(file_path, parse_mode)
+    
+    try:
+        file_stat = file_stat or os.stat(file_path)
+        with METRICS.timed('cache'):
+            media_info = cache.get(file_stat, parse_mode)
+        if media_info is not None:
+            return media_info
+    except (sqlite3.Error, OSError) as e:
+        logging.warning(f"Fehler beim Lesen des Extraktions-Caches für {file_path}: {e}")
+        return timed_media_info(file_path, parse_mode)
+    
+    media_info = timed_media_info(file_path, parse_mode)
+    if media_info:
+        try:
+            cache.put(file_path, file_stat, media_info, parse_mode)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.warning(f"Fehler beim Speichern im Extraktions-Cache für {file_path}: {e}")
+    return media_info
+
+def scan_fingerprint(file_path, file_size):
+    """
+    Inhalts-Fingerabdruck einer Datei für den Scan, gegen das Lesebudget gezählt.
+    Gibt None zurück, wenn der Fingerabdruck abgeschaltet ist oder die Datei nicht lesbar war.
+    """
+    if not CONTENT_FINGERPRINT:
+        return None
+    try:
+        with IO_BUDGET.reading(), METRICS.timed('fingerprint', measure_bytes=True):
+            return content_fingerprint(file_path, file_size)
+    except OSError as e:
+        logging.warning(f"Fingerabdruck für {file_path} konnte nicht berechnet werden: {e}")
+        return None
+
+@contextmanager
+def extraction_pool(workers=None, device_of=None):
+    """
+    Stellt den Thread-Pool für die parallele Metadatenextraktion bereit.
+    MediaInfo gibt während des Parsens den GIL frei, daher genügen Threads.
+    Bei nur einem Worker wird kein Pool erstellt (None), die Pipeline extrahiert dann
+    in einem einzelnen Thread.
+    Mit device_of (Gerät einer Aufgabe) erhält jedes Gerät eine eigene Spur mit höchstens
+    DEVICE_READERS gleichzeitigen Lesern, insgesamt laufen höchstens workers Extraktionen.
+    """
+    workers = workers or EXTRACTION_WORKERS
+    if workers <= 1:
+        yield None
+        return
+    
+    if device_of is not None and DEVICE_READERS > 0:
+        executor = DeviceLanes(device_of, min(DEVICE_READERS, workers), max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mediainfo')
+    try:
+        yield executor
+    finally:
+        # Bei Abbruch (Strg+C, Fehler) nicht erst alle wartenden Analysen abarbeiten
+        executor.shutdown(cancel_futures=True)
+        if isinstance(executor, DeviceLanes):
+            executor.log_summary()
+
+
+def within_budget(items):
+    """
+    Liefert die Elemente, bis das Zeitbudget des Laufs aufgebraucht ist.
+    """
+    for item in items:
+        if budget_exhausted():
+            logging.warning("Zeitbudget aufgebraucht, beende die Verarbeitung vorzeitig.")
+            return
+        yield item
+
+def like_prefix(value):
+    """
+    LIKE-Muster für alle Werte, die mit value beginnen; %, _ und das Escape-Zeichen !
+    im Wert werden maskiert (Abfrage mit ESCAPE '!').
+    """
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+
+def locked(lock, function, *args):
+    """
+    Ruft function unter der Sperre lock auf.
+    """
+    with lock:
+        return function(*args)
+
+def _extract_for_update(file_path, parse_mode=None):
+    """
+    Extrahiert die Metadaten einer bereits archivierten Episode.
+    Gibt (stat, metadaten) zurück oder None, wenn die Datei nicht mehr existiert.
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return file_stat, cached_media_info(file_path, file_stat, parse_mode) or {}
+
+
+class StagedUpdate:
+    """
+    Gebündeltes UPDATE über eine temporäre Staging-Tabelle: die Zeilen eines Stapels werden
+    mit einem mehrzeiligen INSERT in die Staging-Tabelle geladen und mit einem einzigen
+    UPDATE ... JOIN übernommen, statt je Zeile ein UPDATE zum Server zu schicken.
+    Die Parameter einer Zeile sind die Werte von columns, gefolgt von der ID; row_query ist
+    das gleichwertige UPDATE für eine einzelne Zeile (Fehlereingrenzung).
+    Wird anstelle einer Anweisung an BatchWriter.add übergeben.
+    """
+    # Anweisungen je Stapel in BatchWriter._flush_staged: clear_query, insert_query (ein
+    # mehrzeiliger INSERT) und update_query; create_query nur einmal je Verbindung
+    STATEMENTS_PER_BATCH = 3
+    
+    def __init__(self, table, name, columns, row_query):
+        self.staging_table = f"{table}_staging_{name}"
+        self.row_query = row_query
+        column_list = ', '.join(columns)
+        # Temporäre Tabellen gehören zur Verbindung und verschwinden mit ihr
+        self.create_query = (f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_table} AS "
+                             f"SELECT {column_list}, id FROM {table} LIMIT 0")
+        self.clear_query = f"DELETE FROM {self.staging_table}"
+        self.insert_query = (f"INSERT INTO {self.staging_table} ({column_list}, id) "
+                             f"VALUES ({', '.join(['%s'] * (len(columns) + 1))})")
+        self.update_query = (f"UPDATE {table} AS t JOIN {self.staging_table} AS s ON s.id = t.id SET "
+                             + ', '.join(f"t.{column} = s.{column}" for column in columns))
+
+class BatchWriter:
+    """
+    Sammelt Schreibzugriffe und schreibt sie gebündelt mit executemany.
+    INSERTs werden dabei von mysql.connector zu einem mehrzeiligen INSERT
+    zusammengefasst, UPDATEs laufen als serverseitig vorbereitete Anweisung.
+    Commit erfolgt alle batch_size Zeilen oder commit_interval Sekunden,
+    statt nach jeder einzelnen Zeile.
+    """
+    def __init__(self, connection, batch_size=None, commit_interval=None, stats=None):
+        self.connection = connection
+        self.batch_size = batch_size or DB_BATCH_SIZE
+        self.commit_interval = commit_interval or DB_COMMIT_INTERVAL
+        # Betroffene Zeilen je stats_key werden nach jedem Flush hier aufsummiert
+        self.stats = stats if stats is not None else {}
+        self._pending = {}
+        self._pending_rows = 0
+        self._uncommitted_rows = 0
+        self._last_commit = time.monotonic()
+        self._cursor = connection.cursor()
+        self._prepared_cursor = connection.cursor(prepared=True)
+        self._after_commit = []
+        # Bereits angelegte Staging-Tabellen (StagedUpdate)
+        self._staging_tables = set()
+    
+    def add(self, query, params, stats_key=None, prepared=False):
+        """
+        Merkt eine Zeile für das gebündelte Schreiben vor.
+        """
+        key = (query, stats_key, prepared)
+        self._pending.setdefault(key, []).append(params)
+        self._pending_rows += 1
+        self._uncommitted_rows += 1
+        self._maybe_commit()
+    
+    def mark_written(self, rows=1):
+        """
+        Meldet direkt ausgeführte Schreibzugriffe (z.B. INSERTs, deren ID sofort benötigt wird),
+        damit auch sie erst mit dem nächsten gebündelten Commit festgeschrieben werden.
+        """
+        self._uncommitted_rows += rows
+        self._maybe_commit()
+    
+    def _maybe_commit(self):
+        if (self._uncommitted_rows >= self.batch_size or
+                time.monotonic() - self._last_commit >= self.commit_interval):
+            self.commit()
     
+    def flush(self):
+        """
+        Schreibt alle vorgemerkten Zeilen mit executemany, gruppiert nach Anweisung.
+        """
+        pending = self._pending
+        self._pending = {}
+        self._pending_rows = 0
+        
+        for (query, stats_key, prepared), rows in pending.items():
+            if isinstance(query, StagedUpdate):
+                affected_rows = self._flush_staged(query, rows)
+                if stats_key:
+                    self.stats[stats_key] = self.stats.get(stats_key, 0) + affected_rows
+                continue
+            cursor = self._prepared_cursor if prepared else self._cursor
+            try:
+                with METRICS.timed('db_write'):
+                    cursor.executemany(query, rows)
+                affected_rows = cursor.rowcount
+            except Error as e:
+                # Fehlerhafte Zeile eingrenzen, damit nicht der ganze Stapel verloren geht
+                logging.error(f"Fehler beim gebündelten Schreiben von {len(rows)} Zeilen: {e}")
+                affected_rows = 0
+                for params in rows:
+                    try:
+                        cursor.execute(query, params)
+                        affected_rows += max(cursor.rowcount, 0)
+                    except Error as row_error:
+                        logging.error(f"Fehler beim Schreiben der Zeile {params[:4]}: {row_error}")
+            
+            if stats_key:
+                self.stats[stats_key] = self.stats.get(stats_key, 0) + affected_rows
+    
+    def _flush_staged(self, staged, rows):
+        """
+        Schreibt einen Stapel über die Staging-Tabelle: leeren, mehrzeiliger INSERT,
+        ein UPDATE ... JOIN. Gibt die Anzahl geänderter Zeilen zurück.
+        """
+        cursor = self._cursor
+        start = time.perf_counter()
+        try:
+            with METRICS.timed('db_write'):
+                if staged.staging_table not in self._staging_tables:
+                    cursor.execute(staged.create_query)
+                    self._staging_tables.add(staged.staging_table)
+                cursor.execute(staged.clear_query)
+                cursor.executemany(staged.insert_query, rows)
+                cursor.execute(staged.update_query)
+            affected_rows = max(cursor.rowcount, 0)
+        except Error as e:
+            # Fehlerhafte Zeile eingrenzen, damit nicht der ganze Stapel verloren geht
+            logging.error(f"Fehler beim Übernehmen von {len(rows)} Zeilen über {staged.staging_table}: {e}")
+            affected_rows = 0
+            for params in rows:
+                try:
+                    cursor.execute(staged.row_query, params)
+                    affected_rows += max(cursor.rowcount, 0)
+                except Error as row_error:
+                    logging.error(f"Fehler beim Schreiben der Zeile (ID {params[-1]}): {row_error}")
+            return affected_rows
+        logging.info(f"Stapel über {staged.staging_table}: {len(rows)} Zeilen geladen, {affected_rows} geändert "
+                     f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return affected_rows
+    
+    def after_commit(self, callback):
+        """
+        Ruft callback nach dem nächsten Commit einmal auf (z.B. um einen Checkpoint
+        erst zu speichern, wenn die zugehörigen Zeilen festgeschrieben sind).
+        """
+        if callback not in self._after_commit:
+            self._after_commit.append(callback)
+    
+    def commit(self):
+        """
+        Schreibt alle vorgemerkten Zeilen und schließt die Transaktion ab.
+        """
+        self.flush()
+        with METRICS.timed('commit'):
+            self.connection.commit()
+        if self._uncommitted_rows:
+            logging.debug(f"{self._uncommitted_rows} Zeilen festgeschrieben.")
+        self._uncommitted_rows = 0
+        self._last_commit = time.monotonic()
+        
+        callbacks = self._after_commit
+        self._after_commit = []
+        for callback in callbacks:
+            callback()
+    
+    def close(self):
+        """
+        Schreibt verbleibende Zeilen fest und schließt die Cursor.
+        """
+        try:
+            self.commit()
+        finally:
+            self._cursor.close()
+            self._prepared_cursor.close()
+
+
+# UPDATE aller Metadatenfelder einer Episode (Parameter: episode_metadata_params)
+EPISODE_METADATA_UPDATE = """
+    UPDATE episodes SET
+        duration_ms = %s,
+        video_format = %s,
+        video_codec = %s,
+        video_bitrate = %s,
+        resolution_width = %s,
+        resolution_height = %s,
+        framerate = %s,
+        audio_codec = %s,
+        audio_channels = %s,
+        audio_bitrate = %s,
+        audio_sample_rate = %s,
+        subtitles_language = %s,
+        creation_time = %s,
+        
+        -- Erweiterte Metadaten
+        aspect_ratio = %s,
+        color_depth = %s,
+        hdr_format = %s,
+        color_space = %s,
+        scan_type = %s,
+        encoder = %s,
+        audio_language = %s,
+        audio_tracks_count = %s,
+        audio_languages = %s,
+        subtitles_formats = %s,
+        subtitles_count = %s,
+        forced_subtitles = %s,
+        container_format = %s,
+        metadata_mode = %s,
+        
+        -- Dateiinformationen für die Erkennung unveränderter Dateien
+        file_size = %s,
+        file_mtime = %s
+    WHERE id = %s
+"""
+
+def episode_metadata_params(episode_id, media_info, file_stat):
+    """
+    Liefert die Parameter für EPISODE_METADATA_UPDATE: alle Metadatenfelder sowie
+    Dateigröße und Änderungszeit einer Episode.
+    """
+    return (
+        media_info['duration_ms'],
+        media_info['video_format'],
+        media_info['video_codec'],
+        media_info['video_bitrate'],
+        media_info['resolution_width'],
+        media_info['resolution_height'],
+        media_info['framerate'],
+        media_info['audio_codec'],
+        media_info['audio_channels'],
+        media_info['audio_bitrate'],
+        media_info['audio_sample_rate'],
+        media_info['subtitles_language'],
+        media_info['creation_time'],
+        
+        # Erweiterte Metadaten
+        media_info['aspect_ratio'],
+        media_info['color_depth'],
+        media_info['hdr_format'],
+        media_info['color_space'],
+        media_info['scan_type'],
+        media_info['encoder'],
+        media_info['audio_language'],
+        media_info['audio_tracks_count'],
+        media_info['audio_languages'],
+        media_info['subtitles_formats'],
+        media_info['subtitles_count'],
+        1 if media_info['forced_subtitles'] else 0,  # BOOLEAN für MySQL
+        media_info['container_format'],
+        media_info.get('metadata_mode'),
+        
+        # Dateiinformationen
+        file_stat.st_size,
+        int(file_stat.st_mtime),
+        
+        # WHERE-Klausel
+        episode_id
+    )
+
+
+# Spalten von EPISODE_METADATA_UPDATE in Reihenfolge der Parameter (ohne ID)
+EPISODE_METADATA_COLUMNS = [
+    'duration_ms', 'video_format', 'video_codec', 'video_bitrate', 'resolution_width', 'resolution_height',
+    'framerate', 'audio_codec', 'audio_channels', 'audio_bitrate', 'audio_sample_rate', 'subtitles_language',
+    'creation_time', 'aspect_ratio', 'color_depth', 'hdr_format', 'color_space', 'scan_type', 'encoder',
+    'audio_language', 'audio_tracks_count', 'audio_languages', 'subtitles_formats', 'subtitles_count',
+    'forced_subtitles', 'container_format', 'metadata_mode', 'file_size', 'file_mtime'
+]
+EPISODE_METADATA_STAGED = StagedUpdate('episodes', 'metadata', EPISODE_METADATA_COLUMNS, EPISODE_METADATA_UPDATE)
+
+# Felder, die MediaInfo im Modus fast nur schätzt (z.B. Dauer und Bitrate aus dem
+# Dateianfang, Spuren, die erst später im Transportstrom auftauchen)
+APPROXIMATED_FIELDS = [
+    'duration_ms', 'video_bitrate', 'framerate', 'audio_bitrate', 'audio_tracks_count',
+    'audio_languages', 'subtitles_language', 'subtitles_formats', 'subtitles_count', 'forced_subtitles'
+]
+
+# UPDATE der geschätzten Felder einer im Modus fast analysierten Episode
+EPISODE_UPGRADE_UPDATE = f"""
+    UPDATE episodes SET {', '.join(f'{field} = %s' for field in APPROXIMATED_FIELDS)}, metadata_mode = %s
+    WHERE id = %s
+"""
+
+EPISODE_UPGRADE_STAGED = StagedUpdate('episodes', 'upgrade', APPROXIMATED_FIELDS + ['metadata_mode'],
+                                      EPISODE_UPGRADE_UPDATE)
+
+def episode_upgrade_params(episode_id, media_info):
+    """
+    Liefert die Parameter für EPISODE_UPGRADE_UPDATE aus einer vollständigen Analyse.
+    """
+    values = [media_info[field] for field in APPROXIMATED_FIELDS]
+    values[APPROXIMATED_FIELDS.index('forced_subtitles')] = 1 if media_info['forced_subtitles'] else 0
+    return tuple(values) + ('full', episode_id)
+
+def update_conditions(filter_path=None, reprocess_all=False, upgrade_fast=False):
+    """
+    Bedingungen (SQL, Parameter) für die Episoden, die eine Metadatenaktualisierung bearbeitet.
+    """
+    conditions = []
+    params = []
+    if upgrade_fast:
+        conditions.append("metadata_mode = 'fast'")
+    # Optional nur nicht aktualisierte Episoden abfragen
+    elif not reprocess_all:
+        conditions.append(MISSING_FIELDS_CONDITION)
+    
+    # Optional nur Episoden in einem bestimmten Pfad abfragen
+    if filter_path:
+        conditions.append("file_path LIKE %s ESCAPE '!'")
+        params.append(like_prefix(filter_path))
+    return conditions, params
+
+def update_episodes_metadata(connection, filter_path=None, reprocess_all=False, workers=None, upgrade_fast=False,
+                             journal=None):
+    """
+    Aktualisiert die Metadaten aller vorhandener Episoden mit den erweiterten Metadatenfeldern.
+
     Args:
         connection: Datenbankverbindung
         filter_path: Optional. Wenn angegeben, werden nur Episoden in diesem Pfad aktualisiert
         reprocess_all: Wenn True, werden auch bereits aktualisierte Episoden erneut verarbeitet
+        workers: Anzahl paralleler Extraktions-Threads (Standard: EXTRACTION_WORKERS)
+        upgrade_fast: Wenn True, werden nur im Modus fast analysierte Episoden vollständig
+                      analysiert und dabei nur die geschätzten Felder (APPROXIMATED_FIELDS) ersetzt
+        journal: Optional. Fortschrittsjournal; die Episoden werden je Prioritätsstufe nach ID
+                 verarbeitet und ab der zuletzt festgeschriebenen Stufe und ID fortgesetzt
     """
     try:
-        cursor = connection.cursor(dictionary=True)
+        conditions, params = update_conditions(filter_path, reprocess_all, upgrade_fast)
+        parse_mode = 'full' if upgrade_fast else None
         
-        # Abfrage zum Abrufen von Episoden, die aktualisiert werden müssen
-        query = "SELECT id, file_path FROM episodes"
-        params = []
+        # Beim Fortsetzen erst hinter der zuletzt festgeschriebenen Episode (Stufe und ID) beginnen
+        phase = 'upgrade' if upgrade_fast else 'metadata'
+        last_position = journal.update_positions.get(phase) if journal else None
+        if last_position is not None:
+            tier, last_episode_id = parse_refresh_position(last_position)
+            logging.info(f"Setze Metadatenaktualisierung ({phase}) in Stufe '{REFRESH_TIERS[tier]}' "
+                         f"nach Episode {last_episode_id} fort.")
         
-        # Optional nur nicht aktualisierte Episoden abfragen
-        if not reprocess_all:
-            query += " WHERE container_format IS NULL OR aspect_ratio IS NULL"
+        # Seitenabfrage (Quell-Thread) und Schreiben (DB-Thread) teilen sich die Verbindung
+        connection_lock = threading.Lock()
+        # Episoden nach Priorität (neu, fehlende Felder, im Dashboard angesehen, Rest), innerhalb
+        # einer Stufe seitenweise nach ID; im Speicher liegt höchstens eine Seite. Da nach ID und
+        # nicht nach Position geblättert wird, verschieben bereits aktualisierte Episoden, die die
+        # Bedingung nicht mehr erfüllen, keine Seiten.
+        scheduler = RefreshScheduler(connection, conditions, params, lock=connection_lock,
+                                     page_size=UPDATE_PAGE_SIZE, position=last_position, budget=UPDATE_BUDGET)
+        total = scheduler.count()
         
-        # Optional nur Episoden in einem bestimmten Pfad abfragen
-        if filter_path:
-            if "WHERE" in query:
-                query += " AND file_path LIKE %s"
-            else:
-                query += " WHERE file_path LIKE %s"
-            params.append(f"{filter_path}%")
-        
-        cursor.execute(query, params)
-        episodes = cursor.fetchall()
-        
-        if not episodes:
+        if not total:
             logging.info("Keine Episoden gefunden, die aktualisiert werden müssen.")
             return 0
         
-        logging.info(f"Aktualisiere Metadaten für {len(episodes)} Episoden...")
+        logging.info(f"Aktualisiere Metadaten für {total} Episoden...")
+        scheduler.log_plan()
         
-        # Zähler für erfolgreiche Aktualisierungen
-        successful_updates = 0
+        # Aktualisierungen gebündelt schreiben, erfolgreiche Aktualisierungen werden in counts gezählt
+        counts = {'updated': 0}
+        writer = BatchWriter(connection, stats=counts)
+        queued_updates = 0
         
-        # Episoden mit Fortschrittsbalken verarbeiten
-        for episode in tqdm(episodes, desc="Aktualisiere Metadaten"):
-            episode_id = episode['id']
-            file_path = episode['file_path']
+        def persist_update(episode, result):
+            nonlocal queued_updates
+            episode_id, file_path, tier = episode
+            if journal:
+                journal.advance_update(phase, [tier, episode_id])
+                writer.after_commit(journal.save)
             
             # Prüfen, ob die Datei existiert
-            if not os.path.exists(file_path):
+            if result is None:
                 logging.warning(f"Datei nicht gefunden: {file_path}")
-                continue
+                return
             
-            # Metadaten erneut extrahieren
-            media_info = extract_media_info(file_path)
+            # Metadaten konnten nicht extrahiert werden
+            file_stat, media_info = result
             if not media_info:
                 logging.error(f"Konnte keine Metadaten extrahieren aus: {file_path}")
-                continue
+                return
             
-            # SQL für das Update aller Metadatenfelder generieren
-            update_query = """
-                UPDATE episodes SET
-                    duration_ms = %s,
-                    video_format = %s,
-                    video_codec = %s,
-                    video_bitrate = %s,
-                    resolution_width = %s,
-                    resolution_height = %s,
-                    framerate = %s,
-                    audio_codec = %s,
-                    audio_channels = %s,
-                    audio_bitrate = %s,
-                    audio_sample_rate = %s,
-                    subtitles_language = %s,
-                    creation_time = %s,
-                    
-                    -- Erweiterte Metadaten
-                    aspect_ratio = %s,
-                    color_depth = %s,
-                    hdr_format = %s,
-                    color_space = %s,
-                    scan_type = %s,
-                    encoder = %s,
-                    audio_language = %s,
-                    audio_tracks_count = %s,
-                    audio_languages = %s,
-                    subtitles_formats = %s,
-                    subtitles_count = %s,
-                    forced_subtitles = %s,
-                    container_format = %s
-                WHERE id = %s
-            """
-            
-            try:
-                cursor.execute(update_query, (
-                    media_info['duration_ms'],
-                    media_info['video_format'],
-                    media_info['video_codec'],
-                    media_info['video_bitrate'],
-                    media_info['resolution_width'],
-                    media_info['resolution_height'],
-                    media_info['framerate'],
-                    media_info['audio_codec'],
-                    media_info['audio_channels'],
-                    media_info['audio_bitrate'],
-                    media_info['audio_sample_rate'],
-                    media_info['subtitles_language'],
-                    media_info['creation_time'],
-                    
-                    # Erweiterte Metadaten
-                    media_info['aspect_ratio'],
-                    media_info['color_depth'],
-                    media_info['hdr_format'],
-                    media_info['color_space'],
-                    media_info['scan_type'],
-                    media_info['encoder'],
-                    media_info['audio_language'],
-                    media_info['audio_tracks_count'],
-                    media_info['audio_languages'],
-                    media_info['subtitles_formats'],
-                    media_info['subtitles_count'],
-                    1 if media_info['forced_subtitles'] else 0,  # BOOLEAN für MySQL
-                    media_info['container_format'],
-                    
-                    # WHERE-Klausel
-                    episode_id
-                ))
-                connection.commit()
-                
-                # Episode wurde aktualisiert
-                if cursor.rowcount > 0:
-                    successful_updates += 1
-                    resolution = f"{media_info['resolution_width']}x{media_info['resolution_height']}" if media_info['resolution_width'] and media_info['resolution_height'] else "unbekannt"
-                    if successful_updates % 10 == 0 or successful_updates <= 5:  # Log nur jede 10. Aktualisierung oder die ersten 5
-                        logging.info(f"Metadaten aktualisiert für: {os.path.basename(file_path)} | Auflösung: {resolution} | Codec: {media_info['video_codec'] or 'unbekannt'}")
+            if upgrade_fast:
+                writer.add(EPISODE_UPGRADE_STAGED, episode_upgrade_params(episode_id, media_info),
+                           stats_key='updated')
+            else:
+                writer.add(EPISODE_METADATA_STAGED, episode_metadata_params(episode_id, media_info, file_stat),
+                           stats_key='updated')
+            queued_updates += 1
             
-            except Error as e:
-                logging.error(f"Fehler beim Aktualisieren der Metadaten für {file_path}: {e}")
+            resolution = f"{media_info['resolution_width']}x{media_info['resolution_height']}" if media_info['resolution_width'] and media_info['resolution_height'] else "unbekannt"
+            if queued_updates % 10 == 0 or queued_updates <= 5:  # Log nur jede 10. Aktualisierung oder die ersten 5
+                logging.info(f"Metadaten aktualisiert für: {os.path.basename(file_path)} | Auflösung: {resolution} | Codec: {media_info['video_codec'] or 'unbekannt'}")
         
-        logging.info(f"Metadatenaktualisierung abgeschlossen. {successful_updates} von {len(episodes)} Episoden erfolgreich aktualisiert.")
+        # Metadaten parallel extrahieren, Ergebnisse in Abfragereihenfolge im DB-Thread der Pipeline schreiben
+        workers = workers or EXTRACTION_WORKERS
+        try:
+            # Gerät je Episode im Quell-Thread bestimmen (stat), nicht beim Einreihen im Event-Loop
+            devices = DirectoryDevices()
+            source = ((episode, devices(episode[1])) for episode in within_budget(scheduler))
+            with extraction_pool(workers, device_of=lambda item: item[1]) as executor:
+                run_pipeline(source, lambda item: _extract_for_update(item[0][1], parse_mode),
+                             lambda item, result: locked(connection_lock, persist_update, item[0], result),
+                             executor=executor, description="Aktualisiere Metadaten", total=total)
+        finally:
+            # Auch bei Abbruch (KeyboardInterrupt) alle fertig extrahierten Metadaten festschreiben
+            writer.close()
+        
+        successful_updates = counts['updated']
+        logging.info(f"Metadatenaktualisierung abgeschlossen. {successful_updates} von {total} Episoden erfolgreich aktualisiert.")
         return successful_updates
     
     except Error as e:
@@ -773,286 +1223,1405 @@ def update_episodes_metadata(connection, filter_path=None, reprocess_all=False):
         return 0
 
 
-def process_episode(cursor, connection, season_id, episode_path):
+# Platzhalter-Metadaten, wenn die Extraktion fehlschlägt
+EMPTY_MEDIA_INFO = {'duration_ms': None, 'video_format': None, 'video_codec': None, 'video_bitrate': None,
+                    'resolution_width': None, 'resolution_height': None, 'framerate': None,
+                    'audio_codec': None, 'audio_channels': None, 'audio_bitrate': None,
+                    'audio_sample_rate': None, 'subtitles_language': None, 'creation_time': None,
+                    'aspect_ratio': None, 'color_depth': None, 'hdr_format': None, 'color_space': None,
+                    'scan_type': None, 'encoder': None, 'audio_language': None, 'audio_tracks_count': 0,
+                    'audio_languages': None, 'subtitles_formats': None, 'subtitles_count': 0,
+                    'forced_subtitles': False, 'container_format': None, 'metadata_mode': None}
+
+# INSERT für Episoden, wird gebündelt zu einem mehrzeiligen INSERT (Parameter: siehe insert_episode)
+EPISODE_INSERT = """
+    INSERT IGNORE INTO episodes 
+    (season_id, name, episode_number, file_path, file_size, file_mtime, file_extension,
+     duration_ms, video_format, video_codec, video_bitrate, resolution_width, resolution_height,
+     framerate, audio_codec, audio_channels, audio_bitrate, audio_sample_rate,
+     subtitles_language, creation_time, aspect_ratio, color_depth, hdr_format, 
+     color_space, scan_type, encoder, audio_language, audio_tracks_count, audio_languages,
+     subtitles_formats, subtitles_count, forced_subtitles, container_format, metadata_mode,
+     content_fingerprint) 
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def process_episode(writer, season_id, episode_path, file_stat=None):
     """
     Verarbeitet eine einzelne Episodendatei und fügt sie zur Datenbank hinzu.
-    Extrahiert und speichert zusätzlich Videometadaten.
+    Extrahiert und speichert zusätzlich Videometadaten und den Inhalts-Fingerabdruck.
+    """
+    file_stat = file_stat or os.stat(episode_path)
+    return insert_episode(writer, season_id, episode_path, cached_media_info(episode_path, file_stat), file_stat,
+                          fingerprint=scan_fingerprint(episode_path, file_stat.st_size))
+
+def insert_episode(writer, season_id, episode_path, media_info, file_stat=None, episode_number=None, fingerprint=None):
+    """
+    Merkt eine Episodendatei mit bereits extrahierten Videometadaten zum Einfügen vor.
+    Wird im Datenbank-Thread der Pipeline aufgerufen, auch wenn die Extraktion parallel erfolgt ist;
+    geschrieben wird gebündelt über den BatchWriter. Ohne episode_number wird die Nummer
+    aus dem Dateinamen allein bestimmt.
     """
     episode_name = os.path.basename(episode_path)
-    episode_number = extract_episode_number(episode_name)
-    file_size = os.path.getsize(episode_path)
+    if episode_number is None:
+        episode_number = extract_episode_number(episode_name)
+    file_stat = file_stat or os.stat(episode_path)
+    file_size = file_stat.st_size
+    file_mtime = int(file_stat.st_mtime)
     _, file_extension = os.path.splitext(episode_path)
     
-    # Videometadaten extrahieren
-    media_info = extract_media_info(episode_path)
+    # Fehlgeschlagene Extraktion: Episode ohne Videometadaten speichern
     if not media_info:
-        media_info = {'duration_ms': None, 'video_format': None, 'video_codec': None, 'video_bitrate': None,
-                      'resolution_width': None, 'resolution_height': None, 'framerate': None,
-                      'audio_codec': None, 'audio_channels': None, 'audio_bitrate': None,
-                      'audio_sample_rate': None, 'subtitles_language': None, 'creation_time': None,
-                      'aspect_ratio': None, 'color_depth': None, 'hdr_format': None, 'color_space': None,
-                      'scan_type': None, 'encoder': None, 'audio_language': None, 'audio_tracks_count': 0,
-                      'audio_languages': None, 'subtitles_formats': None, 'subtitles_count': 0,
-                      'forced_subtitles': False, 'container_format': None}
-    
-    # Episode zur Datenbank hinzufügen
-    try:
-        cursor.execute("""
-            INSERT IGNORE INTO episodes 
-            (season_id, name, episode_number, file_path, file_size, file_extension,
-             duration_ms, video_format, video_codec, video_bitrate, resolution_width, resolution_height,
-             framerate, audio_codec, audio_channels, audio_bitrate, audio_sample_rate,
-             subtitles_language, creation_time, aspect_ratio, color_depth, hdr_format, 
-             color_space, scan_type, encoder, audio_language, audio_tracks_count, audio_languages,
-             subtitles_formats, subtitles_count, forced_subtitles, container_format) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            season_id, episode_name, episode_number, episode_path, file_size, file_extension,
-            media_info['duration_ms'], media_info['video_format'], media_info['video_codec'], 
-            media_info['video_bitrate'], media_info['resolution_width'], media_info['resolution_height'],
-            media_info['framerate'], media_info['audio_codec'], media_info['audio_channels'], 
-            media_info['audio_bitrate'], media_info['audio_sample_rate'], media_info['subtitles_language'],
-            media_info['creation_time'], media_info['aspect_ratio'], media_info['color_depth'], 
-            media_info['hdr_format'], media_info['color_space'], media_info['scan_type'], 
-            media_info['encoder'], media_info['audio_language'], media_info['audio_tracks_count'], 
-            media_info['audio_languages'], media_info['subtitles_formats'], media_info['subtitles_count'], 
-            1 if media_info['forced_subtitles'] else 0, media_info['container_format']
-        ))
-        connection.commit()
+        media_info = EMPTY_MEDIA_INFO
+    
+    # Episode zum Einfügen vormerken, STATS['episodes'] wird beim Schreiben erhöht
+    writer.add(EPISODE_INSERT, (
+        season_id, episode_name, episode_number, episode_path, file_size, file_mtime, file_extension,
+        media_info['duration_ms'], media_info['video_format'], media_info['video_codec'], 
+        media_info['video_bitrate'], media_info['resolution_width'], media_info['resolution_height'],
+        media_info['framerate'], media_info['audio_codec'], media_info['audio_channels'], 
+        media_info['audio_bitrate'], media_info['audio_sample_rate'], media_info['subtitles_language'],
+        media_info['creation_time'], media_info['aspect_ratio'], media_info['color_depth'], 
+        media_info['hdr_format'], media_info['color_space'], media_info['scan_type'], 
+        media_info['encoder'], media_info['audio_language'], media_info['audio_tracks_count'], 
+        media_info['audio_languages'], media_info['subtitles_formats'], media_info['subtitles_count'], 
+        1 if media_info['forced_subtitles'] else 0, media_info['container_format'],
+        media_info.get('metadata_mode'), fingerprint
+    ), stats_key='episodes')
+    
+    resolution = f"{media_info['resolution_width']}x{media_info['resolution_height']}" if media_info['resolution_width'] and media_info['resolution_height'] else "unbekannt"
+    logging.info(f"Episode hinzugefügt: {episode_name} | Auflösung: {resolution} | Codec: {media_info['video_codec'] or 'unbekannt'}")
+    return True
+
+def load_known_files(connection, fingerprints=None):
+    """
+    Lädt alle archivierten Episodendateien mit gespeicherter Größe und Änderungszeit.
+    Gibt ein Dictionary file_path -> (episode_id, file_size, file_mtime) zurück.
+    Mit fingerprints (Dictionary) werden in derselben Abfrage die gespeicherten
+    Inhalts-Fingerabdrücke als file_path -> fingerprint eingetragen.
+    """
+    known_files = {}
+    cursor = connection.cursor()
+    cursor.execute("SELECT id, file_path, file_size, file_mtime, content_fingerprint FROM episodes")
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        for episode_id, file_path, file_size, file_mtime, fingerprint in rows:
+            known_files[file_path] = (episode_id, file_size, file_mtime)
+            if fingerprints is not None and fingerprint:
+                fingerprints[file_path] = fingerprint
+    cursor.close()
+    
+    logging.info(f"{len(known_files)} bereits archivierte Episodendateien geladen.")
+    return known_files
+
+def load_directory_ids(connection):
+    """
+    Lädt die IDs aller archivierten Animes und Staffeln.
+    Gibt zwei Dictionaries directory_path -> id zurück (Animes, Staffeln).
+    """
+    directory_ids = []
+    cursor = connection.cursor()
+    for table in ("animes", "seasons"):
+        ids = {}
+        cursor.execute(f"SELECT id, directory_path FROM {table}")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row_id, directory_path in rows:
+                ids[directory_path] = row_id
+        directory_ids.append(ids)
+    cursor.close()
+    
+    anime_ids, season_ids = directory_ids
+    logging.info(f"{len(anime_ids)} Animes und {len(season_ids)} Staffeln bereits archiviert.")
+    return anime_ids, season_ids
+
+def resolve_directory_id(cursor, table, ids, directory_path, insert_query, params):
+    """
+    Liefert die ID eines Animes oder einer Staffel zum Verzeichnis als (id, neu_angelegt).
+    Bekannte Verzeichnisse werden aus ids aufgelöst, neue mit einem INSERT angelegt
+    und über lastrowid ermittelt. Nur wenn der INSERT ignoriert wurde (z.B. doppelter
+    Anime-Name), wird die ID noch per SELECT nachgeschlagen.
+    """
+    row_id = ids.get(directory_path)
+    if row_id is not None:
+        return row_id, False
+    
+    cursor.execute(insert_query, params)
+    created = cursor.rowcount > 0
+    if created:
+        row_id = cursor.lastrowid
+    else:
+        cursor.execute(f"SELECT id FROM {table} WHERE directory_path = %s", (directory_path,))
+        result = cursor.fetchone()
+        row_id = result['id'] if result else None
+    
+    if row_id is not None:
+        ids[directory_path] = row_id
+    return row_id, created
+
+def ensure_anime(cursor, context, anime_name, directory_path):
+    """
+    Liefert die ID des Animes zum Verzeichnis und legt ihn bei Bedarf an.
+    """
+    anime_id, created = resolve_directory_id(
+        cursor, "animes", context.anime_ids, directory_path,
+        "INSERT IGNORE INTO animes (name, directory_path) VALUES (%s, %s)", (anime_name, directory_path))
+    if created:
+        context.writer.mark_written()
+        STATS['animes'] += 1
+        logging.info(f"Anime hinzugefügt: {anime_name}")
+    return anime_id
+
+def ensure_season(cursor, context, anime_id, season_name, season_number, directory_path):
+    """
+    Liefert die ID der Staffel zum Verzeichnis und legt sie bei Bedarf an.
+    """
+    season_id, created = resolve_directory_id(cursor, "seasons", context.season_ids, directory_path, """
+        INSERT IGNORE INTO seasons (anime_id, name, season_number, directory_path) 
+        VALUES (%s, %s, %s, %s)
+    """, (anime_id, season_name, season_number, directory_path))
+    if created:
+        context.writer.mark_written()
+        STATS['seasons'] += 1
+        logging.info(f"Staffel hinzugefügt: {season_name} (Staffel {season_number if season_number else 'unbekannt'})")
+    return season_id
+
+def classify_file(known_files, file_path, file_stat):
+    """
+    Vergleicht eine Datei mit dem vorab geladenen Datenbankstand.
+    Unveränderte Dateien (gleiche Größe und Änderungszeit) müssen nicht erneut
+    mit MediaInfo analysiert werden.
+    """
+    if known_files is None or file_path not in known_files:
+        return FILE_NEW
+    
+    _, file_size, file_mtime = known_files[file_path]
+    if file_size != file_stat.st_size:
+        return FILE_CHANGED
+    if file_mtime is None:
+        # Episode stammt aus einer Zeit vor der file_mtime-Spalte
+        return FILE_MTIME_MISSING
+    if file_mtime != int(file_stat.st_mtime):
+        return FILE_CHANGED
+    return FILE_UNCHANGED
+
+class CheckpointJournal:
+    """
+    Fortschrittsjournal eines Archiver-Laufs als JSON-Datei: abgeschlossene Anime-Verzeichnisse
+    des Scans und je Aktualisierungsphase die ID der zuletzt verarbeiteten Episode.
+    Einträge werden erst übernommen, wenn die zugehörigen Zeilen festgeschrieben sind
+    (save wird über BatchWriter.after_commit aufgerufen).
+    """
+    def __init__(self, path=None, media_path=None):
+        self.path = path or CHECKPOINT_PATH
+        self.media_path = media_path or MEDIA_PATH
+        self.completed_animes = set()
+        self.scan_complete = False
+        self.update_positions = {}
+        self._pending_animes = []
+        self._pending_positions = {}
+    
+    def load(self):
+        """
+        Lädt das Journal eines abgebrochenen Laufs. Gibt False zurück, wenn keines vorliegt
+        oder es zu einem anderen Medienpfad gehört.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"Checkpoint {self.path} nicht lesbar, beginne von vorn: {e}")
+            return False
         
-        # Episode wurde hinzugefügt oder existiert bereits
-        if cursor.rowcount > 0:
-            STATS['episodes'] += 1
-            resolution = f"{media_info['resolution_width']}x{media_info['resolution_height']}" if media_info['resolution_width'] and media_info['resolution_height'] else "unbekannt"
-            logging.info(f"Episode hinzugefügt: {episode_name} | Auflösung: {resolution} | Codec: {media_info['video_codec'] or 'unbekannt'}")
-            return True
-    except Error as e:
-        logging.error(f"Fehler beim Hinzufügen der Episode {episode_name}: {e}")
+        if data.get('media_path') != self.media_path:
+            logging.warning(f"Checkpoint gehört zu {data.get('media_path')}, nicht zu {self.media_path}; beginne von vorn.")
+            return False
+        self.completed_animes = set(data.get('completed_animes', []))
+        self.scan_complete = data.get('scan_complete', False)
+        self.update_positions = data.get('update_positions', {})
+        return True
+    
+    def complete_anime(self, directory_path):
+        self._pending_animes.append(directory_path)
+    
+    def advance_update(self, phase, episode_id):
+        self._pending_positions[phase] = episode_id
+    
+    def finish_scan(self):
+        self.scan_complete = True
+        self.save()
     
-    return False
+    def save(self):
+        """
+        Übernimmt die vorgemerkten Einträge und schreibt das Journal (atomar über eine temporäre Datei).
+        """
+        self.completed_animes.update(self._pending_animes)
+        self.update_positions.update(self._pending_positions)
+        self._pending_animes = []
+        self._pending_positions = {}
+        
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'media_path': self.media_path,
+                    'completed_animes': sorted(self.completed_animes),
+                    'scan_complete': self.scan_complete,
+                    'update_positions': self.update_positions,
+                }, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Checkpoint {self.path} konnte nicht geschrieben werden: {e}")
+    
+    def remove(self):
+        """
+        Löscht das Journal nach einem vollständigen Lauf.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
 
-def scan_directory_recursive(connection, path, anime_id=None, season_id=None, depth=0):
+class ScanContext:
+    """
+    Gemeinsamer Zustand eines Scan-Durchlaufs, der durch die Rekursion gereicht wird.
+    
+    Die Verschiebeerkennung (moved_from) läuft in den Extraktions-Threads, während der
+    Datenbank-Thread known_files und die Fingerabdrücke ändert. Der Index der Fingerabdrücke
+    wird deshalb vorab aufgebaut, und alle Zugriffe auf ihn sowie alle Änderungen an
+    known_files und fingerprints laufen über die Methoden unter self.lock.
+    """
+    def __init__(self, executor=None, known_files=None, writer=None, anime_ids=None, season_ids=None,
+                 journal=None, leases=None, fingerprints=None):
+        self.executor = executor
+        self.known_files = known_files
+        # file_path -> Inhalts-Fingerabdruck der archivierten Episoden (None = keine Verschiebeerkennung)
+        self.fingerprints = fingerprints
+        # Inhalts-Fingerabdruck -> Pfade und bereits von einer neuen Datei übernommene alte Pfade
+        self._paths_by_fingerprint = {}
+        for path, fingerprint in (fingerprints or {}).items():
+            self._paths_by_fingerprint.setdefault(fingerprint, []).append(path)
+        self._claimed_moves = set()
+        self.lock = threading.Lock()
+        self.writer = writer
+        # Fortschrittsjournal (--resume); abgeschlossene Animes werden übersprungen
+        self.journal = journal
+        # Scan-Leases (--shard); Animes anderer Instanzen werden übersprungen
+        self.leases = leases
+        # Scan wurde wegen des Zeitbudgets vorzeitig beendet
+        self.interrupted = False
+        # directory_path -> id, vorab geladen und um neu angelegte Einträge ergänzt
+        self.anime_ids = anime_ids if anime_ids is not None else {}
+        self.season_ids = season_ids if season_ids is not None else {}
+        # (st_dev, st_ino) aller bereits durchsuchten Verzeichnisse (Schutz vor Symlink-Schleifen)
+        self.visited_dirs = set()
+        # Für den Abgleich: alle gesehenen Verzeichnisse und Videodateien sowie Verzeichnisse,
+        # deren Inhalt nicht vollständig gelesen werden konnte
+        self.seen_dirs = set()
+        self.seen_files = set()
+        self.incomplete_dirs = []
+        # Pfade eingefügter Episoden, deren ID nach dem Festschreiben nachgeladen wird (nur ingest_paths)
+        self.inserted_paths = None
+    
+    def moved_from(self, fingerprint):
+        """
+        Sucht zu einem Fingerabdruck eine archivierte Datei, die nicht mehr existiert
+        (verschoben oder umbenannt), und reserviert sie für den Aufrufer, damit zwei Kopien
+        nicht dieselbe Zeile übernehmen. Gibt ihren Pfad zurück oder None.
+        """
+        if not fingerprint or self.fingerprints is None:
+            return None
+        with self.lock:
+            candidates = [path for path in self._paths_by_fingerprint.get(fingerprint, ())
+                          if path in self.known_files and path not in self._claimed_moves]
+        # Existenzprüfung ohne Sperre, sie kann auf Netzlaufwerken dauern
+        for path in candidates:
+            if os.path.exists(path):
+                continue
+            with self.lock:
+                if path in self.known_files and path not in self._claimed_moves:
+                    self._claimed_moves.add(path)
+                    return path
+        return None
+    
+    def remember_fingerprint(self, path, fingerprint):
+        if not fingerprint or self.fingerprints is None:
+            return
+        with self.lock:
+            self.fingerprints[path] = fingerprint
+            self._paths_by_fingerprint.setdefault(fingerprint, []).append(path)
+    
+    def remember_file(self, path, episode_id, file_size, file_mtime):
+        """
+        Vermerkt eine archivierte Datei mit Größe und Änderungszeit in known_files.
+        """
+        with self.lock:
+            self.known_files[path] = (episode_id, file_size, file_mtime)
+    
+    def move_file(self, old_path, path, file_stat):
+        """
+        Überträgt Eintrag und Fingerabdruck einer verschobenen Datei auf ihren neuen Pfad.
+        Gibt die ID der Episode zurück.
+        """
+        with self.lock:
+            episode_id = self.known_files.pop(old_path)[0]
+            self._claimed_moves.discard(old_path)
+            self.known_files[path] = (episode_id, file_stat.st_size, int(file_stat.st_mtime))
+            if self.fingerprints is not None:
+                fingerprint = self.fingerprints.pop(old_path, None)
+                if fingerprint:
+                    self.fingerprints[path] = fingerprint
+                    self._paths_by_fingerprint.setdefault(fingerprint, []).append(path)
+        return episode_id
+
+def list_directory(path):
+    """
+    Liest ein Verzeichnis mit os.scandir ein und trennt Dateien und Unterverzeichnisse.
+    Der Dateityp stammt aus dem Verzeichniseintrag selbst (d_type), sodass dafür
+    kein stat-Aufruf nötig ist; nur Symlinks müssen aufgelöst werden.
+    Die Einträge werden nach Namen sortiert, damit die Scan-Reihenfolge stabil ist.
+    Lesefehler (OSError) werden an den Aufrufer weitergegeben.
+    """
+    files = []
+    directories = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            WALK_STATS['entries'] += 1
+            if entry.is_symlink():
+                WALK_STATS['stat_calls'] += 1
+            if entry.is_dir():
+                directories.append(entry)
+            elif entry.is_file():
+                files.append(entry)
+    
+    files.sort(key=lambda entry: entry.name)
+    directories.sort(key=lambda entry: entry.name)
+    return files, directories
+
+def scan_directory_recursive(connection, path, anime_id=None, season_id=None, depth=0, context=None):
     """
     Durchsucht das Verzeichnis rekursiv nach Animes, Staffeln und Episoden.
+    Verzeichnissuche, Metadatenextraktion (im Executor des Kontexts) und Datenbankzugriffe
+    laufen als überlappende Stufen der Ingest-Pipeline; die Datenbankzugriffe erfolgen
+    dabei in der Reihenfolge des Scans in einem einzigen Thread.
+    Dateien, die laut context.known_files unverändert sind, werden nicht erneut analysiert.
+    """
+    context = context or ScanContext()
+    run_scan_pipeline(connection, discover_entries(path, anime_id, season_id, depth, context), context)
+
+def run_scan_pipeline(connection, source, context):
+    """
+    Führt die Scan-Pipeline für eine Quelle (discover_entries oder discover_roots) aus.
+    """
+    # Ohne übergebenen Writer schreibt dieser Aufruf selbst und schließt den Writer am Ende
+    owns_writer = context.writer is None
+    if owns_writer:
+        context.writer = BatchWriter(connection, stats=STATS)
+    cursor = connection.cursor(dictionary=True)
+    try:
+        run_pipeline(source,
+                     lambda item: extract_scan_item(item, context),
+                     lambda item, result: persist_scan_item(cursor, context, item, result),
+                     executor=context.executor, description="Scan")
+    finally:
+        cursor.close()
+        if owns_writer:
+            context.writer.close()
+            context.writer = None
+
+def discover_entries(path, anime_key, season_key, depth, context):
+    """
+    Quelle der Scan-Pipeline: durchsucht ein Verzeichnis rekursiv und liefert die
+    anzulegenden Animes und Staffeln sowie neue und geänderte Videodateien als Tupel:
+    
+        ('anime', name, verzeichnis)
+        ('season', anime, name, staffelnummer, verzeichnis)
+        ('mtime', episode_id, änderungszeit)
+        ('fingerprint', episode_id, pfad, stat)   Fingerabdruck einer unveränderten Episode nachtragen
+        ('episode', pfad, stat, dateistatus, anime, staffel, episodennummer)
+        ('checkpoint', verzeichnis)   nach jedem vollständig durchsuchten Anime (nur mit Journal)
+    
+    Anime und Staffel werden über ihr Verzeichnis (oder eine bereits bekannte ID)
+    angegeben, die IDs löst erst persist_scan_item auf. Staffel None bedeutet eine
+    Episode direkt im Anime-Verzeichnis (Standard-Staffel).
     """
     if depth > MAX_RECURSION_DEPTH:
         logging.warning(f"Maximale Rekursionstiefe ({MAX_RECURSION_DEPTH}) erreicht bei: {path}")
+        context.incomplete_dirs.append(path)
         return
     
-    cursor = connection.cursor(dictionary=True)
-    path_obj = Path(path)
-    
-    # Alle Dateien im aktuellen Verzeichnis überprüfen
-    for item in path_obj.iterdir():
-        if item.is_file() and is_video_file(item.name):
-            # Wenn wir uns in einem Staffelverzeichnis befinden
-            if season_id:
-                process_episode(cursor, connection, season_id, str(item))
-            # Wenn wir uns in einem Anime-Verzeichnis befinden, erstelle eine Standard-Staffel
-            elif anime_id:
-                cursor.execute("""
-                    INSERT IGNORE INTO seasons (anime_id, name, season_number, directory_path) 
-                    VALUES (%s, %s, %s, %s)
-                """, (anime_id, "Staffel 1", 1, str(path_obj)))
-                connection.commit()
-                
-                cursor.execute("SELECT id FROM seasons WHERE anime_id = %s AND name = 'Staffel 1'", (anime_id,))
-                season_result = cursor.fetchone()
-                
-                if season_result:
-                    if cursor.rowcount > 0:
-                        STATS['seasons'] += 1
-                    process_episode(cursor, connection, season_result['id'], str(item))
+    # Verzeichnisse, die über Symlinks mehrfach erreichbar sind, nur einmal durchsuchen
+    try:
+        with METRICS.timed('walk'):
+            dir_stat = os.stat(path)
+            WALK_STATS['stat_calls'] += 1
+            dir_key = (dir_stat.st_dev, dir_stat.st_ino)
+            if dir_key in context.visited_dirs:
+                logging.warning(f"Verzeichnis bereits durchsucht (Symlink-Schleife?), überspringe: {path}")
+                return
+            context.visited_dirs.add(dir_key)
+            files, directories = list_directory(path)
+    except OSError as e:
+        logging.error(f"Fehler beim Lesen des Verzeichnisses {path}: {e}")
+        context.incomplete_dirs.append(path)
+        return
+    context.seen_dirs.add(path)
+    known_files = context.known_files
+    # Gemeinsamer Titel der Videodateien für die Episodennummern, erst bei Bedarf bestimmt
+    title_prefix = None
+    
+    # Videodateien im aktuellen Verzeichnis, nur relevant innerhalb eines Animes
+    for entry in files:
+        if anime_key is None:
+            continue
+        if budget_exhausted():
+            context.interrupted = True
+            return
+        if not is_video_file(entry.name):
+            STATS['skipped_files'] += 1
             continue
         
-        # Wenn es sich um ein Verzeichnis handelt
-        if item.is_dir():
-            dir_name = item.name
-            
-            # Falls kein Anime erkannt wurde, ist dies möglicherweise ein Anime
-            if not anime_id:
-                try:
-                    cursor.execute("INSERT IGNORE INTO animes (name, directory_path) VALUES (%s, %s)",
-                                  (dir_name, str(item)))
-                    connection.commit()
-                    
-                    cursor.execute("SELECT id FROM animes WHERE directory_path = %s", (str(item),))
-                    anime_result = cursor.fetchone()
-                    
-                    if anime_result:
-                        if cursor.rowcount > 0:
-                            STATS['animes'] += 1
-                            logging.info(f"Anime hinzugefügt: {dir_name}")
-                        
-                        # Rekursiver Aufruf mit dem neuen Anime
-                        scan_directory_recursive(connection, str(item), anime_id=anime_result['id'], depth=depth+1)
-                except Error as e:
-                    logging.error(f"Fehler beim Hinzufügen des Animes {dir_name}: {e}")
-            
-            # Falls ein Anime erkannt wurde, ist dies möglicherweise eine Staffel
-            elif anime_id and not season_id:
-                season_number = extract_season_number(dir_name)
-                
-                try:
-                    cursor.execute("""
-                        INSERT IGNORE INTO seasons (anime_id, name, season_number, directory_path) 
-                        VALUES (%s, %s, %s, %s)
-                    """, (anime_id, dir_name, season_number, str(item)))
-                    connection.commit()
-                    
-                    cursor.execute("SELECT id FROM seasons WHERE directory_path = %s", (str(item),))
-                    season_result = cursor.fetchone()
-                    
-                    if season_result:
-                        if cursor.rowcount > 0:
-                            STATS['seasons'] += 1
-                            logging.info(f"Staffel hinzugefügt: {dir_name} (Staffel {season_number if season_number else 'unbekannt'})")
-                        
-                        # Rekursiver Aufruf mit der neuen Staffel
-                        scan_directory_recursive(connection, str(item), anime_id=anime_id, season_id=season_result['id'], depth=depth+1)
-                except Error as e:
-                    logging.error(f"Fehler beim Hinzufügen der Staffel {dir_name}: {e}")
-            
-            # Wenn sowohl Anime als auch Staffel erkannt wurden, könnte es eine Unterordnerstruktur sein
-            # (z.B. für Extramaterial) - wir durchsuchen es trotzdem
-            elif anime_id and season_id:
-                scan_directory_recursive(connection, str(item), anime_id=anime_id, season_id=season_id, depth=depth+1)
+        episode_path = entry.path
+        context.seen_files.add(episode_path)
+        # Der stat-Aufruf wird im DirEntry zwischengespeichert und für die Episode wiederverwendet
+        with METRICS.timed('stat'):
+            file_stat = entry.stat()
+        WALK_STATS['stat_calls'] += 1
+        WALK_STATS['video_files'] += 1
+        file_state = classify_file(known_files, episode_path, file_stat)
+        
+        if file_state in (FILE_UNCHANGED, FILE_MTIME_MISSING):
+            STATS['unchanged_files'] += 1
+            if file_state == FILE_MTIME_MISSING:
+                # Gleiche Größe, Änderungszeit nur nachtragen statt neu zu analysieren
+                yield ('mtime', known_files[episode_path][0], int(file_stat.st_mtime))
+            if CONTENT_FINGERPRINT and context.fingerprints is not None and episode_path not in context.fingerprints:
+                # Episode aus der Zeit vor den Fingerabdrücken: einmalig nachtragen
+                yield ('fingerprint', known_files[episode_path][0], episode_path, file_stat)
+        else:
+            if title_prefix is None:
+                title_prefix = common_title_prefix([item.name for item in files if is_video_file(item.name)])
+            yield ('episode', episode_path, file_stat, file_state, anime_key, season_key,
+                   extract_episode_number(entry.name, title_prefix))
     
-    cursor.close()
+    # Alle Unterverzeichnisse überprüfen
+    for item in directories:
+        dir_name = item.name
+        dir_path = item.path
+        if context.interrupted or budget_exhausted():
+            context.interrupted = True
+            return
+        
+        # Falls kein Anime erkannt wurde, ist dies möglicherweise ein Anime
+        if anime_key is None:
+            yield from discover_anime(dir_name, dir_path, depth + 1, context)
+        
+        # Falls ein Anime erkannt wurde, ist dies möglicherweise eine Staffel
+        elif season_key is None:
+            yield ('season', anime_key, dir_name, extract_season_number(dir_name), dir_path)
+            yield from discover_entries(dir_path, anime_key, dir_path, depth + 1, context)
+        
+        # Wenn sowohl Anime als auch Staffel erkannt wurden, könnte es eine Unterordnerstruktur sein
+        # (z.B. für Extramaterial) - wir durchsuchen es trotzdem
+        else:
+            yield from discover_entries(dir_path, anime_key, season_key, depth + 1, context)
 
-def scan_directory(connection):
+ScanResult = namedtuple('ScanResult', 'media_info fingerprint moved_from')
+
+def discover_anime(anime_name, dir_path, depth, context):
     """
-    Durchsucht das Medienverzeichnis nach Animes, Staffeln und Episoden.
-    Verwendet die rekursive Suchfunktion.
+    Liefert ein Anime-Verzeichnis samt Inhalt für discover_entries, sofern es nicht
+    bereits abgeschlossen ist (--resume) oder einer anderen Instanz gehört (--shard).
     """
-    if not os.path.exists(MEDIA_PATH):
-        logging.error(f"Fehler: Der Pfad {MEDIA_PATH} existiert nicht.")
+    if context.journal and dir_path in context.journal.completed_animes:
+        # In einem früheren Lauf abgeschlossen (--resume); vom Abgleich ausnehmen
+        context.seen_dirs.add(dir_path)
+        context.incomplete_dirs.append(dir_path)
+        return
+    if context.leases and not context.leases.claim(dir_path):
+        # Wird von einer anderen Instanz bearbeitet (--shard); vom Abgleich ausnehmen
+        context.seen_dirs.add(dir_path)
+        context.incomplete_dirs.append(dir_path)
         return
+    yield ('anime', anime_name, dir_path)
+    yield from discover_entries(dir_path, dir_path, None, depth, context)
+    if (context.journal or context.leases) and not context.interrupted:
+        yield ('checkpoint', dir_path)
+
+def discover_roots(roots, context):
+    """
+    Quelle der Scan-Pipeline über alle Medienverzeichnisse: die Anime-Verzeichnisse werden
+    nach ihrem Gerät (st_dev, bei Symlinks das des Ziels) gruppiert, jedes Gerät wird für
+    sich in Namensreihenfolge durchsucht, und die Geräte wechseln sich Element für Element
+    ab. So liegen Dateien aller Platten gleichzeitig in der Pipeline und können in den
+    Gerätespuren der Extraktion (DeviceLanes) parallel gelesen werden.
+    Liefert dieselben Tupel wie discover_entries.
+    """
+    devices = {}
+    for root in roots:
+        try:
+            with METRICS.timed('walk'):
+                root_stat = os.stat(root)
+                WALK_STATS['stat_calls'] += 1
+                root_key = (root_stat.st_dev, root_stat.st_ino)
+                if root_key in context.visited_dirs:
+                    logging.warning(f"Verzeichnis bereits durchsucht (Symlink-Schleife?), überspringe: {root}")
+                    continue
+                context.visited_dirs.add(root_key)
+                _, directories = list_directory(root)
+        except OSError as e:
+            logging.error(f"Fehler beim Lesen des Verzeichnisses {root}: {e}")
+            context.incomplete_dirs.append(root)
+            continue
+        context.seen_dirs.add(root)
+        for entry in directories:
+            try:
+                device = entry.stat().st_dev
+                WALK_STATS['stat_calls'] += 1
+            except OSError:
+                device = root_stat.st_dev
+            devices.setdefault(device, []).append(entry)
     
-    logging.info(f"Starte die Archivierung von Anime-Daten aus: {MEDIA_PATH}")
-    logging.info(f"Maximale Rekursionstiefe: {MAX_RECURSION_DEPTH}")
+    if len(devices) > 1:
+        logging.info(f"Anime-Verzeichnisse auf {len(devices)} Geräten: " + ", ".join(
+            f"{format_device(device)} ({len(entries)})" for device, entries in devices.items()))
     
-    # Starte den rekursiven Scan vom Hauptverzeichnis aus
-    scan_directory_recursive(connection, MEDIA_PATH)
+    def walk_device(entries):
+        for entry in entries:
+            if context.interrupted or budget_exhausted():
+                context.interrupted = True
+                return
+            yield from discover_anime(entry.name, entry.path, 1, context)
     
-    # Alte Methode als Backup, falls die rekursive Methode Probleme hat
-    cursor = connection.cursor(dictionary=True)
-    anime_dirs = [d for d in os.listdir(MEDIA_PATH) if os.path.isdir(os.path.join(MEDIA_PATH, d))]
-    logging.info(f"Verarbeite {len(anime_dirs)} mögliche Anime-Verzeichnisse auf oberster Ebene...")
+    yield from interleave([walk_device(entries) for entries in devices.values()])
+
+def scan_item_device(item):
+    """
+    Gerät der Datei eines Scan-Elements aus dem bereits vorliegenden stat (für DeviceLanes).
+    """
+    if item[0] == 'episode':
+        return item[2].st_dev
+    if item[0] == 'fingerprint':
+        return item[3].st_dev
+    return None
+
+def extract_scan_item(item, context=None):
+    """
+    Extraktionsstufe der Scan-Pipeline: Fingerabdruck und Metadaten für neue und geänderte
+    Episoden als ScanResult. Passt der Fingerabdruck einer neuen Datei zu einer verschwundenen
+    archivierten Datei, entfällt die Analyse; moved_from ist dann deren Pfad.
+    """
+    kind = item[0]
+    if kind == 'fingerprint':
+        return scan_fingerprint(item[2], item[3].st_size)
+    if kind != 'episode':
+        return None
+    _, episode_path, file_stat, file_state = item[:4]
+    fingerprint = scan_fingerprint(episode_path, file_stat.st_size)
+    if file_state == FILE_NEW and context is not None:
+        moved_from = context.moved_from(fingerprint)
+        if moved_from:
+            return ScanResult(None, fingerprint, moved_from)
+    return ScanResult(cached_media_info(episode_path, file_stat), fingerprint, None)
+
+def lookup_directory_id(ids, key):
+    """
+    Löst ein Anime- oder Staffelverzeichnis aus discover_entries zur ID auf.
+    """
+    return key if isinstance(key, int) else ids.get(key)
+
+EPISODE_MOVE_UPDATE = """
+    UPDATE episodes SET season_id = %s, name = %s, episode_number = %s, file_path = %s,
+                        file_extension = %s, file_mtime = %s
+    WHERE id = %s
+"""
+
+def persist_scan_item(cursor, context, item, result):
+    """
+    Persistenzstufe der Scan-Pipeline: legt Animes und Staffeln an und merkt
+    Episoden zum gebündelten Schreiben vor. Elemente eines Animes oder einer Staffel,
+    deren ID nicht ermittelt werden konnte, werden übersprungen.
+    Verschobene Dateien übernehmen die Zeile (und damit die Metadaten) ihres alten Pfads.
+    """
+    writer = context.writer
+    kind = item[0]
+    
+    if kind == 'checkpoint':
+        # Anime vollständig vorgemerkt, abgeschlossen ist er mit dem nächsten Commit
+        if context.journal:
+            context.journal.complete_anime(item[1])
+            writer.after_commit(context.journal.save)
+        if context.leases:
+            context.leases.complete(item[1])
+            writer.after_commit(context.leases.flush)
     
-    for anime_name in tqdm(anime_dirs, desc="Verarbeite Top-Level Animes"):
-        anime_path = os.path.join(MEDIA_PATH, anime_name)
+    elif kind == 'anime':
+        _, anime_name, dir_path = item
+        try:
+            ensure_anime(cursor, context, anime_name, dir_path)
+        except Error as e:
+            logging.error(f"Fehler beim Hinzufügen des Animes {anime_name}: {e}")
+    
+    elif kind == 'season':
+        _, anime_key, season_name, season_number, dir_path = item
+        anime_id = lookup_directory_id(context.anime_ids, anime_key)
+        if not anime_id:
+            return
+        try:
+            ensure_season(cursor, context, anime_id, season_name, season_number, dir_path)
+        except Error as e:
+            logging.error(f"Fehler beim Hinzufügen der Staffel {season_name}: {e}")
+    
+    elif kind == 'mtime':
+        _, episode_id, file_mtime = item
+        writer.add("UPDATE episodes SET file_mtime = %s WHERE id = %s", (file_mtime, episode_id), prepared=True)
+    
+    elif kind == 'fingerprint':
+        _, episode_id, episode_path, _ = item
+        if result:
+            writer.add("UPDATE episodes SET content_fingerprint = %s WHERE id = %s", (result, episode_id),
+                       stats_key='fingerprinted_files', prepared=True)
+            context.remember_fingerprint(episode_path, result)
+    
+    else:
+        _, episode_path, file_stat, file_state, anime_key, season_key, episode_number = item
+        media_info, fingerprint, moved_from = result
+        # Geänderte Datei: vorhandene Episode mit den neuen Metadaten aktualisieren
+        if file_state == FILE_CHANGED:
+            if not media_info:
+                # Extraktion fehlgeschlagen (z.B. Datei noch in Arbeit): vorhandene Metadaten
+                # behalten, Größe und Änderungszeit bleiben alt, damit der nächste Lauf es erneut versucht
+                logging.warning(f"Geänderte Episode nicht aktualisiert, Extraktion fehlgeschlagen: "
+                                f"{os.path.basename(episode_path)}")
+                return
+            episode_id = context.known_files[episode_path][0]
+            writer.add(EPISODE_METADATA_STAGED,
+                       episode_metadata_params(episode_id, media_info, file_stat),
+                       stats_key='changed_files')
+            context.remember_file(episode_path, episode_id, file_stat.st_size, int(file_stat.st_mtime))
+            if fingerprint:
+                writer.add("UPDATE episodes SET content_fingerprint = %s WHERE id = %s", (fingerprint, episode_id),
+                           prepared=True)
+                context.remember_fingerprint(episode_path, fingerprint)
+            logging.info(f"Geänderte Episode zum Aktualisieren vorgemerkt: {os.path.basename(episode_path)}")
+            return
         
-        # Anime zur Datenbank hinzufügen
+        anime_id = lookup_directory_id(context.anime_ids, anime_key)
+        if not anime_id:
+            return
+        if season_key is not None:
+            season_id = lookup_directory_id(context.season_ids, season_key)
+        else:
+            # Episode im Anime-Verzeichnis: Standard-Staffel, einmal je Verzeichnis angelegt
+            try:
+                season_id = ensure_season(cursor, context, anime_id, "Staffel 1", 1, os.path.dirname(episode_path))
+            except Error as e:
+                logging.error(f"Fehler beim Hinzufügen der Staffel Staffel 1 für {os.path.dirname(episode_path)}: {e}")
+                return
+        
+        if not season_id:
+            return
+        if moved_from and moved_from in context.known_files:
+            move_episode(writer, context, moved_from, episode_path, season_id, file_stat, episode_number)
+            return
+        if moved_from:
+            # Alte Zeile nicht mehr vorhanden: ohne Metadaten einfügen, statt hier im Datenbank-Thread
+            # zu analysieren; die anschließende Metadatenaktualisierung holt sie nach
+            logging.info(f"Verschiebequelle {moved_from} nicht mehr archiviert, Metadaten folgen: "
+                         f"{os.path.basename(episode_path)}")
+        insert_episode(writer, season_id, episode_path, media_info, file_stat, episode_number, fingerprint)
+        context.remember_fingerprint(episode_path, fingerprint)
+        if context.inserted_paths is not None:
+            context.inserted_paths.append(episode_path)
+
+def move_episode(writer, context, old_path, episode_path, season_id, file_stat, episode_number):
+    """
+    Hängt die Episode einer verschwundenen Datei an ihren neuen Pfad um, ohne sie erneut
+    zu analysieren. Der alte Pfad gilt danach nicht mehr als archiviert und wird beim
+    Abgleich nicht gelöscht.
+    """
+    episode_id = context.move_file(old_path, episode_path, file_stat)
+    episode_name = os.path.basename(episode_path)
+    writer.add(EPISODE_MOVE_UPDATE, (
+        season_id, episode_name, episode_number, episode_path, os.path.splitext(episode_path)[1],
+        int(file_stat.st_mtime), episode_id
+    ), stats_key='moved_files', prepared=True)
+    logging.info(f"Verschobene Episode erkannt: {old_path} -> {episode_path}")
+
+def in_directories(path, directories):
+    """
+    Prüft, ob path in einem der Verzeichnisse liegt.
+    """
+    return any(path.startswith(directory.rstrip(os.sep) + os.sep) for directory in directories)
+
+def delete_rows(cursor, table, ids, condition=""):
+    """
+    Löscht Zeilen anhand ihrer IDs in Blöcken von RECONCILE_CHUNK_SIZE.
+    Gibt die Anzahl gelöschter Zeilen zurück.
+    """
+    ids = sorted(ids)
+    deleted = 0
+    for start in range(0, len(ids), RECONCILE_CHUNK_SIZE):
+        chunk = ids[start:start + RECONCILE_CHUNK_SIZE]
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(chunk))}){condition}", tuple(chunk))
+        deleted += max(cursor.rowcount, 0)
+    return deleted
+
+def excessive_deletion(known_paths, vanished_files, roots, max_delete_ratio):
+    """
+    Prüft je Medienverzeichnis, ob mehr als max_delete_ratio seiner Episoden verschwunden
+    sind (z.B. eine nicht eingehängte Platte). Gibt (verzeichnis, verschwunden, bekannt)
+    des ersten betroffenen Verzeichnisses zurück, sonst None.
+    """
+    for root in roots:
+        vanished = sum(1 for path in vanished_files if in_directories(path, [root]))
+        known = sum(1 for path in known_paths if in_directories(path, [root]))
+        if vanished and vanished > max_delete_ratio * known:
+            return root, vanished, known
+    return None
+
+def reconcile_deleted_files(connection, context, root=None, max_delete_ratio=None):
+    """
+    Gleicht nach einem vollständigen Scan die gesehenen Dateien und Verzeichnisse mit dem
+    vorab geladenen Datenbankstand ab (Mengendifferenz, kein stat je Zeile) und löscht
+    Episoden verschwundener Dateien sowie danach leere Staffeln und Animes verschwundener
+    Verzeichnisse. Verschobene Dateien mit bekanntem Fingerabdruck hat der Scan bereits
+    auf den neuen Pfad umgehängt, alle anderen wurden dort neu eingefügt.
+    
+    Dateien unterhalb von Verzeichnissen, die nicht gelesen werden konnten, bleiben erhalten.
+    Würde in einem Medienverzeichnis (ohne root: alle aus MEDIA_PATH) mehr als
+    max_delete_ratio der Episoden gelöscht (z.B. weil die Freigabe bzw. Platte nicht
+    eingehängt ist), wird nichts gelöscht.
+    """
+    roots = [root] if root else media_roots()
+    max_delete_ratio = RECONCILE_MAX_DELETE_RATIO if max_delete_ratio is None else max_delete_ratio
+    if context.known_files is None:
+        return 0
+    
+    def vanished(paths, seen):
+        return [path for path in paths - seen
+                if in_directories(path, roots) and not in_directories(path, context.incomplete_dirs)]
+    
+    vanished_files = vanished(context.known_files.keys(), context.seen_files)
+    if not vanished_files:
+        logging.info("Abgleich: keine verschwundenen Dateien.")
+        return 0
+    
+    excessive = excessive_deletion(context.known_files, vanished_files, roots, max_delete_ratio)
+    if excessive:
+        root, vanished_count, known_count = excessive
+        logging.error(f"Abgleich abgebrochen: {vanished_count} von {known_count} Episoden wären "
+                      f"gelöscht worden (mehr als {max_delete_ratio:.0%}). Ist {root} vollständig eingehängt? "
+                      f"Mit --force-reconcile trotzdem löschen.")
+        return 0
+    
+    cursor = connection.cursor()
+    try:
+        removed = delete_rows(cursor, "episodes", [context.known_files[path][0] for path in vanished_files])
+        # Staffeln und Animes nur löschen, wenn ihr Verzeichnis fehlt und keine Episoden mehr daran hängen
+        removed_seasons = delete_rows(
+            cursor, "seasons", [context.season_ids[path] for path in vanished(context.season_ids.keys(), context.seen_dirs)],
+            " AND NOT EXISTS (SELECT 1 FROM episodes WHERE episodes.season_id = seasons.id)")
+        removed_animes = delete_rows(
+            cursor, "animes", [context.anime_ids[path] for path in vanished(context.anime_ids.keys(), context.seen_dirs)],
+            " AND NOT EXISTS (SELECT 1 FROM seasons WHERE seasons.anime_id = animes.id)")
+        connection.commit()
+    finally:
+        cursor.close()
+    
+    for path in vanished_files:
+        del context.known_files[path]
+    STATS['removed_files'] += removed
+    logging.info(f"Abgleich: {removed} Episoden, {removed_seasons} Staffeln und {removed_animes} Animes "
+                 f"verschwundener Dateien entfernt.")
+    return removed
+
+def log_walk_statistics():
+    """
+    Protokolliert, wie viele stat-Aufrufe der scandir-basierte Durchlauf gegenüber
+    dem früheren Path.iterdir-Scan eingespart hat. Dieser benötigte je Eintrag
+    einen Aufruf für is_file(), je Nicht-Videodatei einen weiteren für is_dir()
+    und je Episode einen für os.path.getsize().
+    """
+    entries = WALK_STATS['entries']
+    legacy_calls = entries + (entries - WALK_STATS['video_files']) + WALK_STATS['video_files']
+    saved_calls = legacy_calls - WALK_STATS['stat_calls']
+    logging.info(f"Verzeichniseinträge: {entries} | stat-Aufrufe: {WALK_STATS['stat_calls']} "
+                 f"(bisher ca. {legacy_calls}, eingespart: {saved_calls})")
+
+def scan_directory(connection, workers=None, journal=None, leases=None):
+    """
+    Durchsucht die Medienverzeichnisse nach Animes, Staffeln und Episoden.
+    Verwendet die rekursive Suchfunktion in einem einzigen Durchlauf, jedes
+    Verzeichnis wird dabei genau einmal gelesen. Nicht vorhandene Medienverzeichnisse
+    werden übersprungen und beim Abgleich nicht als gelöscht behandelt.
+    Mit journal werden abgeschlossene Animes vermerkt und beim Fortsetzen übersprungen.
+    Mit leases (LeaseManager) werden nur Animes durchsucht, die diese Instanz beanspruchen konnte.
+    Gibt False zurück, wenn der Scan wegen des Zeitbudgets vorzeitig beendet wurde.
+    """
+    roots = media_roots()
+    missing = [root for root in roots if not os.path.exists(root)]
+    for root in missing:
+        logging.error(f"Fehler: Der Pfad {root} existiert nicht.")
+    if len(missing) == len(roots):
+        return True
+    if journal and journal.scan_complete:
+        logging.info("Scan bereits in einem früheren Lauf abgeschlossen (Checkpoint), überspringe.")
+        return True
+    
+    workers = workers or EXTRACTION_WORKERS
+    logging.info(f"Starte die Archivierung von Anime-Daten aus: {', '.join(roots)}")
+    logging.info(f"Maximale Rekursionstiefe: {MAX_RECURSION_DEPTH}")
+    logging.info(f"Parallele Extraktions-Worker: {workers}"
+                 + (f", höchstens {min(DEVICE_READERS, workers)} je Gerät" if DEVICE_READERS > 0 else ""))
+    if IO_BUDGET.limited:
+        logging.info(f"Lesebudget: {IO_BUDGET.rate / MB:g} MB/s, höchstens {IO_BUDGET.max_open_files} "
+                     f"Dateien gleichzeitig (0 = unbegrenzt)")
+    
+    # Bekannte Dateien vorab laden, damit unveränderte Dateien nicht erneut analysiert werden
+    fingerprints = {}
+    known_files = load_known_files(connection, fingerprints)
+    anime_ids, season_ids = load_directory_ids(connection)
+    
+    # Starte den rekursiven Scan von allen Medienverzeichnissen aus, eine Extraktionsspur je Gerät
+    with extraction_pool(workers, device_of=scan_item_device) as executor:
+        context = ScanContext(executor, known_files, anime_ids=anime_ids, season_ids=season_ids, journal=journal,
+                              leases=leases, fingerprints=fingerprints)
+        # Episoden fehlender Medienverzeichnisse (Platte nicht eingehängt) nicht löschen
+        context.incomplete_dirs.extend(missing)
+        if journal and journal.completed_animes:
+            logging.info(f"Setze Scan fort: {len(journal.completed_animes)} Animes bereits abgeschlossen.")
+        run_scan_pipeline(connection, discover_roots([root for root in roots if root not in missing], context), context)
+    log_walk_statistics()
+    
+    if context.interrupted:
+        # Nicht durchsuchte Animes dürfen nicht als verschwunden gelten
+        logging.warning("Zeitbudget aufgebraucht, Scan vorzeitig beendet.")
+        return False
+    if RECONCILE:
+        reconcile_deleted_files(connection, context)
+    if journal:
+        journal.finish_scan()
+    return True
+
+# Ereignismasken aus <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+INOTIFY_WATCH_MASK = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR
+INOTIFY_EVENT = struct.Struct('iIII')
+
+def walk_directories(root):
+    """
+    Liefert root und alle Unterverzeichnisse, jedes (auch über Symlinks) nur einmal.
+    """
+    visited = set()
+    pending = [root]
+    while pending:
+        path = pending.pop()
         try:
-            cursor.execute("INSERT IGNORE INTO animes (name, directory_path) VALUES (%s, %s)",
-                          (anime_name, anime_path))
-            connection.commit()
-            
-            cursor.execute("SELECT id FROM animes WHERE directory_path = %s", (anime_path,))
-            anime_result = cursor.fetchone()
+            dir_stat = os.stat(path)
+            if (dir_stat.st_dev, dir_stat.st_ino) in visited:
+                continue
+            visited.add((dir_stat.st_dev, dir_stat.st_ino))
+            with os.scandir(path) as entries:
+                subdirectories = [entry.path for entry in entries if entry.is_dir()]
+        except OSError as e:
+            logging.warning(f"Verzeichnis kann nicht überwacht werden: {path}: {e}")
+            continue
+        yield path
+        pending.extend(subdirectories)
+
+class InotifyWatcher:
+    """
+    Überwacht den Medienbaum mit inotify (über ctypes, ohne zusätzliche Abhängigkeit).
+    Jedes Verzeichnis erhält eine eigene Überwachung, neue Unterverzeichnisse werden
+    beim Anlegen automatisch hinzugefügt.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+        self._watches = {}
+        try:
+            self.add_tree(root)
+        except OSError:
+            self.close()
+            raise
+    
+    def add_tree(self, path):
+        """
+        Überwacht ein Verzeichnis samt aller Unterverzeichnisse.
+        """
+        for directory in walk_directories(path):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), INOTIFY_WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, f"inotify_add_watch({directory}): {os.strerror(error)}")
+            self._watches[wd] = directory
+    
+    def read_events(self, timeout):
+        """
+        Wartet höchstens timeout Sekunden auf Ereignisse und liefert die betroffenen Pfade.
+        Bei einem Überlauf der Ereigniswarteschlange wird das Wurzelverzeichnis selbst geliefert.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        
+        data = os.read(self._fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
             
-            if anime_result is None:
-                logging.warning(f"Konnte Anime {anime_name} nicht in der Datenbank finden nach dem Hinzufügen.")
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("inotify-Warteschlange übergelaufen, durchsuche den gesamten Medienbaum.")
+                paths.add(self.root)
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
                 continue
             
-            anime_id = anime_result['id']
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.add_tree(path)
+                    except OSError as e:
+                        logging.error(f"Fehler beim Überwachen von {path}: {e}")
+                    paths.add(path)
+            else:
+                paths.add(path)
+        return paths
+    
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher:
+    """
+    Ersatz für inotify (z.B. auf Netzlaufwerken): vergleicht in festen Abständen die
+    Änderungszeiten aller Verzeichnisse und meldet neue Einträge geänderter Verzeichnisse.
+    Dateien, die an Ort und Stelle überschrieben werden, erkennt erst der nächste vollständige Scan.
+    """
+    def __init__(self, root, interval=None):
+        self.root = root
+        self.interval = interval or WATCH_POLL_INTERVAL
+        self._directories = {}
+        self._next_poll = time.monotonic() + self.interval
+        self.add_tree(root)
+    
+    def add_tree(self, path):
+        """
+        Merkt sich Änderungszeit und Einträge eines Verzeichnisses samt Unterverzeichnissen.
+        """
+        for directory in walk_directories(path):
+            snapshot = self._snapshot(directory)
+            if snapshot:
+                self._directories[directory] = snapshot
+    
+    def _snapshot(self, directory):
+        try:
+            return os.stat(directory).st_mtime_ns, set(os.listdir(directory))
+        except OSError:
+            return None
+    
+    def read_events(self, timeout):
+        """
+        Wartet höchstens timeout Sekunden; ist das Abfrageintervall abgelaufen,
+        werden die neuen Einträge aller geänderten Verzeichnisse geliefert.
+        """
+        remaining = self._next_poll - time.monotonic()
+        if remaining > 0:
+            time.sleep(min(timeout, remaining))
+            return set()
+        self._next_poll = time.monotonic() + self.interval
+        
+        paths = set()
+        for directory, (mtime_ns, names) in list(self._directories.items()):
+            try:
+                current_mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self._directories[directory]
+                continue
+            if current_mtime_ns == mtime_ns:
+                continue
             
-            # Anime wurde hinzugefügt oder existiert bereits
-            if cursor.rowcount > 0:
-                STATS['animes'] += 1
+            snapshot = self._snapshot(directory)
+            if not snapshot:
+                continue
+            self._directories[directory] = snapshot
+            for name in snapshot[1] - names:
+                path = os.path.join(directory, name)
+                if os.path.isdir(path):
+                    self.add_tree(path)
+                paths.add(path)
+        return paths
+    
+    def close(self):
+        pass
+
+def create_watcher(root):
+    """
+    Erstellt einen inotify-Watcher und weicht auf Polling aus, wenn inotify
+    nicht verfügbar ist (z.B. Netzlaufwerke, erreichtes max_user_watches-Limit).
+    """
+    try:
+        watcher = InotifyWatcher(root)
+        logging.info(f"Überwache {root} mit inotify.")
+        return watcher
+    except (OSError, AttributeError) as e:
+        logging.warning(f"inotify nicht verfügbar ({e}), prüfe Verzeichnisse alle {WATCH_POLL_INTERVAL} Sekunden.")
+        return PollingWatcher(root)
+
+class Debouncer:
+    """
+    Hält gemeldete Pfade zurück, bis sie für delay Sekunden keine Ereignisse mehr
+    hatten und Größe und Änderungszeit unverändert sind (Datei fertig geschrieben).
+    """
+    def __init__(self, delay=None, clock=time.monotonic):
+        self.delay = WATCH_DEBOUNCE_SECONDS if delay is None else delay
+        self.clock = clock
+        self._pending = {}
+    
+    def __len__(self):
+        return len(self._pending)
+    
+    def _signature(self, path):
+        try:
+            path_stat = os.stat(path)
+        except OSError:
+            return None
+        return path_stat.st_size, path_stat.st_mtime_ns
+    
+    def touch(self, path):
+        """
+        Meldet ein Ereignis für path und startet die Wartezeit neu.
+        """
+        self._pending[path] = (self.clock() + self.delay, self._signature(path))
+    
+    def ready(self):
+        """
+        Liefert alle Pfade, deren Wartezeit abgelaufen ist und die sich seitdem nicht verändert haben.
+        """
+        now = self.clock()
+        ready_paths = []
+        for path, (deadline, signature) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            current = self._signature(path)
+            if current is None:
+                # Zwischenzeitlich gelöscht oder verschoben
+                del self._pending[path]
+            elif current != signature:
+                # Wird noch geschrieben
+                self._pending[path] = (now + self.delay, current)
+            else:
+                del self._pending[path]
+                ready_paths.append(path)
+        return ready_paths
+
+def resolve_path_ids(cursor, context, directory):
+    """
+    Bestimmt Anime und Staffel eines Verzeichnisses anhand seiner Lage unter einem der
+    Medienverzeichnisse (Medienverzeichnis/Anime/Staffel/...) und legt fehlende Einträge an.
+    Gibt (anime_id, season_id, depth) zurück, oder None außerhalb der Medienverzeichnisse.
+    """
+    root = containing_root(directory)
+    if root is None:
+        return None
+    relative_path = os.path.relpath(directory, root)
+    if relative_path == os.curdir:
+        return None, None, 0
+    parts = relative_path.split(os.sep)
+    if parts[0] == os.pardir:
+        return None
+    
+    anime_path = os.path.join(root, parts[0])
+    anime_id = ensure_anime(cursor, context, parts[0], anime_path)
+    if not anime_id or len(parts) == 1:
+        return anime_id, None, 1
+    
+    season_path = os.path.join(anime_path, parts[1])
+    season_id = ensure_season(cursor, context, anime_id, parts[1], extract_season_number(parts[1]), season_path)
+    return anime_id, season_id, len(parts)
+
+def ingest_paths(connection, paths, context):
+    """
+    Archiviert gezielt die gemeldeten Pfade über die Scan-Pipeline: neue Verzeichnisse
+    werden rekursiv durchsucht, neue Videodateien eingefügt (verschobene übernehmen ihre
+    alte Zeile) und geänderte Videodateien aktualisiert. Die Extraktion läuft im Executor
+    des Kontexts; eingefügte Episoden werden danach in context.known_files vermerkt, damit
+    spätere Ereignisse derselben Sitzung sie als bekannt erkennen.
+    """
+    connection.ping(reconnect=True)
+    cursor = connection.cursor(dictionary=True)
+    context.writer = BatchWriter(connection, stats=STATS)
+    context.visited_dirs = set()
+    context.inserted_paths = []
+    sources = []
+    try:
+        # Anime und Staffel vorab im Watcher-Thread auflösen, die Pipeline erhält nur Scan-Elemente
+        for path in sorted(paths):
+            if os.path.isdir(path):
+                ids = resolve_path_ids(cursor, context, path)
+                if ids is None:
+                    continue
+                anime_id, season_id, depth = ids
+                logging.info(f"Neues Verzeichnis erkannt: {path}")
+                sources.append(discover_entries(path, anime_id, season_id, depth, context))
+                continue
+            if not (is_video_file(path) and os.path.isfile(path)):
+                continue
             
-            # Suche nach Staffeln
-            for item in os.listdir(anime_path):
-                season_path = os.path.join(anime_path, item)
-                if os.path.isdir(season_path):
-                    season_name = item
-                    season_number = extract_season_number(season_name)
-                    
-                    # Staffel zur Datenbank hinzufügen
-                    cursor.execute("""
-                        INSERT IGNORE INTO seasons (anime_id, name, season_number, directory_path) 
-                        VALUES (%s, %s, %s, %s)
-                    """, (anime_id, season_name, season_number, season_path))
-                    connection.commit()
-                    
-                    cursor.execute("SELECT id FROM seasons WHERE directory_path = %s", (season_path,))
-                    season_result = cursor.fetchone()
-                    
-                    # Staffel wurde hinzugefügt oder existiert bereits
-                    if cursor.rowcount > 0 and season_result:
-                        STATS['seasons'] += 1
-                        season_id = season_result['id']
-                        
-                        # Suche nach Episoden
-                        for episode_file in os.listdir(season_path):
-                            episode_path = os.path.join(season_path, episode_file)
-                            if os.path.isfile(episode_path) and is_video_file(episode_file):
-                                episode_name = episode_file
-                                episode_number = extract_episode_number(episode_file)
-                                file_size = os.path.getsize(episode_path)
-                                _, file_extension = os.path.splitext(episode_path)
-                                
-                                # Episode zur Datenbank hinzufügen
-                                cursor.execute("""
-                                    INSERT IGNORE INTO episodes 
-                                    (season_id, name, episode_number, file_path, file_size, file_extension) 
-                                    VALUES (%s, %s, %s, %s, %s, %s)
-                                """, (season_id, episode_name, episode_number, episode_path, file_size, file_extension))
-                                connection.commit()
-                                
-                                # Episode wurde hinzugefügt oder existiert bereits
-                                if cursor.rowcount > 0:
-                                    STATS['episodes'] += 1
-                            else:
-                                STATS['skipped_files'] += 1
-                    
-                    # Suchen nach Episoden in Anime-Verzeichnis (für Animes mit nur einer Staffel)
-                    elif os.path.isfile(season_path) and is_video_file(item):
-                        # Erstelle eine Standard-Staffel für Animes ohne Staffelverzeichnis
-                        cursor.execute("""
-                            INSERT IGNORE INTO seasons (anime_id, name, season_number, directory_path) 
-                            VALUES (%s, %s, %s, %s)
-                        """, (anime_id, "Staffel 1", 1, anime_path))
-                        connection.commit()
-                        
-                        cursor.execute("SELECT id FROM seasons WHERE anime_id = %s AND name = 'Staffel 1'", (anime_id,))
-                        season_id = cursor.fetchone()['id']
-                        
-                        # Episode zur Datenbank hinzufügen
-                        episode_name = item
-                        episode_number = extract_episode_number(episode_name)
-                        file_size = os.path.getsize(season_path)
-                        _, file_extension = os.path.splitext(season_path)
-                        
-                        cursor.execute("""
-                            INSERT IGNORE INTO episodes 
-                            (season_id, name, episode_number, file_path, file_size, file_extension) 
-                            VALUES (%s, %s, %s, %s, %s, %s)
-                        """, (season_id, episode_name, episode_number, season_path, file_size, file_extension))
-                        connection.commit()
-                        
-                        if cursor.rowcount > 0:
-                            STATS['episodes'] += 1
-                            logging.info(f"Episode hinzugefügt: {episode_name}")
-                        else:
-                            STATS['skipped_files'] += 1
-                            logging.info(f"Episode übersprungen: {episode_name}")
-                    else:
-                        STATS['skipped_files'] += 1
-                        logging.info(f"Episode übersprungen: {episode_name}")
-                else:
-                    STATS['skipped_files'] += 1
-                    logging.info(f"Episode übersprungen: {episode_name}")
+            ids = resolve_path_ids(cursor, context, os.path.dirname(path))
+            if ids is None or not ids[0]:
+                continue
+            anime_id, season_id, _ = ids
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                # Zwischen Ereignis und stat wieder verschwunden (temporäre Datei, Umbenennung)
+                continue
+            file_state = classify_file(context.known_files, path, file_stat)
+            if file_state == FILE_UNCHANGED:
+                continue
+            if file_state == FILE_MTIME_MISSING:
+                # Wie discover_entries: gleiche Größe, nur die Änderungszeit nachtragen
+                episode_id = context.known_files[path][0]
+                sources.append([('mtime', episode_id, int(file_stat.st_mtime))])
+                context.remember_file(path, episode_id, file_stat.st_size, int(file_stat.st_mtime))
+                continue
+            # Ohne Staffel legt persist_scan_item die Standard-Staffel im Anime-Verzeichnis an
+            sources.append([('episode', path, file_stat, file_state, anime_id, season_id,
+                             extract_episode_number(os.path.basename(path)))])
+        
+        if sources:
+            run_scan_pipeline(connection, (item for source in sources for item in source), context)
+    finally:
+        context.writer.close()
+        context.writer = None
+        cursor.close()
+        inserted_paths = context.inserted_paths
+        context.inserted_paths = None
+    
+    # Neu eingefügte Episoden für spätere Ereignisse als bekannt vormerken
+    if inserted_paths:
+        cursor = connection.cursor()
+        for start in range(0, len(inserted_paths), 1000):
+            chunk = inserted_paths[start:start + 1000]
+            cursor.execute(f"SELECT id, file_path, file_size, file_mtime FROM episodes WHERE file_path IN ({', '.join(['%s'] * len(chunk))})",
+                           tuple(chunk))
+            for episode_id, file_path, file_size, file_mtime in cursor.fetchall():
+                context.remember_file(file_path, episode_id, file_size, file_mtime)
+        cursor.close()
+
+def watch_media_directory(connection, workers=None):
+    """
+    Überwacht die Medienverzeichnisse dauerhaft und archiviert neue oder geänderte Dateien,
+    sobald sie fertig geschrieben sind. Vor Beginn wird einmal vollständig gescannt, damit
+    Änderungen seit dem letzten Lauf nicht verloren gehen. Läuft bis zum Abbruch mit Strg+C.
+    """
+    roots = [root for root in media_roots() if os.path.exists(root)]
+    for root in set(media_roots()) - set(roots):
+        logging.error(f"Fehler: Der Pfad {root} existiert nicht.")
+    if not roots:
+        return
+    
+    # Überwachung vor dem Scan starten, damit Ereignisse währenddessen nicht verloren gehen
+    watcher = create_watcher(roots[0])
+    try:
+        for root in roots[1:]:
+            watcher.add_tree(root)
+        scan_directory(connection, workers)
+        
+        fingerprints = {}
+        known_files = load_known_files(connection, fingerprints)
+        anime_ids, season_ids = load_directory_ids(connection)
+        debouncer = Debouncer()
+        logging.info(f"Warte auf Änderungen in {', '.join(roots)} (Wartezeit für neue Dateien: {debouncer.delay} Sekunden)...")
+        
+        # Ein Extraktions-Pool für die ganze Sitzung, gemeldete Pfade laufen durch die Scan-Pipeline
+        with extraction_pool(workers, device_of=scan_item_device) as executor:
+            context = ScanContext(executor, known_files, anime_ids=anime_ids, season_ids=season_ids,
+                                  fingerprints=fingerprints)
+            while not budget_exhausted():
+                for path in watcher.read_events(timeout=1.0):
+                    if path in roots:
+                        # Ereignisse verloren: alle Medienverzeichnisse erneut durchsuchen
+                        for root in roots:
+                            debouncer.touch(root)
+                    elif os.path.isdir(path) or is_video_file(path):
+                        debouncer.touch(path)
+                
+                ready_paths = debouncer.ready()
+                if ready_paths:
+                    ingest_paths(connection, ready_paths, context)
+    finally:
+        watcher.close()
+
+def open_estimate_cache():
+    """
+    Öffnet eine vorhandene Cache-Datei für --estimate nur lesend; fehlt sie, wird sie nicht
+    angelegt und jede Datei gilt als nicht zwischengespeichert (None).
+    """
+    global _estimate_cache
+    if _estimate_cache is False:
+        _estimate_cache = None
+        if EXTRACTION_CACHE_PATH and os.path.exists(EXTRACTION_CACHE_PATH):
+            try:
+                _estimate_cache = ExtractionCache(EXTRACTION_CACHE_PATH, extractor_version=EXTRACTOR_VERSION,
+                                                  read_only=True)
+                atexit.register(_estimate_cache.close)
+            except sqlite3.Error as e:
+                logging.warning(f"Extraktions-Cache {EXTRACTION_CACHE_PATH} nicht lesbar: {e}")
+    return _estimate_cache
+
+def _cached_result_exists(file_path, file_stat, parse_mode):
+    """
+    Prüft, ob der Extraktions-Cache ein gültiges Ergebnis für die Datei hat (für --estimate).
+    """
+    cache = open_estimate_cache()
+    if cache is None:
+        return False
+    try:
+        return cache.get(file_stat or os.stat(file_path), parse_mode) is not None
+    except (sqlite3.Error, OSError):
+        return False
+
+def estimate_scan(connection, estimate):
+    """
+    Ermittelt die Arbeit eines Scans (--estimate), ohne Dateien zu analysieren oder in die
+    Datenbank zu schreiben: dieselbe Verzeichnissuche wie scan_directory, neue und geänderte
+    Dateien werden nur gezählt. Fingerabdrücke (neue und geänderte Dateien sowie Nachträge)
+    werden unabhängig vom Extraktions-Cache gezählt.
+    """
+    fingerprints = {}
+    known_files = load_known_files(connection, fingerprints)
+    anime_ids, season_ids = load_directory_ids(connection)
+    context = ScanContext(known_files=known_files, anime_ids=anime_ids, season_ids=season_ids,
+                          fingerprints=fingerprints)
+    # Verzeichnisse, für die persist_scan_item die Standard-Staffel anlegen würde
+    default_seasons = set()
+    start = time.perf_counter()
+    roots = [root for root in media_roots() if os.path.exists(root)]
+    for item in discover_roots(roots, context):
+        kind = item[0]
+        if kind == 'anime' and item[2] not in anime_ids:
+            estimate.add_rows('insert')
+        elif kind == 'season' and item[4] not in season_ids:
+            estimate.add_rows('insert')
+        elif kind == 'mtime':
+            estimate.add_rows('update')
+        elif kind == 'fingerprint':
+            estimate.add_rows('update')
+            estimate.add_fingerprint(item[2])
+        elif kind == 'episode':
+            _, episode_path, file_stat, file_state, _, season_key = item[:6]
+            estimate.add_rows('insert' if file_state == FILE_NEW else 'update')
+            directory = os.path.dirname(episode_path)
+            if (file_state == FILE_NEW and season_key is None and directory not in season_ids
+                    and directory not in default_seasons):
+                default_seasons.add(directory)
+                estimate.add_rows('insert')
+            if CONTENT_FINGERPRINT:
+                estimate.add_fingerprint(episode_path)
+            if _cached_result_exists(episode_path, file_stat, PARSE_MODE):
+                estimate.add_cached()
             else:
-                STATS['skipped_files'] += 1
-                logging.info(f"Episode übersprungen: {episode_name}")
-        except Error as e:
-            logging.error(f"Fehler bei der Verarbeitung von '{anime_name}': {e}")
+                estimate.add_file(episode_path)
+    estimate.walk_seconds += time.perf_counter() - start
+    if RECONCILE:
+        # Wie reconcile_deleted_files, einschließlich des Schutzes vor Massenlöschungen
+        vanished = [path for path in known_files.keys() - context.seen_files
+                    if in_directories(path, roots) and not in_directories(path, context.incomplete_dirs)]
+        if vanished and not excessive_deletion(known_files, vanished, roots, RECONCILE_MAX_DELETE_RATIO):
+            estimate.add_rows('delete', len(vanished))
+
+def estimate_update(connection, estimate, filter_path=None, reprocess_all=False, upgrade_fast=False):
+    """
+    Ermittelt die Arbeit einer Metadatenaktualisierung (--estimate) aus derselben Arbeitsliste
+    wie update_episodes_metadata (Prioritätsstufen, UPDATE_BUDGET), ohne zu analysieren.
+    """
+    conditions, params = update_conditions(filter_path, reprocess_all, upgrade_fast)
+    parse_mode = 'full' if upgrade_fast else PARSE_MODE
+    scheduler = RefreshScheduler(connection, conditions, params, page_size=UPDATE_PAGE_SIZE, budget=UPDATE_BUDGET)
+    scheduler.count()
+    start = time.perf_counter()
+    for _, file_path, _ in scheduler:
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
             continue
+        estimate.add_rows('update')
+        if _cached_result_exists(file_path, file_stat, parse_mode):
+            estimate.add_cached()
+        else:
+            estimate.add_file(file_path)
+    estimate.walk_seconds += time.perf_counter() - start
+    return parse_mode
+
+def finish_estimate(estimate, parse_mode=None, workers=None):
+    """
+    Analysiert die Stichprobe je Containertyp, protokolliert die Hochrechnung und gibt sie zurück.
+    """
+    estimate.sample(lambda file_path: extract_media_info(file_path, parse_mode),
+                    fingerprint=lambda file_path: content_fingerprint(file_path))
+    projection = estimate.project(workers=workers or EXTRACTION_WORKERS, io_rate=IO_BUDGET.rate,
+                                  batch_size=DB_BATCH_SIZE,
+                                  statements_per_batch={'update': StagedUpdate.STATEMENTS_PER_BATCH})
+    log_projection(projection)
+    return projection
+
+def estimate_run(connection, workers=None):
+    """
+    Schätzt einen vollständigen Archiver-Lauf (Scan und Metadatenaktualisierung wie in main).
+    """
+    projections = []
+    scan = RunEstimate("Scan")
+    for root in media_roots():
+        if not os.path.exists(root):
+            logging.error(f"Fehler: Der Pfad {root} existiert nicht.")
+    if any(os.path.exists(root) for root in media_roots()):
+        estimate_scan(connection, scan)
+        projections.append(finish_estimate(scan, workers=workers))
     
-    cursor.close()
+    update = RunEstimate("Metadatenaktualisierung")
+    estimate_update(connection, update)
+    projections.append(finish_estimate(update, workers=workers))
+    if PARSE_MODE == 'full':
+        upgrade = RunEstimate("Vollständige Analyse schnell erfasster Episoden")
+        estimate_update(connection, upgrade, upgrade_fast=True)
+        projections.append(finish_estimate(upgrade, 'full', workers=workers))
+    
+    total = sum(projection['wall_seconds'] for projection in projections)
+    logging.info(f"Geschätzte Gesamtdauer: {format_duration(total)}, gelesen "
+                 f"{format_bytes(sum(projection['bytes_read'] for projection in projections))}")
+    return projections
 
 def print_statistics(connection):
     """
@@ -1120,6 +2689,11 @@ def print_statistics(connection):
     logging.info(f"- Staffeln: {STATS['seasons']} {'(neu)' if STATS['seasons'] > 0 else '(keine neuen)'}")
     logging.info(f"- Episoden: {STATS['episodes']} {'(neu)' if STATS['episodes'] > 0 else '(keine neuen)'}")
     logging.info(f"- Übersprungene Dateien: {STATS['skipped_files']}")
+    logging.info(f"- Unveränderte Dateien (nicht erneut analysiert): {STATS['unchanged_files']}")
+    logging.info(f"- Geänderte Dateien (neu analysiert): {STATS['changed_files']}")
+    logging.info(f"- Entfernte Episoden (Datei verschwunden): {STATS['removed_files']}")
+    logging.info(f"- Verschobene Episoden (Metadaten übernommen): {STATS['moved_files']}")
+    logging.info(f"- Nachgetragene Fingerabdrücke: {STATS['fingerprinted_files']}")
     
     if top_animes:
         logging.info(f"\nTop 10 Animes mit den meisten Episoden:")
@@ -1138,16 +2712,123 @@ def print_statistics(connection):
     
     cursor.close()
 
+def write_run_report(path):
+    """
+    Schreibt den JSON-Laufbericht: Laufzeiten je Stufe sowie Zähler und Einstellungen des Laufs.
+    """
+    try:
+        METRICS.write_report(
+            path,
+            media_path=MEDIA_PATH,
+            settings={'parse_mode': PARSE_MODE, 'workers': EXTRACTION_WORKERS, 'device_readers': DEVICE_READERS,
+                      'batch_size': DB_BATCH_SIZE,
+                      'commit_interval': DB_COMMIT_INTERVAL, 'native_headers': NATIVE_HEADERS,
+                      'extraction_cache': bool(EXTRACTION_CACHE_PATH)},
+            io=IO_BUDGET.summary(),
+            stats=dict(STATS),
+            walk=dict(WALK_STATS),
+            budget_exhausted=budget_exhausted())
+    except (OSError, TypeError, ValueError) as e:
+        logging.error(f"Fehler beim Schreiben des Laufberichts {path}: {e}")
+
+def parse_args():
+    """
+    Liest die Befehlszeilenargumente des Archivers ein.
+    """
+    parser = argparse.ArgumentParser(description='Anime-Archiver mit Videometadaten-Extraktion')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'Anzahl paralleler Threads für die Metadatenextraktion (Standard: {EXTRACTION_WORKERS})')
+    parser.add_argument('--device-readers', type=int, default=None,
+                        help='Höchstens so viele gleichzeitige Extraktionen je Festplatte (Gerät), '
+                             f'0 = ein gemeinsamer Pool für alle Medienverzeichnisse (Standard: {DEVICE_READERS})')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f'Anzahl Zeilen pro gebündeltem Commit (Standard: {DB_BATCH_SIZE})')
+    parser.add_argument('--commit-interval', type=float, default=None,
+                        help=f'Maximale Sekunden zwischen zwei Commits (Standard: {DB_COMMIT_INTERVAL})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Extraktions-Cache nicht verwenden, alle Dateien mit MediaInfo analysieren')
+    parser.add_argument('--parse-mode', choices=sorted(PARSE_SPEED), default=None,
+                        help=f'fast: nur Header lesen (höchstens {FAST_READ_LIMIT_MB:g} MB je Datei), '
+                             f'full: vollständige Analyse und Nachbessern zuvor schnell analysierter Episoden '
+                             f'(Standard: {PARSE_MODE})')
+    parser.add_argument('--io-budget', type=float, default=None, metavar='MB/S',
+                        help='Höchstens so viele MB/s für die Metadatenextraktion lesen, z.B. tagsüber neben '
+                             f'laufenden Mediaplayern, 0 = unbegrenzt (Standard: {IO_BUDGET_MBPS:g})')
+    parser.add_argument('--max-open-files', type=int, default=None,
+                        help=f'Höchstens so viele Dateien gleichzeitig zum Lesen öffnen, 0 = unbegrenzt '
+                             f'(Standard: {IO_MAX_OPEN_FILES})')
+    parser.add_argument('--no-reconcile', action='store_true',
+                        help='Episoden verschwundener Dateien nach dem Scan nicht löschen')
+    parser.add_argument('--force-reconcile', action='store_true',
+                        help=f'Auch löschen, wenn mehr als {RECONCILE_MAX_DELETE_RATIO:.0%} der Episoden verschwunden sind')
+    parser.add_argument('--page-size', type=int, default=None,
+                        help=f'Episoden je Seite bei der Metadatenaktualisierung (Standard: {UPDATE_PAGE_SIZE})')
+    parser.add_argument('--update-budget', type=int, default=None,
+                        help='Höchstens so viele Episoden je Metadatenaktualisierung, neue und unvollständige '
+                             'zuerst (Standard: unbegrenzt)')
+    parser.add_argument('--max-duration', type=parse_duration, default=None,
+                        help='Zeitbudget des Laufs, z.B. 90m oder 2h (ohne Einheit: Minuten); danach wird '
+                             'sauber beendet und der Fortschritt im Checkpoint gespeichert')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'Abgebrochenen Lauf anhand des Checkpoints fortsetzen ({CHECKPOINT_PATH})')
+    parser.add_argument('--shard', action='store_true',
+                        help='Anime-Verzeichnisse über Leases in der Datenbank mit anderen gleichzeitig '
+                             'laufenden Instanzen aufteilen')
+    parser.add_argument('--report', metavar='PFAD', default=None,
+                        help='JSON-Laufbericht mit Laufzeit-Histogrammen je Stufe und gelesenen Bytes schreiben')
+    parser.add_argument('--estimate', action='store_true',
+                        help='Nichts archivieren, sondern Dauer, gelesene Bytes und Datenbankzugriffe des Laufs '
+                             'schätzen (Verzeichnissuche und Arbeitsliste, Stichprobe je Containertyp)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Nach dem Scan dauerhaft laufen und neue Dateien sofort archivieren (inotify, sonst Polling)')
+    return parser.parse_args()
+
 def main():
     """
     Hauptfunktion zum Ausführen des Programms.
     """
+    global EXTRACTION_WORKERS, DB_BATCH_SIZE, DB_COMMIT_INTERVAL, EXTRACTION_CACHE_PATH, PARSE_MODE
+    global RECONCILE, RECONCILE_MAX_DELETE_RATIO, RUN_DEADLINE, RUN_REPORT_PATH, UPDATE_PAGE_SIZE
+    global UPDATE_BUDGET, IO_BUDGET_MBPS, IO_MAX_OPEN_FILES, IO_BUDGET, DEVICE_READERS
+    args = parse_args()
+    if args.workers:
+        EXTRACTION_WORKERS = max(1, args.workers)
+    if args.device_readers is not None:
+        DEVICE_READERS = max(0, args.device_readers)
+    if args.batch_size:
+        DB_BATCH_SIZE = max(1, args.batch_size)
+    if args.commit_interval:
+        DB_COMMIT_INTERVAL = max(0.1, args.commit_interval)
+    if args.no_cache:
+        EXTRACTION_CACHE_PATH = ''
+    if args.parse_mode:
+        PARSE_MODE = args.parse_mode
+    if args.no_reconcile:
+        RECONCILE = False
+    if args.force_reconcile:
+        RECONCILE_MAX_DELETE_RATIO = 1.0
+    if args.page_size:
+        UPDATE_PAGE_SIZE = max(1, args.page_size)
+    if args.update_budget is not None:
+        UPDATE_BUDGET = max(0, args.update_budget)
+    if args.io_budget is not None or args.max_open_files is not None:
+        if args.io_budget is not None:
+            IO_BUDGET_MBPS = max(0.0, args.io_budget)
+        if args.max_open_files is not None:
+            IO_MAX_OPEN_FILES = max(0, args.max_open_files)
+        IO_BUDGET = IOBudget(IO_BUDGET_MBPS * MB, IO_MAX_OPEN_FILES)
+    if args.max_duration:
+        RUN_DEADLINE = time.monotonic() + args.max_duration
+    if args.report:
+        RUN_REPORT_PATH = args.report
+    
     start_time = datetime.now()
     
     logging.info("=== Anime-Archiver mit Videometadaten-Extraktion ===")
     logging.info(f"Start: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    logging.info(f"Medienpfad: {MEDIA_PATH}")
+    logging.info(f"Medienpfad(e): {', '.join(media_roots())}")
     logging.info(f"Datenbankserver: {DB_HOST}")
+    logging.info(f"Analysemodus: {PARSE_MODE}")
     
     try:
         # MediaInfo-Bibliothek prüfen
@@ -1160,12 +2841,51 @@ def main():
             logging.warning(f"MediaInfo nicht korrekt installiert oder kann nicht initialisiert werden: {e}")
             logging.warning("Videometadaten können nicht vollständig extrahiert werden.")
         
+        if args.estimate:
+            # Nur lesen: keine Schemaänderungen, keine Schreibzugriffe
+            connection = connect_database()
+            estimate_run(connection)
+            connection.close()
+            return
+        
         connection = setup_database()
-        scan_directory(connection)
-        logging.info("Aktualisiere Videometadaten für vorhandene Episoden...")
-        update_episodes_metadata(connection)
+        if args.watch:
+            watch_media_directory(connection)
+        elif args.shard:
+            # Den Fortschritt halten die Leases, ein lokales Journal würden sich die Instanzen teilen
+            leases = LeaseManager(connect_database())
+            logging.info(f"Verteilter Scan als {leases.node_id} (Lease-Dauer {leases.ttl}s)")
+            leases.start_heartbeat()
+            try:
+                scan_directory(connection, leases=leases)
+            finally:
+                leases.close()
+            logging.info(f"{len(leases.completed)} Animes von dieser Instanz bearbeitet. Die Metadatenaktualisierung "
+                         f"vorhandener Episoden läuft nur ohne --shard.")
+        else:
+            journal = CheckpointJournal()
+            if args.resume and not journal.load():
+                logging.info("Kein passender Checkpoint gefunden, beginne von vorn.")
+            
+            if scan_directory(connection, journal=journal) and not budget_exhausted():
+                logging.info("Aktualisiere Videometadaten für vorhandene Episoden...")
+                update_episodes_metadata(connection, journal=journal)
+                if PARSE_MODE == 'full' and not budget_exhausted():
+                    logging.info("Analysiere schnell erfasste Episoden vollständig...")
+                    update_episodes_metadata(connection, upgrade_fast=True, journal=journal)
+            
+            if budget_exhausted():
+                journal.save()
+                logging.warning(f"Zeitbudget aufgebraucht. Fortschritt gespeichert in {journal.path}, "
+                                f"Fortsetzung mit --resume.")
+            else:
+                journal.remove()
         print_statistics(connection)
         connection.close()
+        METRICS.log_breakdown()
+        IO_BUDGET.log_summary()
+        if RUN_REPORT_PATH:
+            write_run_report(RUN_REPORT_PATH)
         
         end_time = datetime.now()
         duration = end_time - start_time
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark der Archiver-Hotpaths auf einem synthetischen Medienbaum gegen eine lokale
+SQLite-Ersatzdatenbank (tests/sqlite_standin.py), damit Regressionen auffallen, bevor sie
+die produktive Mediathek erreichen. Gemessen werden in Dateien pro Sekunde:
+
+    extract    extract_media_info für jede Datei
+    scan       Erstscan mit scan_directory_recursive (alle Dateien neu)
+    rescan     erneuter Scan ohne Änderungen (nur Verzeichnissuche und Abgleich)
+    update     update_episodes_metadata für alle Episoden
+
+Der Extraktions-Cache ist abgeschaltet. Jeder Fall läuft --repeat mal, gemeldet wird
+der beste Durchlauf. Mit --json wird das Ergebnis gespeichert, mit --baseline mit einem
+früheren Ergebnis verglichen (Exit-Code 1 bei einer Verschlechterung über --tolerance).
+
+Verwendung:
+    python benchmarks/bench_archiver.py --animes 50 --episodes 12 --json ergebnis.json
+    python benchmarks/bench_archiver.py --baseline ergebnis.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import anime_archiver
+from synthetic_tree import generate_tree
+from tests.sqlite_standin import StandInConnection
+
+def reset_statistics():
+    for counters in (anime_archiver.STATS, anime_archiver.WALK_STATS):
+        for key in counters:
+            counters[key] = 0
+
+def run_case(repeat, prepare, action):
+    """
+    Führt einen Fall repeat-mal aus (prepare wird nicht mitgemessen) und gibt die beste Zeit zurück.
+    """
+    best = None
+    for _ in range(repeat):
+        state = prepare()
+        reset_statistics()
+        start = time.perf_counter()
+        action(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmarks(root, files, workers, repeat, cases):
+    anime_archiver.MEDIA_PATH = root
+    anime_archiver.EXTRACTION_CACHE_PATH = ''
+
+    def scan(connection):
+        anime_ids, season_ids = anime_archiver.load_directory_ids(connection)
+        with anime_archiver.extraction_pool(workers) as executor:
+            context = anime_archiver.ScanContext(executor, anime_archiver.load_known_files(connection),
+                                                 anime_ids=anime_ids, season_ids=season_ids)
+            anime_archiver.scan_directory_recursive(connection, root, context=context)
+
+    def scanned():
+        connection = StandInConnection()
+        scan(connection)
+        return connection
+
+    actions = {
+        'extract': (lambda: None, lambda _: [anime_archiver.extract_media_info(file_path) for file_path in files]),
+        'scan': (StandInConnection, scan),
+        'rescan': (scanned, scan),
+        'update': (scanned, lambda connection: anime_archiver.update_episodes_metadata(
+            connection, reprocess_all=True, workers=workers)),
+    }
+    results = {}
+    for name in cases:
+        prepare, action = actions[name]
+        seconds = run_case(repeat, prepare, action)
+        results[name] = {'seconds': round(seconds, 4), 'files_per_second': round(len(files) / seconds, 1)}
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Vergleicht mit einem früheren Ergebnis und gibt die Namen verschlechterter Fälle zurück.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        change = result['files_per_second'] / previous['files_per_second'] - 1
+        marker = ''
+        if change < -tolerance:
+            regressions.append(name)
+            marker = '  <-- Verschlechterung'
+        print(f"{name:<8} {previous['files_per_second']:>10.1f} -> {result['files_per_second']:>10.1f} "
+              f"Dateien/s ({change:+.1%}){marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Archiver-Hotpaths auf einem synthetischen Medienbaum messen')
+    parser.add_argument('--root', default=None, help='Vorhandenen Medienbaum verwenden statt einen zu erzeugen')
+    parser.add_argument('--animes', type=int, default=20, help='Anzahl Animes (Standard: 20)')
+    parser.add_argument('--seasons', type=int, default=2, help='Staffeln je Anime (Standard: 2)')
+    parser.add_argument('--episodes', type=int, default=12, help='Episoden je Staffel (Standard: 12)')
+    parser.add_argument('--seed', type=int, default=1, help='Startwert des Generators (Standard: 1)')
+    parser.add_argument('--workers', type=int, default=anime_archiver.EXTRACTION_WORKERS,
+                        help=f'Extraktions-Worker (Standard: {anime_archiver.EXTRACTION_WORKERS})')
+    parser.add_argument('--repeat', type=int, default=3, help='Durchläufe je Fall, der beste zählt (Standard: 3)')
+    parser.add_argument('--cases', default='extract,scan,rescan,update',
+                        help='Kommagetrennte Fälle (Standard: extract,scan,rescan,update)')
+    parser.add_argument('--mediainfo', action='store_true', help='Kopfdaten-Parser abschalten, nur MediaInfo messen')
+    parser.add_argument('--json', default=None, help='Ergebnis als JSON speichern')
+    parser.add_argument('--baseline', default=None, help='Früheres JSON-Ergebnis zum Vergleich')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Erlaubte Verschlechterung gegenüber --baseline (Standard: 0.15 = 15%%)')
+    args = parser.parse_args()
+
+    # Fortschritts- und Statistikausgaben des Archivers würden die Messung verfälschen
+    logging.getLogger().setLevel(logging.WARNING)
+    anime_archiver.NATIVE_HEADERS = not args.mediainfo
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+
+    temporary_root = None
+    root = args.root
+    if root is None:
+        temporary_root = tempfile.mkdtemp(prefix='bench_archiver_')
+        root = os.path.join(temporary_root, 'mediathek')
+        files = generate_tree(root, args.animes, args.seasons, args.episodes, seed=args.seed)
+    else:
+        files = [os.path.join(directory, name) for directory, _, names in os.walk(root)
+                 for name in names if anime_archiver.is_video_file(name)]
+    try:
+        results = run_benchmarks(root, files, args.workers, args.repeat, cases)
+    finally:
+        if temporary_root:
+            shutil.rmtree(temporary_root)
+
+    print(f"{len(files)} Dateien, {args.workers} Worker, bester von {args.repeat} Durchläufen")
+    print(f"{'Fall':<8} {'Sekunden':>10} {'Dateien/s':>12}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['seconds']:>10.3f} {result['files_per_second']:>12.1f}")
+
+    report = {
+        'files': len(files),
+        'tree': {'animes': args.animes, 'seasons': args.seasons, 'episodes': args.episodes, 'seed': args.seed,
+                 'root': args.root},
+        'workers': args.workers,
+        'native_headers': anime_archiver.NATIVE_HEADERS,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('files') != len(files):
+            print(f"Hinweis: Vergleichslauf hatte {baseline.get('files')} statt {len(files)} Dateien.")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
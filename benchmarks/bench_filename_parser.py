@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mikrobenchmark: vergleicht die Erkennung von Episodennummern mit filename_parser und mit
+den früheren, nacheinander ausgeführten re.search-Aufrufen, und zählt, welche Regel wie
+oft greift (Grundlage für die Reihenfolge in filename_parser.EPISODE_RULES).
+
+Ohne Argument wird der Test-Korpus (tests/filename_corpus.tsv) verwendet, mit einem
+Verzeichnis die Namen aller Videodateien darunter.
+
+Verwendung:
+    python benchmarks/bench_filename_parser.py [/mnt/mediathek] [--rounds 200]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import anime_archiver
+import filename_parser
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'filename_corpus.tsv')
+
+def legacy_episode_number(episode_name):
+    """
+    Bisherige Erkennung aus anime_archiver.extract_episode_number (zum Vergleich).
+    """
+    match = re.search(r'e(?:p(?:isode)?)?\s*(\d+)', episode_name.lower())
+    if match:
+        return int(match.group(1))
+    match = re.search(r'^(\d+)(?:\s*[\-_\.]\s*.+)?', os.path.splitext(episode_name)[0])
+    if match:
+        return int(match.group(1))
+    return None
+
+def load_names(root):
+    """
+    Gibt die Namen gruppiert nach Verzeichnis zurück: {verzeichnis: [namen]}.
+    """
+    if root is None:
+        with open(CORPUS_PATH, encoding='utf-8') as file:
+            names = [line.split('\t')[0] for line in file if line.strip() and not line.startswith('#')]
+        return {'korpus': names}
+    directories = {}
+    for directory, _, files in os.walk(root):
+        names = sorted(name for name in files if anime_archiver.is_video_file(name))
+        if names:
+            directories[directory] = names
+    return directories
+
+def measure(rounds, function):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Erkennung von Episodennummern messen')
+    parser.add_argument('root', nargs='?', default=None, help='Verzeichnis mit Videodateien (Standard: Test-Korpus)')
+    parser.add_argument('--rounds', type=int, default=200, help='Wiederholungen (Standard: 200)')
+    args = parser.parse_args()
+
+    directories = load_names(args.root)
+    names = [name for group in directories.values() for name in group]
+    if not names:
+        print("Keine Dateinamen gefunden")
+        sys.exit(1)
+
+    legacy = measure(args.rounds, lambda: [legacy_episode_number(name) for name in names])
+    single = measure(args.rounds, lambda: [filename_parser.parse_episode_name(name) for name in names])
+    batch = measure(args.rounds, lambda: [filename_parser.parse_episode_names(group)
+                                          for group in directories.values()])
+
+    count = len(names) * args.rounds
+    print(f"{len(names)} Namen in {len(directories)} Verzeichnissen, {args.rounds} Wiederholungen")
+    print(f"{'Verfahren':<22} {'µs/Name':>9} {'Namen/s':>12}")
+    for label, seconds in (("bisher (re.search)", legacy), ("parse_episode_name", single),
+                           ("parse_episode_names", batch)):
+        print(f"{label:<22} {seconds / count * 1e6:>9.2f} {count / seconds:>12.0f}")
+
+    results = [parsed for group in directories.values() for parsed in filename_parser.parse_episode_names(group)]
+    rules = Counter(parsed.rule or '(keine)' for parsed in results)
+    print("\nTreffer je Regel (Reihenfolge in EPISODE_RULES):")
+    for rule, _, _ in filename_parser.EPISODE_RULES:
+        print(f"  {rule:<16} {rules.get(rule, 0):>7}")
+    print(f"  {'(keine)':<16} {rules.get('(keine)', 0):>7}")
+
+    differences = [(name, legacy_episode_number(name), parsed.episode)
+                   for name, parsed in zip(names, results) if legacy_episode_number(name) != parsed.episode]
+    print(f"\n{len(differences)} Namen mit anderer Episodennummer als bisher")
+    for name, before, after in differences[:20]:
+        print(f"  {name}: {before} -> {after}")
+
+if __name__ == "__main__":
+    main()
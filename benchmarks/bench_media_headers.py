@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: vergleicht die Laufzeit von extract_media_info mit den Kopfdaten aus media_headers
+und mit MediaInfo (Modus full) für Matroska- und MP4-Dateien und meldet Felder, in denen
+sich die Ergebnisse unterscheiden.
+
+Verwendung:
+    python benchmarks/bench_media_headers.py /mnt/mediathek/Beispiel [--per-type 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import anime_archiver
+import media_headers
+from bench_parse_mode import collect_samples
+
+def measure(file_path, native):
+    """
+    Extrahiert die Metadaten einer Datei und gibt (Ergebnis, Sekunden) zurück.
+    """
+    anime_archiver.NATIVE_HEADERS = native
+    start = time.perf_counter()
+    result = anime_archiver.extract_media_info(file_path, 'full')
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Kopfdaten-Parser und MediaInfo vergleichen')
+    parser.add_argument('root', help='Verzeichnis mit Beispieldateien')
+    parser.add_argument('--per-type', type=int, default=5, help='Dateien je Containerformat (Standard: 5)')
+    args = parser.parse_args()
+
+    samples = {extension: files for extension, files in collect_samples(args.root, args.per_type).items()
+               if extension in media_headers.SUPPORTED_EXTENSIONS}
+    if not samples:
+        print(f"Keine Matroska/MP4-Dateien gefunden in {args.root}")
+        sys.exit(1)
+
+    print(f"{'Format':<8} {'Dateien':>7} {'nativ':>7} {'ms nativ':>9} {'ms MediaInfo':>13} {'Faktor':>7}")
+    differences = []
+    for extension, files in sorted(samples.items()):
+        native_hits = 0
+        native_seconds = mediainfo_seconds = 0.0
+        for file_path in files:
+            # MediaInfo zuerst, damit der Kopfdaten-Parser keinen Vorteil durch den Seitencache hat
+            expected, seconds = measure(file_path, False)
+            mediainfo_seconds += seconds
+            result, seconds = measure(file_path, True)
+            native_seconds += seconds
+            native_hits += media_headers.parse_media_headers(file_path) is not None
+
+            for key, value in result.items():
+                if value != expected.get(key):
+                    differences.append((file_path, key, value, expected.get(key)))
+
+        count = len(files)
+        factor = mediainfo_seconds / native_seconds if native_seconds else float('inf')
+        print(f"{extension:<8} {count:>7} {native_hits:>7} {native_seconds / count * 1000:>9.1f} "
+              f"{mediainfo_seconds / count * 1000:>13.1f} {factor:>6.1f}x")
+
+    for file_path, key, value, expected in differences:
+        print(f"Abweichung {os.path.basename(file_path)}: {key} = {value!r} (MediaInfo: {expected!r})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: vergleicht gelesene Bytes und Laufzeit von MediaInfo in den Modi fast und full,
+gruppiert nach Containerformat (Dateiendung).
+
+Beide Modi lesen über CappedReader, damit die gelesenen Bytes gezählt werden können
+(im Archiver übergibt der Modus full den Dateinamen direkt an MediaInfo).
+Für aussagekräftige Zeiten auf dem NAS sollte der Seitencache zwischen den Läufen
+geleert werden (echo 1 > /proc/sys/vm/drop_caches), sonst profitiert der zweite Modus
+vom bereits gelesenen Dateianfang.
+
+Verwendung:
+    python benchmarks/bench_parse_mode.py /mnt/mediathek/Beispiel [--per-type 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymediainfo import MediaInfo
+import anime_archiver
+
+def measure(file_path, parse_mode):
+    """
+    Analysiert eine Datei im angegebenen Modus und gibt (gelesene Bytes, Sekunden) zurück.
+    """
+    limit = int(anime_archiver.FAST_READ_LIMIT_MB * 1024 * 1024) if parse_mode == 'fast' else None
+    start = time.perf_counter()
+    with open(file_path, 'rb') as file:
+        reader = anime_archiver.CappedReader(file, limit)
+        MediaInfo.parse(reader, parse_speed=anime_archiver.PARSE_SPEED[parse_mode])
+    return reader.bytes_read, time.perf_counter() - start
+
+def collect_samples(root, per_type):
+    """
+    Sammelt je Dateiendung höchstens per_type Videodateien unterhalb von root.
+    """
+    samples = defaultdict(list)
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            extension = os.path.splitext(name)[1].lower()
+            if anime_archiver.is_video_file(name) and len(samples[extension]) < per_type:
+                samples[extension].append(os.path.join(directory, name))
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description='MediaInfo-Analysemodi fast/full vergleichen')
+    parser.add_argument('root', help='Verzeichnis mit Beispieldateien')
+    parser.add_argument('--per-type', type=int, default=5, help='Dateien je Containerformat (Standard: 5)')
+    args = parser.parse_args()
+
+    samples = collect_samples(args.root, args.per_type)
+    if not samples:
+        print(f"Keine Videodateien gefunden in {args.root}")
+        sys.exit(1)
+
+    print(f"{'Format':<8} {'Dateien':>7} {'MB fast':>10} {'MB full':>10} {'s fast':>8} {'s full':>8} {'Faktor':>7}")
+    for extension, files in sorted(samples.items()):
+        totals = {mode: [0, 0.0] for mode in ('fast', 'full')}
+        for file_path in files:
+            # full zuerst, damit fast nicht vom Seitencache des vollständigen Laufs profitiert
+            for mode in ('full', 'fast'):
+                bytes_read, seconds = measure(file_path, mode)
+                totals[mode][0] += bytes_read
+                totals[mode][1] += seconds
+
+        count = len(files)
+        fast_mb, fast_s = totals['fast'][0] / count / 1024 / 1024, totals['fast'][1] / count
+        full_mb, full_s = totals['full'][0] / count / 1024 / 1024, totals['full'][1] / count
+        factor = full_mb / fast_mb if fast_mb else float('inf')
+        print(f"{extension:<8} {count:>7} {fast_mb:>10.1f} {full_mb:>10.1f} {fast_s:>8.2f} {full_s:>8.2f} {factor:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
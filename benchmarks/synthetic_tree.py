@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Erzeugt einen synthetischen Medienbaum (MEDIA_PATH) für reproduzierbare Benchmarks:
+Anime-Ordner mit Staffelordnern und kleinen, gültigen Matroska- bzw. MP4-Dateien
+(H.264-Video, AAC-Audio, Bitraten-Statistiken), die sowohl media_headers als auch
+MediaInfo vollständig lesen können. Mit demselben --seed entsteht derselbe Baum.
+
+Verwendung:
+    python benchmarks/synthetic_tree.py /tmp/mediathek --animes 50 --seasons 2 --episodes 12
+"""
+
+import os
+import sys
+import struct
+import random
+import argparse
+
+# --- Matroska -------------------------------------------------------------------------------------
+
+def ebml_element(element_id, *payload):
+    data = b''.join(payload)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + b'\x01' + len(data).to_bytes(7, 'big') + data
+
+def ebml_uint(element_id, value):
+    return ebml_element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+def ebml_text(element_id, value):
+    return ebml_element(element_id, value.encode())
+
+def ebml_float(element_id, value):
+    return ebml_element(element_id, struct.pack('>d', value))
+
+def statistics_tag(track_uid, bitrate):
+    return ebml_element(0x7373,
+                        ebml_element(0x63C0, ebml_uint(0x63C5, track_uid)),
+                        ebml_element(0x67C8, ebml_text(0x45A3, 'BPS'), ebml_text(0x4487, str(bitrate))))
+
+def build_matroska(duration_ms, width, height, video_bitrate, audio_bitrate, language, padding):
+    """
+    Matroska-Datei mit H.264-Video, AAC-Audio und BPS-Tags (wie von mkvmerge geschrieben).
+    """
+    info = ebml_element(0x1549A966, ebml_uint(0x2AD7B1, 1000000), ebml_float(0x4489, float(duration_ms)),
+                        ebml_text(0x4D80, 'synthetic_tree'))
+    tracks = ebml_element(
+        0x1654AE6B,
+        ebml_element(0xAE, ebml_uint(0xD7, 1), ebml_uint(0x73C5, 1), ebml_uint(0x83, 1),
+                     ebml_text(0x86, 'V_MPEG4/ISO/AVC'), ebml_text(0x22B59C, language),
+                     ebml_uint(0x23E383, 41708333),
+                     ebml_element(0xE0, ebml_uint(0xB0, width), ebml_uint(0xBA, height))),
+        ebml_element(0xAE, ebml_uint(0xD7, 2), ebml_uint(0x73C5, 2), ebml_uint(0x83, 2),
+                     ebml_text(0x86, 'A_AAC'), ebml_text(0x22B59C, language),
+                     ebml_element(0xE1, ebml_float(0xB5, 48000.0), ebml_uint(0x9F, 2))))
+    tags = ebml_element(0x1254C367, statistics_tag(1, video_bitrate), statistics_tag(2, audio_bitrate))
+    cluster = ebml_element(0x1F43B675, ebml_uint(0xE7, 0), bytes(padding))
+    segment = ebml_element(0x18538067, info, tracks, tags, cluster)
+    return ebml_element(0x1A45DFA3, ebml_text(0x4282, 'matroska')) + segment
+
+# --- MP4 ------------------------------------------------------------------------------------------
+
+def mp4_box(box_type, *payload):
+    data = b''.join(payload)
+    return struct.pack('>I4s', len(data) + 8, box_type.encode('latin-1')) + data
+
+def mp4_full_box(box_type, *payload):
+    return mp4_box(box_type, bytes(4), *payload)
+
+def mp4_language(code):
+    return struct.pack('>H', sum((ord(char) - 0x60) << shift for char, shift in zip(code, (10, 5, 0))))
+
+def mp4_track(track_id, handler, timescale, duration, language, sample_entry, sample_size, sample_count, chunk_offset):
+    stbl = mp4_box('stbl',
+                   mp4_full_box('stsd', struct.pack('>I', 1), sample_entry),
+                   mp4_full_box('stsz', struct.pack('>II', sample_size, sample_count)),
+                   mp4_full_box('stco', struct.pack('>II', 1, chunk_offset)))
+    return mp4_box('trak',
+                   mp4_full_box('tkhd', struct.pack('>IIII', 0, 0, track_id, 0), bytes(64)),
+                   mp4_box('mdia',
+                           mp4_full_box('mdhd', struct.pack('>IIII', 0, 0, timescale, duration),
+                                        mp4_language(language), bytes(2)),
+                           mp4_full_box('hdlr', bytes(4), handler.encode('latin-1'), bytes(12)),
+                           mp4_box('minf', stbl)))
+
+def build_mp4(duration_ms, width, height, video_bitrate, audio_bitrate, language, padding):
+    """
+    MP4-Datei (moov am Ende) mit H.264-Video und AAC-Audio. Die Bitraten ergeben sich
+    wie bei echten Dateien aus Stichprobengrößen und Dauer.
+    """
+    sps = b'\x67\x64\x00\x28'
+    avcc = bytes([1, 100, 0, 40, 0xFF, 0xE1]) + struct.pack('>H', len(sps)) + sps + bytes([1, 0, 1, 0x68])
+    visual = mp4_box('avc1', bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HH', width, height), bytes(50),
+                     mp4_box('avcC', avcc))
+    decoder_config = bytes([0x40, 0x15]) + bytes(11) + bytes([0x05, 2, 0x11, 0x90])
+    es_descriptor = struct.pack('>HB', 1, 0) + bytes([0x04, len(decoder_config)]) + decoder_config
+    esds = mp4_full_box('esds', bytes([0x03, len(es_descriptor)]), es_descriptor)
+    audio = mp4_box('mp4a', bytes(6), struct.pack('>H', 1), bytes(8),
+                    struct.pack('>HHHHI', 2, 16, 0, 0, 48000 << 16), esds)
+
+    seconds = duration_ms / 1000
+    frames = max(1, int(seconds * 24000 / 1001))
+    audio_frames = max(1, int(seconds * 48000 / 1024))
+    video_sample = max(1, int(video_bitrate * seconds / 8 / frames))
+    audio_sample = max(1, int(audio_bitrate * seconds / 8 / audio_frames))
+
+    ftyp = mp4_box('ftyp', b'isom', bytes(4), b'isomavc1')
+    mdat = mp4_box('mdat', bytes(padding))
+    chunk_offset = len(ftyp) + 8
+    mvhd = mp4_full_box('mvhd', struct.pack('>IIII', 0, 0, 1000, duration_ms), bytes(80))
+    moov = mp4_box('moov', mvhd,
+                   mp4_track(1, 'vide', 24000, frames * 1001, language, visual, video_sample, frames, chunk_offset),
+                   mp4_track(2, 'soun', 48000, audio_frames * 1024, language, audio, audio_sample, audio_frames,
+                             chunk_offset))
+    return ftyp + mdat + moov
+
+# --- Baum -----------------------------------------------------------------------------------------
+
+RESOLUTIONS = [(1920, 1080), (1280, 720), (3840, 2160), (720, 480)]
+LANGUAGES = ['jpn', 'ger', 'eng']
+
+def generate_tree(root, animes=20, seasons=2, episodes=12, mp4_ratio=0.3, padding=4096, seed=1):
+    """
+    Erzeugt den Medienbaum unter root und gibt die Liste der erzeugten Videodateien zurück.
+    Jeder Anime erhält seasons Staffelordner mit je episodes Episoden; bei seasons=0
+    liegen die Episoden direkt im Anime-Ordner.
+    """
+    generator = random.Random(seed)
+    files = []
+    for anime_number in range(1, animes + 1):
+        anime_name = f"Synthetischer Anime {anime_number:04d}"
+        season_names = [f"Staffel {number}" for number in range(1, seasons + 1)] or [None]
+        for season_name in season_names:
+            directory = os.path.join(root, anime_name, season_name) if season_name else os.path.join(root, anime_name)
+            os.makedirs(directory, exist_ok=True)
+            for episode_number in range(1, episodes + 1):
+                width, height = generator.choice(RESOLUTIONS)
+                parameters = dict(duration_ms=generator.randint(20, 25) * 60000 + generator.randint(0, 59999),
+                                  width=width, height=height,
+                                  video_bitrate=generator.randint(800, 8000) * 1000,
+                                  audio_bitrate=generator.choice([96000, 128000, 192000]),
+                                  language=generator.choice(LANGUAGES), padding=padding)
+                is_mp4 = generator.random() < mp4_ratio
+                file_path = os.path.join(directory, f"{anime_name} E{episode_number:02d}.{'mp4' if is_mp4 else 'mkv'}")
+                with open(file_path, 'wb') as file:
+                    file.write(build_mp4(**parameters) if is_mp4 else build_matroska(**parameters))
+                files.append(file_path)
+        # Nicht-Videodateien, wie sie in echten Bibliotheken vorkommen
+        with open(os.path.join(root, anime_name, 'cover.jpg'), 'wb') as file:
+            file.write(bytes(256))
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetischen Medienbaum für Benchmarks erzeugen')
+    parser.add_argument('root', help='Zielverzeichnis (wird angelegt)')
+    parser.add_argument('--animes', type=int, default=20, help='Anzahl Animes (Standard: 20)')
+    parser.add_argument('--seasons', type=int, default=2, help='Staffeln je Anime, 0 = keine Staffelordner (Standard: 2)')
+    parser.add_argument('--episodes', type=int, default=12, help='Episoden je Staffel (Standard: 12)')
+    parser.add_argument('--mp4-ratio', type=float, default=0.3, help='Anteil MP4-Dateien (Standard: 0.3)')
+    parser.add_argument('--padding-kb', type=int, default=4, help='Nutzdaten je Datei in KB (Standard: 4)')
+    parser.add_argument('--seed', type=int, default=1, help='Startwert des Zufallsgenerators (Standard: 1)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.root) and os.listdir(args.root):
+        print(f"Zielverzeichnis ist nicht leer: {args.root}")
+        sys.exit(1)
+    files = generate_tree(args.root, args.animes, args.seasons, args.episodes, args.mp4_ratio,
+                          args.padding_kb * 1024, args.seed)
+    print(f"{len(files)} Episoden in {args.animes} Animes erzeugt unter {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inhalts-Fingerabdruck von Videodateien für Verschiebe- und Duplikaterkennung.
+
+Statt die ganze Datei zu hashen, werden nur die Größe, der erste und der letzte Block
+(FINGERPRINT_BLOCK_KB, Standard 1 MiB) sowie einige gleichmäßig verteilte Blöcke aus
+der Mitte (FINGERPRINT_SAMPLES) gelesen. Das kostet je Datei wenige MiB Lesezugriff,
+unterscheidet aber auch Releases gleicher Größe zuverlässig (Container-Kopf, Index am
+Dateiende und Videodaten aus der Mitte unterscheiden sich).
+
+Gleicher Fingerabdruck bedeutet mit sehr hoher Wahrscheinlichkeit gleichen Inhalt:
+  - Der Scan ordnet eine neue Datei, deren Fingerabdruck zu einer verschwundenen
+    archivierten Datei passt, dieser Episode zu (verschoben bzw. umbenannt), statt sie
+    erneut zu analysieren.
+  - Das Dashboard listet Episoden mit gleichem Fingerabdruck als Duplikate.
+"""
+
+import os
+import hashlib
+
+# Größe der gelesenen Blöcke und Anzahl der Blöcke aus der Dateimitte
+FINGERPRINT_BLOCK_SIZE = int(float(os.getenv('FINGERPRINT_BLOCK_KB', '1024')) * 1024)
+FINGERPRINT_SAMPLES = int(os.getenv('FINGERPRINT_SAMPLES', '3'))
+
+def fingerprint_blocks(size, block_size=None, samples=None):
+    """
+    Gibt die zu lesenden Bereiche einer Datei als [(offset, länge)] zurück. Kleine Dateien,
+    bei denen sich die Blöcke überschneiden würden, werden vollständig gelesen.
+    """
+    block_size = block_size or FINGERPRINT_BLOCK_SIZE
+    samples = FINGERPRINT_SAMPLES if samples is None else samples
+    if size <= (samples + 2) * block_size:
+        return [(0, size)]
+    last = size - block_size
+    # Blöcke aus der Mitte gleichmäßig zwischen erstem und letztem Block verteilen
+    offsets = [0] + [last * index // (samples + 1) for index in range(1, samples + 1)] + [last]
+    return [(offset, block_size) for offset in offsets]
+
+def content_fingerprint(file_path, size=None, block_size=None, samples=None):
+    """
+    Berechnet den Fingerabdruck einer Datei als Hex-String (32 Zeichen).
+    size ist die Dateigröße aus einem bereits vorliegenden stat-Aufruf.
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode('ascii'))
+    with open(file_path, 'rb') as file:
+        for offset, length in fingerprint_blocks(size, block_size, samples):
+            file.seek(offset)
+            digest.update(file.read(length))
+    return digest.hexdigest()
+
+# Gruppen von Episoden mit gleichem Inhalt, größte Platzverschwendung zuerst
+DUPLICATE_GROUPS_QUERY = """
+    SELECT content_fingerprint, COUNT(*) AS copies, MAX(file_size) AS file_size
+    FROM episodes
+    WHERE content_fingerprint IS NOT NULL
+    GROUP BY content_fingerprint
+    HAVING COUNT(*) > 1
+    ORDER BY (COUNT(*) - 1) * MAX(file_size) DESC
+    LIMIT %s
+"""
+
+def find_duplicates(connection, limit=100):
+    """
+    Liefert Episoden mit gleichem Inhalt gruppiert als Liste von Dictionaries:
+    fingerprint, file_size, copies, wasted_bytes und episodes (id, name, file_path,
+    anime_id, anime_name).
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(DUPLICATE_GROUPS_QUERY, (limit,))
+        groups = [{'fingerprint': fingerprint, 'file_size': file_size, 'copies': copies,
+                   'wasted_bytes': (copies - 1) * (file_size or 0), 'episodes': []}
+                  for fingerprint, copies, file_size in cursor.fetchall()]
+        if not groups:
+            return []
+        by_fingerprint = {group['fingerprint']: group for group in groups}
+        cursor.execute(f"""
+            SELECT e.content_fingerprint, e.id, e.name, e.file_path, a.id, a.name
+            FROM episodes e
+            JOIN seasons s ON s.id = e.season_id
+            JOIN animes a ON a.id = s.anime_id
+            WHERE e.content_fingerprint IN ({', '.join(['%s'] * len(groups))})
+            ORDER BY e.file_path
+        """, tuple(by_fingerprint))
+        for fingerprint, episode_id, name, file_path, anime_id, anime_name in cursor.fetchall():
+            by_fingerprint[fingerprint]['episodes'].append({
+                'id': episode_id, 'name': name, 'file_path': file_path,
+                'anime_id': anime_id, 'anime_name': anime_name,
+            })
+        return groups
+    finally:
+        cursor.close()
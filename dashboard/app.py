@@ -217,7 +217,9 @@ def anime_list():
 def anime_detail(anime_id):
     """Zeigt detaillierte Informationen zu einem Anime an."""
     from models import Anime, Season
+    from utils import record_anime_view
     anime = Anime.query.get_or_404(anime_id)
+    record_anime_view(anime_id)
     seasons = Season.query.filter_by(anime_id=anime_id).order_by(Season.season_number).all()
     return render_template('anime_detail.html', anime=anime, seasons=seasons)
 
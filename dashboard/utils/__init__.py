@@ -4,6 +4,6 @@
 Dienstprogramme für das Anime-Loads Dashboard.
 """
 
-from .db import get_db_connection, close_db_connection, execute_query
+from .db import get_db_connection, close_db_connection, execute_query, record_anime_view
 from .metadata import extract_media_info
 from .stats import calculate_stats, generate_chart
@@ -50,6 +50,21 @@ def close_db_connection(connection):
         connection.close()
         logging.debug("Datenbankverbindung geschlossen")
 
+def record_anime_view(anime_id):
+    """
+    Merkt den Aufruf einer Anime-Seite in der Tabelle anime_views vor. Der Archiver
+    aktualisiert die Metadaten kürzlich angesehener Animes bevorzugt.
+    
+    Args:
+        anime_id: ID des Animes
+    """
+    execute_query(
+        "INSERT INTO anime_views (anime_id, view_count, last_viewed_at) VALUES (%s, 1, NOW()) "
+        "ON DUPLICATE KEY UPDATE view_count = view_count + 1, last_viewed_at = NOW()",
+        (anime_id,),
+        fetch_mode="none"
+    )
+
 def execute_query(query, params=None, fetch_mode="all", connection=None):
     """
     Führt eine SQL-Abfrage aus und gibt die Ergebnisse zurück.
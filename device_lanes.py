@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraktion mit einer Spur je Gerät für Mediatheken über mehrere Festplatten.
+
+DeviceLanes ist ein Executor für die Extraktionsstufe der Ingest-Pipeline: jede Aufgabe
+wird anhand des Geräts (st_dev) ihrer Datei einer eigenen Spur mit höchstens
+DEVICE_READERS Threads zugeordnet. Verschiedene Platten werden so parallel gelesen,
+während keine einzelne (rotierende) Platte mehr gleichzeitige Leser bekommt, als sie
+ohne ständiges Umpositionieren der Köpfe bedienen kann. Über alle Spuren hinweg laufen
+höchstens max_workers Aufgaben gleichzeitig (MediaInfo braucht auch CPU).
+"""
+
+import os
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+# Gleichzeitige Leser je Gerät (0 = keine Spuren, ein gemeinsamer Pool)
+DEVICE_READERS = int(os.getenv('DEVICE_READERS', '2'))
+
+class DeviceLanes(Executor):
+    """
+    Executor mit je einem Thread-Pool pro Gerät.
+
+    device_of(*args) bestimmt das Gerät einer Aufgabe aus ihren Argumenten; Aufgaben ohne
+    Gerät (None) teilen sich eine eigene Spur. Spuren werden beim ersten Bedarf angelegt.
+    submit wird von der Pipeline im Event-Loop aufgerufen, device_of darf daher nicht auf
+    das Dateisystem zugreifen: das Gerät muss bereits im Element stehen (z.B. aus dem stat
+    der Verzeichnissuche oder über DirectoryDevices im Quell-Thread bestimmt).
+    """
+    def __init__(self, device_of, per_device=None, max_workers=None, thread_name_prefix='mediainfo'):
+        self._device_of = device_of
+        self.per_device = per_device or DEVICE_READERS or 1
+        self._slots = threading.BoundedSemaphore(max_workers) if max_workers else None
+        self._prefix = thread_name_prefix
+        self._lanes = {}
+        self._lock = threading.Lock()
+        self._shutdown = False
+        # Aufgaben je Gerät
+        self.submitted = Counter()
+
+    def _lane(self, device):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            lane = self._lanes.get(device)
+            if lane is None:
+                name = f"{self._prefix}-dev{device}" if device is not None else self._prefix
+                lane = ThreadPoolExecutor(max_workers=self.per_device, thread_name_prefix=name)
+                self._lanes[device] = lane
+            self.submitted[device] += 1
+            return lane
+
+    def _run(self, fn, args, kwargs):
+        if self._slots is None:
+            return fn(*args, **kwargs)
+        with self._slots:
+            return fn(*args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        return self._lane(self._device_of(*args)).submit(self._run, fn, args, kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            lanes = list(self._lanes.values())
+        for lane in lanes:
+            lane.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def log_summary(self):
+        devices = {device: count for device, count in self.submitted.items() if device is not None}
+        if len(devices) > 1:
+            lanes = ", ".join(f"Gerät {format_device(device)}: {count}" for device, count in sorted(devices.items()))
+            logging.info(f"Extraktion über {len(devices)} Geräte mit je {self.per_device} Lesern ({lanes})")
+
+def format_device(device):
+    """
+    Gerätenummer als major:minor wie in /proc/self/mountinfo.
+    """
+    return f"{os.major(device)}:{os.minor(device)}"
+
+class DirectoryDevices:
+    """
+    Bestimmt das Gerät einer Datei über ihr Verzeichnis, mit einem stat-Aufruf je
+    Verzeichnis statt je Datei. Nicht lesbare Verzeichnisse haben kein Gerät (None).
+    Für die Quelle einer Pipeline gedacht, nicht als device_of von DeviceLanes.
+    """
+    def __init__(self):
+        self._devices = {}
+
+    def __call__(self, file_path):
+        directory = os.path.dirname(file_path)
+        if directory not in self._devices:
+            try:
+                self._devices[directory] = os.stat(directory).st_dev
+            except OSError:
+                self._devices[directory] = None
+        return self._devices[directory]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraktions-Cache: Speichert die Ergebnisse von extract_media_info lokal in einer
+SQLite-Datei, damit unveränderte Dateien beim Neuaufbau der Datenbank oder bei
+update_episodes_metadata(reprocess_all=True) nicht erneut mit MediaInfo analysiert werden.
+
+Eine Datei wird über (st_dev, st_ino) identifiziert, ein Eintrag ist nur gültig,
+solange Größe, Änderungszeit (ns) und Extraktor-Version übereinstimmen. Ergebnisse
+einer vollständigen Analyse (full) gelten auch für den schnellen Modus (fast).
+
+Verwendung auf der Kommandozeile:
+    python extraction_cache.py stats
+    python extraction_cache.py prune [--max-mb 128] [--missing]
+    python extraction_cache.py clear
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Laden der Umgebungsvariablen
+load_dotenv()
+
+# Konfigurationsvariablen (leerer Pfad deaktiviert den Cache)
+EXTRACTION_CACHE_PATH = os.getenv('EXTRACTION_CACHE_PATH',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_cache.sqlite'))
+EXTRACTION_CACHE_MAX_MB = float(os.getenv('EXTRACTION_CACHE_MAX_MB', '256'))
+
+# Beim Überschreiten der Maximalgröße wird bis auf diesen Anteil geräumt
+EVICTION_TARGET = 0.9
+# Schreibzugriffe zwischen zwei Commits der Cache-Datei
+COMMIT_EVERY = 100
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS media_info_cache (
+        st_dev INTEGER NOT NULL,
+        st_ino INTEGER NOT NULL,
+        file_size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        extractor_version INTEGER NOT NULL,
+        parse_mode TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        media_info TEXT NOT NULL,
+        entry_size INTEGER NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (st_dev, st_ino)
+    );
+    CREATE INDEX IF NOT EXISTS idx_media_info_cache_last_used ON media_info_cache (last_used);
+"""
+
+def _encode_value(value):
+    """
+    JSON-Kodierung für Werte, die extract_media_info zurückgibt (z.B. creation_time).
+    """
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Nicht serialisierbar: {type(value).__name__}")
+
+def _decode_object(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+class ExtractionCache:
+    """
+    Threadsicherer Cache für extract_media_info-Ergebnisse.
+    Zugriffe aus den Extraktions-Workern werden über eine Sperre serialisiert.
+    Mit read_only wird eine vorhandene Cache-Datei nur gelesen (sqlite3-URI mode=ro): sie wird
+    weder angelegt noch umgestellt, und Treffer aktualisieren last_used nicht.
+    """
+    def __init__(self, path=None, max_mb=None, extractor_version=1, read_only=False):
+        self.path = path or EXTRACTION_CACHE_PATH
+        self.max_bytes = int((max_mb if max_mb is not None else EXTRACTION_CACHE_MAX_MB) * 1024 * 1024)
+        self.extractor_version = extractor_version
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        if read_only:
+            self._db = sqlite3.connect(f"{Path(self.path).absolute().as_uri()}?mode=ro", uri=True,
+                                       check_same_thread=False)
+        else:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        self._total_size = self._db.execute(
+            "SELECT COALESCE(SUM(entry_size), 0) FROM media_info_cache").fetchone()[0]
+
+    def get(self, file_stat, parse_mode='full'):
+        """
+        Liefert das gespeicherte Ergebnis für die Datei oder None, wenn kein gültiger Eintrag existiert.
+        """
+        with self._lock:
+            row = self._db.execute("""
+                SELECT file_size, mtime_ns, extractor_version, parse_mode, media_info FROM media_info_cache
+                WHERE st_dev = ? AND st_ino = ?
+            """, (file_stat.st_dev, file_stat.st_ino)).fetchone()
+
+            if (not row or row[:3] != (file_stat.st_size, file_stat.st_mtime_ns, self.extractor_version)
+                    or row[3] not in (parse_mode, 'full')):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if self.read_only:
+                return json.loads(row[4], object_hook=_decode_object)
+            self._db.execute("UPDATE media_info_cache SET last_used = ? WHERE st_dev = ? AND st_ino = ?",
+                             (time.time(), file_stat.st_dev, file_stat.st_ino))
+            self._written()
+        return json.loads(row[4], object_hook=_decode_object)
+
+    def put(self, file_path, file_stat, media_info, parse_mode='full'):
+        """
+        Speichert ein Extraktionsergebnis und ersetzt einen veralteten Eintrag derselben Datei.
+        """
+        data = json.dumps(media_info, default=_encode_value)
+        entry_size = len(data) + len(file_path)
+        key = (file_stat.st_dev, file_stat.st_ino)
+
+        with self._lock:
+            old_entry = self._db.execute("SELECT entry_size FROM media_info_cache WHERE st_dev = ? AND st_ino = ?",
+                                         key).fetchone()
+            self._db.execute("""
+                INSERT OR REPLACE INTO media_info_cache
+                (st_dev, st_ino, file_size, mtime_ns, extractor_version, parse_mode,
+                 file_path, media_info, entry_size, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, key + (file_stat.st_size, file_stat.st_mtime_ns, self.extractor_version, parse_mode,
+                        file_path, data, entry_size, time.time()))
+            self._total_size += entry_size - (old_entry[0] if old_entry else 0)
+
+            if self._total_size > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICTION_TARGET))
+            self._written()
+
+    def _written(self):
+        # Regelmäßig festschreiben, damit ein abgebrochener Lauf den Cache nicht verliert
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def _evict(self, target_size):
+        """
+        Entfernt die am längsten nicht verwendeten Einträge, bis target_size erreicht ist.
+        """
+        removed = 0
+        cursor = self._db.execute("SELECT st_dev, st_ino, entry_size FROM media_info_cache ORDER BY last_used")
+        victims = []
+        for st_dev, st_ino, entry_size in cursor:
+            if self._total_size <= target_size:
+                break
+            victims.append((st_dev, st_ino))
+            self._total_size -= entry_size
+            removed += 1
+        self._db.executemany("DELETE FROM media_info_cache WHERE st_dev = ? AND st_ino = ?", victims)
+        self._db.commit()
+        logging.debug(f"Extraktions-Cache: {removed} Einträge verdrängt.")
+        return removed
+
+    def prune(self, max_mb=None, missing=False):
+        """
+        Räumt den Cache auf: mit missing alle Einträge, deren Datei nicht mehr existiert
+        oder verändert wurde, mit max_mb alle ältesten Einträge oberhalb dieser Größe.
+        Gibt die Anzahl entfernter Einträge zurück.
+        """
+        removed = 0
+        with self._lock:
+            if missing:
+                stale = []
+                for st_dev, st_ino, file_path, file_size, mtime_ns, entry_size in self._db.execute(
+                        "SELECT st_dev, st_ino, file_path, file_size, mtime_ns, entry_size FROM media_info_cache"):
+                    try:
+                        file_stat = os.stat(file_path)
+                        current = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+                    except OSError:
+                        current = None
+                    if current != (st_dev, st_ino, file_size, mtime_ns):
+                        stale.append((st_dev, st_ino))
+                        self._total_size -= entry_size
+                self._db.executemany("DELETE FROM media_info_cache WHERE st_dev = ? AND st_ino = ?", stale)
+                removed += len(stale)
+
+            if max_mb is not None:
+                removed += self._evict(int(max_mb * 1024 * 1024))
+            self._db.commit()
+        return removed
+
+    def clear(self):
+        """
+        Entfernt alle Einträge.
+        """
+        with self._lock:
+            removed = self._db.execute("DELETE FROM media_info_cache").rowcount
+            self._db.commit()
+            self._total_size = 0
+        return removed
+
+    def statistics(self):
+        """
+        Liefert Kennzahlen des Caches (Einträge, Größe, Einträge je Extraktor-Version).
+        """
+        with self._lock:
+            entries, oldest, newest = self._db.execute(
+                "SELECT COUNT(*), MIN(last_used), MAX(last_used) FROM media_info_cache").fetchone()
+            versions = dict(self._db.execute(
+                "SELECT extractor_version, COUNT(*) FROM media_info_cache GROUP BY extractor_version").fetchall())
+        return {
+            'entries': entries,
+            'size_bytes': self._total_size,
+            'max_bytes': self.max_bytes,
+            'versions': versions,
+            'oldest_use': datetime.fromtimestamp(oldest) if oldest else None,
+            'newest_use': datetime.fromtimestamp(newest) if newest else None,
+        }
+
+    def close(self):
+        with self._lock:
+            if not self.read_only:
+                self._db.commit()
+            self._db.close()
+
+def main():
+    """
+    Kommandozeile zum Anzeigen und Aufräumen des Extraktions-Caches.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Extraktions-Cache des Anime-Archivers verwalten')
+    parser.add_argument('--path', default=None, help=f'Pfad der Cache-Datei (Standard: {EXTRACTION_CACHE_PATH})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Größe und Anzahl der Einträge anzeigen')
+    prune_parser = subparsers.add_parser('prune', help='Veraltete oder überzählige Einträge entfernen')
+    prune_parser.add_argument('--max-mb', type=float, default=None,
+                              help='Älteste Einträge entfernen, bis der Cache höchstens so groß ist')
+    prune_parser.add_argument('--missing', action='store_true',
+                              help='Einträge gelöschter oder veränderter Dateien entfernen')
+    subparsers.add_parser('clear', help='Alle Einträge entfernen')
+    args = parser.parse_args()
+
+    path = args.path or EXTRACTION_CACHE_PATH
+    if not path:
+        logging.error("Kein Cache-Pfad konfiguriert (EXTRACTION_CACHE_PATH ist leer).")
+        sys.exit(1)
+
+    cache = ExtractionCache(path)
+    try:
+        if args.command == 'stats':
+            stats = cache.statistics()
+            logging.info(f"Cache-Datei: {path}")
+            logging.info(f"Einträge: {stats['entries']}")
+            logging.info(f"Größe: {stats['size_bytes'] / 1024 / 1024:.1f} MB von {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+            for version, count in sorted(stats['versions'].items()):
+                logging.info(f"Extraktor-Version {version}: {count} Einträge")
+            if stats['entries']:
+                logging.info(f"Zuletzt verwendet: {stats['oldest_use']:%Y-%m-%d %H:%M} bis {stats['newest_use']:%Y-%m-%d %H:%M}")
+        elif args.command == 'prune':
+            if args.max_mb is None and not args.missing:
+                parser.error("prune benötigt --max-mb und/oder --missing")
+            removed = cache.prune(max_mb=args.max_mb, missing=args.missing)
+            logging.info(f"{removed} Einträge entfernt.")
+        elif args.command == 'clear':
+            logging.info(f"{cache.clear()} Einträge entfernt.")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Erkennung von Staffel- und Episodennummern in Datei- und Ordnernamen.
+
+Die Regeln sind einmalig kompilierte reguläre Ausdrücke in fester Reihenfolge; die
+erste passende Regel liefert Staffel, Episode, Episodenbereich (E01-E02) und
+Versionskennung (v2) in einem Durchgang. Die Reihenfolge entspricht der Häufigkeit
+in der Mediathek (siehe benchmarks/bench_filename_parser.py), sodass die meisten
+Namen schon mit der ersten oder zweiten Regel erkannt werden.
+
+Vor dem Abgleich werden Dateiendung und Klammerblöcke ([Gruppe], [1080p], (BD), [CRC32])
+entfernt sowie Punkte und Unterstriche durch Leerzeichen ersetzt; Dezimalzahlen in
+ansonsten durch Leerzeichen getrennten Namen (Evangelion 3.0+1.0) bleiben dabei als ein
+Wort erhalten, damit ihre Nachkommastellen nicht als Episode gelten. Vor den Regeln für
+nackte Zahlen werden zusätzlich Qualitätsangaben entfernt, damit Zahlen wie 1080 oder
+264 nicht als Episode gelten.
+"""
+
+import os
+import re
+from operator import itemgetter
+from collections import namedtuple
+
+# rule: Name der Regel, die gepasst hat (None = keine Nummer erkannt)
+ParsedName = namedtuple('ParsedName', 'season episode episode_end version rule')
+UNPARSED = ParsedName(None, None, None, None, None)
+
+_BRACKETS = re.compile(r'\[[^\]]*\]|\([^)]*\)|\{[^}]*\}')
+_QUALITY_TAGS = re.compile(
+    r'(?<![a-z0-9])(?:\d{3,4}p|[248]k|x26[45]|h ?26[45]|hevc|avc|xvid|web(?:[ -]?dl|rip)?|bd(?:rip)?|blu ?ray|'
+    r'dvd(?:rip)?|hdtv|remux|aac(?:2 0)?|ac3|flac|opus|dts|10 ?bit|8 ?bit|hdr|dual audio|multi)(?![a-z0-9])')
+_SEPARATORS = str.maketrans('._', '  ')
+# Dezimal- bzw. Versionsnummer als eigenes Wort (1.11, 3.0+1.0); der Punkt wird zum Komma
+_DECIMAL = re.compile(r'(?<![^ +])(\d{1,2})\.(\d{1,3})(?![^ +])')
+
+_VERSION = r'(?:v(\d{1,2}))?'
+_KEYWORD = r'(?:episode|folge|ep|e)\.? ?'
+
+# Regeln für Episodennamen: (Name, Muster, Gruppen für Staffel/Episode/Ende/Version)
+EPISODE_RULES = [
+    # Naruto S01E05, S01E05-E06, S01E05E06, S1 E5v2
+    ('season_episode', re.compile(
+        rf'(?<![a-z0-9])s(\d{{1,2}}) ?e(\d{{1,4}})(?:(?: ?- ?e?|e)(\d{{1,4}}))?{_VERSION}(?![0-9])'), (1, 2, 3, 4)),
+    # Naruto E05, EP05, Episode 5, Folge 5-6
+    ('keyword', re.compile(
+        rf'(?<![a-z]){_KEYWORD}(\d{{1,4}})(?: ?- ?(?:{_KEYWORD})?(\d{{1,4}}))?{_VERSION}(?![0-9])'), (None, 1, 2, 3)),
+    # [Gruppe] Titel - 05 [1080p], Titel - 1071, Titel - 05-06
+    ('dash', re.compile(rf' - (\d{{1,4}})(?:-(\d{{1,4}}))?{_VERSION}(?= |$)'), (None, 1, 2, 3)),
+    # 01 - Titel, 01.Titel, 01-02 Titel
+    ('leading', re.compile(rf'^(\d{{1,4}})(?:-(\d{{1,4}}))?{_VERSION}(?![0-9a-z])'), (None, 1, 2, 3)),
+    # Titel 1x05
+    ('cross', re.compile(r'(?<![0-9])(\d{1,2})x(\d{2,3})(?![0-9])'), (1, 2, None, None)),
+    # Titel 05, One Piece 1071
+    ('trailing', re.compile(rf' (\d{{1,4}}){_VERSION}$'), (None, 1, None, 2)),
+]
+# Gruppennummern -> Auswahl aus match.groups() + (None,); fehlende Felder zeigen auf das None am Ende
+EPISODE_RULES = [(rule, pattern, itemgetter(*(group - 1 if group else -1 for group in groups)))
+                 for rule, pattern, groups in EPISODE_RULES]
+# Die ersten Regeln verlangen ein Schlüsselwort oder " - " und werden von Qualitätsangaben
+# nicht getäuscht; für sie genügt die günstige Aufbereitung ohne _QUALITY_TAGS
+_KEYWORD_RULES = EPISODE_RULES[:3]
+_NUMBER_RULES = EPISODE_RULES[3:]
+# Regeln, die nur eine nackte Zahl erkennen; mit bekanntem Titelpräfix wird der Rest bevorzugt
+_BARE_NUMBER_RULES = {'leading', 'trailing', None}
+
+# Staffelangabe in einem Episodennamen, dessen Episode ohne Staffel erkannt wurde
+_ORDINAL_SEASON = r'(?<![0-9])(\d{1,2})(?:st|nd|rd|th) season(?![a-z])'
+_SEASON_IN_NAME = re.compile(rf'(?<![a-z])(?:staffel|season|s) ?(\d{{1,2}})(?![0-9])|{_ORDINAL_SEASON}')
+# Nach einer nackten Zahl gilt nur die eindeutige Form "2nd Season"
+_ORDINAL_SEASON_IN_NAME = re.compile(_ORDINAL_SEASON)
+
+# Regeln für Staffelordner, in Reihenfolge der Häufigkeit
+SEASON_RULES = [
+    ('staffel', re.compile(r'staffel ?(\d+)')),
+    ('season', re.compile(r'season ?(\d+)')),
+    ('ordinal', re.compile(r'(\d+)(?:st|nd|rd|th|\.) season')),
+    ('short', re.compile(r'(?<![a-z])s ?(\d{1,3})(?![0-9])')),
+    ('number', re.compile(r'^(\d+)$')),
+]
+
+def _clean(name):
+    """
+    Kleinbuchstaben, ohne Klammerblöcke, Trennzeichen als einfache Leerzeichen.
+    """
+    if '.' in name and ' ' in name:
+        name = _DECIMAL.sub(r'\1,\2', name)
+    name = name.lower().translate(_SEPARATORS)
+    if '[' in name or '(' in name or '{' in name:
+        name = _BRACKETS.sub(' ', name)
+    return ' '.join(name.split())
+
+def _strip_quality_tags(cleaned):
+    return ' '.join(_QUALITY_TAGS.sub(' ', cleaned).split())
+
+def normalize_name(name, strip_extension=True):
+    """
+    Bereitet einen Namen für die Regeln auf: Kleinbuchstaben, ohne Endung,
+    Klammerblöcke und Qualitätsangaben, Trennzeichen als einfache Leerzeichen.
+    """
+    if strip_extension:
+        name = _strip_extension(name)
+    return _strip_quality_tags(_clean(name))
+
+def _strip_extension(name):
+    # Schneller als os.path.splitext; nur kurze alphanumerische Endungen gelten als Endung
+    stem, dot, extension = name.rpartition('.')
+    return stem if dot and stem and len(extension) <= 5 and extension.isalnum() else name
+
+def _match_episode(name, rules=EPISODE_RULES):
+    for rule, pattern, select in rules:
+        match = pattern.search(name)
+        if match is None:
+            continue
+        # Angehängtes None für Felder, die die Regel nicht kennt
+        season, episode, episode_end, version = select(match.groups() + (None,))
+        season = int(season) if season else None
+        episode = int(episode)
+        episode_end = int(episode_end) if episode_end else None
+        version = int(version) if version else None
+        if season is None and 's' in name[:match.start()]:
+            season_pattern = _ORDINAL_SEASON_IN_NAME if rule in _BARE_NUMBER_RULES else _SEASON_IN_NAME
+            season_match = season_pattern.search(name, 0, match.start())
+            if season_match:
+                season = int(season_match.group(season_match.lastindex))
+        if episode_end is not None and episode_end <= episode:
+            episode_end = None
+        return ParsedName(season, episode, episode_end, version, rule)
+    return UNPARSED
+
+def parse_episode_name(name, title_prefix=''):
+    """
+    Erkennt Staffel, Episode, Episodenbereich und Version in einem Dateinamen.
+    title_prefix ist der gemeinsame Titel aller Dateien des Verzeichnisses (siehe
+    common_title_prefix); wird nur eine nackte Zahl erkannt, zählt die erste Zahl
+    nach dem Titel, damit z.B. bei "86 05" nicht 86 als Episode gilt.
+    """
+    cleaned = _clean(_strip_extension(name))
+    parsed = _match_episode(cleaned, _KEYWORD_RULES)
+    if parsed.rule is not None:
+        return parsed
+    normalized = _strip_quality_tags(cleaned)
+    parsed = _match_episode(normalized, _NUMBER_RULES)
+    if title_prefix and normalized.startswith(title_prefix):
+        remainder = _match_episode(normalized[len(title_prefix):].lstrip(' -'))
+        if remainder.episode is not None:
+            # Eine Staffelangabe im Titel (Re Zero 2nd Season) gilt weiterhin
+            return remainder if remainder.season is not None else remainder._replace(season=parsed.season)
+    return parsed
+
+def common_title_prefix(names):
+    """
+    Gemeinsamer Titel der normalisierten Namen eines Verzeichnisses, gekürzt auf
+    ganze Wörter. Leer bei weniger als zwei Namen.
+    """
+    if len(names) < 2:
+        return ''
+    prefix = os.path.commonprefix([normalize_name(name) for name in names])
+    # Ein angeschnittenes Wort (z.B. "titel 1" bei Episoden 10-19) gehört nicht zum Titel
+    return prefix[:prefix.rfind(' ') + 1]
+
+def parse_episode_names(names):
+    """
+    Erkennt die Nummern aller Dateinamen eines Verzeichnisses (z.B. einer Verzeichnisliste)
+    und gibt sie in derselben Reihenfolge zurück. Der gemeinsame Titel wird nur bestimmt,
+    wenn ein Name lediglich eine nackte Zahl enthält, und dann nur einmal.
+    """
+    results = [parse_episode_name(name) for name in names]
+    bare = [index for index, parsed in enumerate(results) if parsed.rule in _BARE_NUMBER_RULES]
+    if bare:
+        title_prefix = common_title_prefix(names)
+        if title_prefix:
+            for index in bare:
+                results[index] = parse_episode_name(names[index], title_prefix)
+    return results
+
+def parse_season_name(name):
+    """
+    Erkennt die Staffelnummer in einem Ordnernamen (Staffel 2, Season 02, S2, 2nd Season, 2).
+    """
+    normalized = normalize_name(name, strip_extension=False)
+    for _, pattern in SEASON_RULES:
+        match = pattern.search(normalized)
+        if match:
+            return int(match.group(1))
+    return None
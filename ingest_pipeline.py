@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingest-Pipeline: verbindet Verzeichnissuche, Metadatenextraktion und Datenbankzugriffe
+über begrenzte asyncio-Warteschlangen, sodass langsame Verzeichnislisten (NFS),
+langsame MediaInfo-Analysen und Datenbank-Roundtrips sich überlappen statt sich zu addieren.
+
+    Quelle (eigener Thread) -> [Warteschlange] -> Extraktion (Thread-Pool)
+                            -> [Warteschlange] -> Persistenz (ein DB-Thread)
+
+Die Warteschlangen sind begrenzt: ist eine Stufe langsamer, blockieren die vorherigen
+(Gegendruck), und der Speicherbedarf bleibt auch bei sehr großen Bäumen konstant.
+Die Persistenz verarbeitet die Elemente in der Reihenfolge der Quelle und läuft immer
+im selben Thread, die Datenbankverbindung wird also nie zwischen Threads geteilt.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+# Konfigurationsvariablen
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '256'))
+# Höchstens so viele fertige Elemente werden in einem Aufruf an den DB-Thread übergeben
+PIPELINE_PERSIST_BATCH = int(os.getenv('PIPELINE_PERSIST_BATCH', '64'))
+# Abstand der Fortschrittsausgaben in Sekunden (im Terminal wird häufiger aktualisiert)
+PIPELINE_PROGRESS_INTERVAL = float(os.getenv('PIPELINE_PROGRESS_INTERVAL', '30'))
+TERMINAL_REFRESH_INTERVAL = 0.5
+
+# Ende der Quelle
+_DONE = object()
+
+class PipelineStopped(Exception):
+    """Die Pipeline wurde abgebrochen, während die Quelle auf Platz in der Warteschlange wartete."""
+
+class StageCounter:
+    """
+    Zählt die verarbeiteten Elemente einer Stufe und berechnet den Durchsatz.
+    """
+    def __init__(self, name, clock=time.monotonic):
+        self.name = name
+        self.count = 0
+        self._clock = clock
+        self._started = clock()
+        self._last_count = 0
+        self._last_time = self._started
+
+    def add(self, count=1):
+        self.count += count
+
+    def rate(self):
+        """
+        Durchsatz seit dem letzten Aufruf in Elementen pro Sekunde.
+        """
+        now = self._clock()
+        elapsed = now - self._last_time
+        rate = (self.count - self._last_count) / elapsed if elapsed > 0 else 0.0
+        self._last_count, self._last_time = self.count, now
+        return rate
+
+    def average_rate(self):
+        elapsed = self._clock() - self._started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+class PipelineProgress:
+    """
+    Fortschrittsanzeige mit Durchsatz je Stufe und Füllstand der Warteschlangen.
+    Im Terminal wird eine Zeile laufend überschrieben, sonst (z.B. Cron, Logdatei)
+    alle PIPELINE_PROGRESS_INTERVAL Sekunden eine Logzeile geschrieben.
+    """
+    def __init__(self, description, total=None, stream=None):
+        self.description = description
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.interactive = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.interval = TERMINAL_REFRESH_INTERVAL if self.interactive else PIPELINE_PROGRESS_INTERVAL
+        self.discovered = StageCounter('gefunden')
+        self.extracted = StageCounter('extrahiert')
+        self.persisted = StageCounter('geschrieben')
+        self.queues = {}
+
+    def line(self, average=False):
+        parts = []
+        for counter, queue_name in ((self.discovered, 'extraction'), (self.extracted, 'persist'),
+                                    (self.persisted, None)):
+            rate = counter.average_rate() if average else counter.rate()
+            total = f"/{self.total}" if self.total is not None else ""
+            part = f"{counter.name}: {counter.count}{total} ({rate:.1f}/s)"
+            queue = self.queues.get(queue_name)
+            if queue is not None and not average:
+                part += f" [Warteschlange {queue.qsize()}/{queue.maxsize}]"
+            parts.append(part)
+        return f"{self.description}: " + " | ".join(parts)
+
+    def report(self):
+        if self.interactive:
+            self.stream.write('\r' + self.line() + '\033[K')
+            self.stream.flush()
+        else:
+            logging.info(self.line())
+
+    def finish(self):
+        if self.interactive:
+            self.stream.write('\n')
+        logging.info(self.line(average=True))
+
+def _put_from_thread(queue, item, loop, stop):
+    """
+    Legt ein Element aus einem fremden Thread in die asyncio-Warteschlange und wartet,
+    solange sie voll ist (Gegendruck auf die Quelle).
+    """
+    future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+    while True:
+        try:
+            return future.result(timeout=0.5)
+        except concurrent.futures.TimeoutError:
+            if stop.is_set():
+                future.cancel()
+                raise PipelineStopped()
+
+async def _feed(source, queue, progress, stop):
+    loop = asyncio.get_running_loop()
+
+    def produce():
+        for item in source:
+            if stop.is_set():
+                raise PipelineStopped()
+            _put_from_thread(queue, item, loop, stop)
+            progress.discovered.add()
+        _put_from_thread(queue, _DONE, loop, stop)
+
+    # Eigener Thread, damit blockierende Verzeichniszugriffe den Event-Loop nicht aufhalten
+    source_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='discovery')
+    try:
+        await loop.run_in_executor(source_thread, produce)
+    finally:
+        source_thread.shutdown(wait=False)
+
+async def _extract(extract, executor, discovered, extracted, progress):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await discovered.get()
+        if item is _DONE:
+            await extracted.put((_DONE, None))
+            return
+        # Die Future wird in Reihenfolge weitergereicht, die Extraktion läuft parallel weiter
+        future = loop.run_in_executor(executor, extract, item)
+        future.add_done_callback(lambda _: progress.extracted.add())
+        await extracted.put((item, future))
+
+async def _persist(persist, db_executor, extracted, progress):
+    loop = asyncio.get_running_loop()
+
+    def persist_batch(batch):
+        for item, result in batch:
+            persist(item, result)
+
+    carried = None
+    while True:
+        item, future = carried or await extracted.get()
+        carried = None
+        batch = []
+        # Bereits fertig extrahierte Nachfolger gleich mitnehmen, um Thread-Wechsel zu sparen
+        while item is not _DONE:
+            batch.append((item, await future))
+            if len(batch) >= PIPELINE_PERSIST_BATCH or extracted.empty():
+                break
+            item, future = extracted.get_nowait()
+            if item is not _DONE and not future.done():
+                carried = (item, future)
+                break
+        if batch:
+            await loop.run_in_executor(db_executor, persist_batch, batch)
+            progress.persisted.add(len(batch))
+        if item is _DONE:
+            return
+
+async def _report(progress):
+    while True:
+        await asyncio.sleep(progress.interval)
+        progress.report()
+
+async def _run(source, extract, persist, executor, db_executor, queue_size, progress):
+    discovered = asyncio.Queue(maxsize=queue_size)
+    extracted = asyncio.Queue(maxsize=queue_size)
+    progress.queues = {'extraction': discovered, 'persist': extracted}
+    stop = threading.Event()
+
+    stages = [asyncio.ensure_future(stage) for stage in (
+        _feed(source, discovered, progress, stop),
+        _extract(extract, executor, discovered, extracted, progress),
+        _persist(persist, db_executor, extracted, progress),
+    )]
+    reporter = asyncio.ensure_future(_report(progress))
+    try:
+        # Bricht eine Stufe mit einem Fehler ab, werden die übrigen beendet
+        done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+        for stage in done:
+            stage.result()
+    finally:
+        stop.set()
+        reporter.cancel()
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(reporter, *stages, return_exceptions=True)
+
+def interleave(sources):
+    """
+    Verbindet mehrere Quellen abwechselnd Element für Element (Round-Robin), bis alle
+    erschöpft sind. Die Reihenfolge innerhalb jeder Quelle bleibt erhalten.
+    """
+    iterators = [iter(source) for source in sources]
+    while iterators:
+        for iterator in list(iterators):
+            try:
+                yield next(iterator)
+            except StopIteration:
+                iterators.remove(iterator)
+
+def run_pipeline(source, extract, persist, executor=None, queue_size=None, description="Verarbeite",
+                 total=None):
+    """
+    Verarbeitet alle Elemente der Quelle in drei überlappenden Stufen.
+
+    Args:
+        source: Iterator der zu verarbeitenden Elemente, läuft in einem eigenen Thread
+        extract: Funktion element -> ergebnis, läuft parallel im executor
+        persist: Funktion (element, ergebnis), läuft in Reihenfolge der Quelle in einem einzigen Thread
+        executor: Thread-Pool für die Extraktion (None = ein eigener Thread)
+        queue_size: Kapazität jeder Warteschlange (Standard: PIPELINE_QUEUE_SIZE)
+        description: Bezeichnung in der Fortschrittsanzeige
+        total: Erwartete Anzahl der Elemente für die Fortschrittsanzeige, falls bekannt
+    """
+    progress = PipelineProgress(description, total)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mediainfo')
+    db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='database')
+    try:
+        asyncio.run(_run(source, extract, persist, executor, db_executor,
+                         queue_size or PIPELINE_QUEUE_SIZE, progress))
+    finally:
+        db_executor.shutdown()
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+        progress.finish()
+    return progress
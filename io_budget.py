@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lesebudget für die Metadatenextraktion auf gemeinsam genutztem Speicher (NAS).
+
+Ein Token-Bucket begrenzt die gelesenen Bytes pro Sekunde über alle Extraktions-Threads,
+ein Semaphor die Anzahl gleichzeitig geöffneter Dateien. So bleibt genug Bandbreite für
+Mediaplayer, die vom selben NAS streamen, und ein Scan kann auch tagsüber laufen.
+
+Gezählt wird auf zwei Wegen:
+  - Lesezugriffe über ThrottledReader (MediaInfo mit Dateiobjekt) werden beim Lesen
+    abgebucht und sofort gebremst.
+  - Alles andere (Kopfdaten über mmap, MediaInfo mit Dateipfad) wird nach der Datei
+    anhand der Lesezähler des Threads (/proc/thread-self/io) nachträglich abgebucht;
+    die folgenden Lesezugriffe warten dann entsprechend länger.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from run_metrics import read_io_counters, format_bytes, THREAD_IO_PATH
+
+MB = 1024 * 1024
+
+class IOBudget:
+    """
+    Token-Bucket für Lese-Bytes (rate in Bytes/s, 0 = unbegrenzt) und Obergrenze für
+    gleichzeitig geöffnete Dateien (max_open_files, 0 = unbegrenzt).
+    Der Bucket fasst burst Bytes (Standard: eine Sekunde); wer mehr abbucht als vorhanden,
+    wartet, bis der Fehlbetrag nachgeflossen ist.
+    """
+    def __init__(self, rate=0, max_open_files=0, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.max_open_files = max_open_files
+        self.burst = burst if burst is not None else rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+        self._open_slots = threading.BoundedSemaphore(max_open_files) if max_open_files > 0 else None
+        self._started = None
+        # Abgebuchte Bytes, Wartezeit auf Tokens bzw. auf eine freie Datei, geöffnete Dateien
+        self.bytes_read = 0
+        self.throttled_seconds = 0.0
+        self.open_wait_seconds = 0.0
+        self.files = 0
+
+    @property
+    def limited(self):
+        return self.rate > 0 or self._open_slots is not None
+
+    def consume(self, size):
+        """
+        Bucht size gelesene Bytes ab und wartet, falls das Budget überzogen ist.
+        """
+        if size <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            if self._started is None:
+                self._started = now
+            self.bytes_read += size
+            if self.rate <= 0:
+                return
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate) - size
+            self._updated = now
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.throttled_seconds += wait
+        # Außerhalb der Sperre warten; der Fehlbetrag ist bereits reserviert
+        if wait > 0:
+            self._sleep(wait)
+
+    @contextmanager
+    def reading(self):
+        """
+        Rahmen um das Lesen einer Datei: wartet auf eine freie Datei und bucht nach dem
+        Lesen die Bytes ab, die nicht schon über ThrottledReader gezählt wurden.
+        Gibt einen Zähler zurück, den ThrottledReader für die Datei fortschreibt.
+        """
+        counter = _FileCounter()
+        if self._open_slots is not None:
+            start = self._clock()
+            self._open_slots.acquire()
+            with self._lock:
+                self.open_wait_seconds += self._clock() - start
+        # Auch ohne Budget messen, damit der erreichte Durchsatz gemeldet werden kann
+        before = read_io_counters(THREAD_IO_PATH)
+        try:
+            yield counter
+        finally:
+            if self._open_slots is not None:
+                self._open_slots.release()
+            with self._lock:
+                self.files += 1
+            if before is not None:
+                after = read_io_counters(THREAD_IO_PATH)
+                if after is not None:
+                    # read_bytes erfasst auch über mmap eingelesene Seiten, rchar alle read()-Aufrufe
+                    measured = max(after['rchar'] - before['rchar'], after['read_bytes'] - before['read_bytes'])
+                    self.consume(measured - counter.bytes_read)
+
+    def summary(self):
+        """
+        Erreichter Durchsatz gegenüber dem Budget als Dictionary (für Log und Laufbericht).
+        """
+        elapsed = (self._clock() - self._started) if self._started is not None else 0.0
+        return {
+            'budget_mb_per_second': self.rate / MB if self.rate > 0 else None,
+            'max_open_files': self.max_open_files or None,
+            'bytes_read': self.bytes_read,
+            'files': self.files,
+            'elapsed_s': round(elapsed, 3),
+            'achieved_mb_per_second': round(self.bytes_read / MB / elapsed, 3) if elapsed > 0 else None,
+            'throttled_s': round(self.throttled_seconds, 3),
+            'open_wait_s': round(self.open_wait_seconds, 3),
+        }
+
+    def log_summary(self):
+        data = self.summary()
+        achieved = data['achieved_mb_per_second']
+        achieved = f"{achieved:.1f} MB/s" if achieved is not None else "-"
+        budget = f"{data['budget_mb_per_second']:g} MB/s" if data['budget_mb_per_second'] else "unbegrenzt"
+        open_files = f", höchstens {self.max_open_files} Dateien gleichzeitig" if self.max_open_files else ""
+        logging.info(f"Lesedurchsatz: {format_bytes(self.bytes_read)} aus {self.files} Dateien, {achieved} "
+                     f"(Budget {budget}{open_files}); gebremst {data['throttled_s']:.1f}s, "
+                     f"auf freie Datei gewartet {data['open_wait_s']:.1f}s")
+
+class _FileCounter:
+    def __init__(self):
+        self.bytes_read = 0
+
+class ThrottledReader:
+    """
+    Dateiobjekt für MediaInfo.parse, das jeden Lesezugriff vom Budget abbucht.
+    counter ist der Zähler aus IOBudget.reading(), damit die Bytes nicht doppelt zählen.
+    """
+    def __init__(self, file, budget, counter=None):
+        self._file = file
+        self._budget = budget
+        self._counter = counter
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        if self._counter is not None:
+            self._counter.bytes_read += len(data)
+        self._budget.consume(len(data))
+        return data
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Media-Header: Liest die Kopfdaten von Matroska- (.mkv/.webm) und MP4-Dateien (.mp4/.m4v/.mov)
+direkt in Python über mmap, ohne libmediainfo zu laden.
+
+Gelesen werden nur die Bereiche, in denen die archivierten Felder stehen: bei Matroska
+EBML-Header, Segment Info, Tracks und Tags (über den SeekHead gefunden) sowie der Anfang
+des ersten Clusters, bei MP4 die moov-Box. Das Ergebnis bildet die Tracks von MediaInfo
+nach (gleiche Attributnamen und Wertformate), sodass extract_media_info es unverändert
+auswerten kann. Kann eine Datei nicht vollständig dekodiert werden, liefert
+parse_media_headers None und der Aufrufer verwendet MediaInfo.
+"""
+
+import os
+import mmap
+import struct
+import logging
+from datetime import datetime, timedelta
+
+# Dateiendungen, für die sich der Versuch lohnt
+SUPPORTED_EXTENSIONS = {'.mkv', '.webm', '.mp4', '.m4v', '.mov'}
+
+# Bereich am Anfang des ersten Clusters bzw. der Codec-Daten, in dem nach Encoder-Kennungen gesucht wird
+ENCODER_SNIFF_BYTES = 256 * 1024
+
+# Encoder-Kennungen in SEI-Nachrichten, wie MediaInfo sie als Encoded_Library_Name meldet
+ENCODER_SIGNATURES = [(b'x264 - core', 'x264'), (b'x265 (build', 'x265')]
+
+# ISO 639-2 -> ISO 639-1, wie MediaInfo Sprachen ausgibt
+LANGUAGE_CODES = {
+    'jpn': 'ja', 'eng': 'en', 'ger': 'de', 'deu': 'de', 'fre': 'fr', 'fra': 'fr', 'spa': 'es',
+    'ita': 'it', 'por': 'pt', 'rus': 'ru', 'chi': 'zh', 'zho': 'zh', 'kor': 'ko', 'ara': 'ar',
+    'pol': 'pl', 'tur': 'tr', 'dut': 'nl', 'nld': 'nl', 'swe': 'sv', 'nor': 'no', 'dan': 'da',
+    'fin': 'fi', 'cze': 'cs', 'ces': 'cs', 'hun': 'hu', 'gre': 'el', 'ell': 'el', 'heb': 'he',
+    'hin': 'hi', 'tha': 'th', 'vie': 'vi', 'ind': 'id', 'may': 'ms', 'msa': 'ms', 'ukr': 'uk',
+    'rum': 'ro', 'ron': 'ro', 'bul': 'bg', 'hrv': 'hr', 'srp': 'sr', 'slo': 'sk', 'slk': 'sk',
+    'slv': 'sl', 'cat': 'ca', 'per': 'fa', 'fas': 'fa', 'lat': 'la',
+}
+
+# Formatnamen von MediaInfo je Codec-ID
+MATROSKA_FORMATS = {
+    'V_MPEG4/ISO/AVC': 'AVC', 'V_MPEGH/ISO/HEVC': 'HEVC', 'V_AV1': 'AV1', 'V_VP9': 'VP9',
+    'V_VP8': 'VP8', 'V_MPEG2': 'MPEG Video', 'V_MPEG1': 'MPEG Video', 'V_MPEG4/ISO/ASP': 'MPEG-4 Visual',
+    'V_THEORA': 'Theora',
+    'A_AAC': 'AAC', 'A_AAC/MPEG2/LC': 'AAC', 'A_AAC/MPEG4/LC': 'AAC', 'A_AAC/MPEG4/LC/SBR': 'AAC',
+    'A_AC3': 'AC-3', 'A_EAC3': 'E-AC-3', 'A_DTS': 'DTS', 'A_FLAC': 'FLAC', 'A_OPUS': 'Opus',
+    'A_VORBIS': 'Vorbis', 'A_MPEG/L3': 'MPEG Audio', 'A_MPEG/L2': 'MPEG Audio', 'A_TRUEHD': 'MLP FBA',
+    'A_PCM/INT/LIT': 'PCM', 'A_PCM/INT/BIG': 'PCM', 'A_PCM/FLOAT/IEEE': 'PCM',
+    'S_TEXT/UTF8': 'UTF-8', 'S_TEXT/ASS': 'ASS', 'S_TEXT/SSA': 'SSA', 'S_ASS': 'ASS', 'S_SSA': 'SSA',
+    'S_HDMV/PGS': 'PGS', 'S_VOBSUB': 'VobSub', 'S_TEXT/WEBVTT': 'WebVTT', 'S_DVBSUB': 'DVB Subtitle',
+}
+MP4_FORMATS = {
+    'avc1': 'AVC', 'avc3': 'AVC', 'hvc1': 'HEVC', 'hev1': 'HEVC', 'dvh1': 'HEVC', 'dvhe': 'HEVC',
+    'dva1': 'AVC', 'dvav': 'AVC', 'av01': 'AV1', 'vp09': 'VP9', 'mp4v': 'MPEG-4 Visual',
+    'ac-3': 'AC-3', 'ec-3': 'E-AC-3', 'Opus': 'Opus', 'fLaC': 'FLAC', 'alac': 'ALAC', '.mp3': 'MPEG Audio',
+    'tx3g': 'Timed Text', 'wvtt': 'WebVTT', 'stpp': 'TTML', 'c608': 'EIA-608',
+}
+# objectTypeIndication aus dem esds-Deskriptor (mp4a)
+MP4_AUDIO_OBJECT_TYPES = {0x40: 'AAC', 0x66: 'AAC', 0x67: 'AAC', 0x68: 'AAC', 0x69: 'MPEG Audio', 0x6B: 'MPEG Audio'}
+# Kanalkonfiguration der AudioSpecificConfig
+AAC_CHANNELS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 8}
+
+# ISO/IEC 23091-2 (Matroska Colour und MP4 colr/nclx)
+TRANSFER_CHARACTERISTICS = {1: 'BT.709', 14: 'BT.2020 (10-bit)', 15: 'BT.2020 (12-bit)', 16: 'PQ', 18: 'HLG'}
+COLOR_PRIMARIES = {1: 'BT.709', 5: 'BT.601 PAL', 6: 'BT.601 NTSC', 9: 'BT.2020', 12: 'Display P3'}
+
+# Video-Codecs, die MediaInfo mit Farbraum YUV meldet
+YUV_FORMATS = {'AVC', 'HEVC', 'AV1', 'VP9', 'VP8', 'MPEG Video', 'MPEG-4 Visual', 'Theora'}
+
+MATROSKA_EPOCH = datetime(2001, 1, 1)
+MP4_EPOCH = datetime(1904, 1, 1)
+
+# Matroska-Element-IDs
+EBML = 0x1A45DFA3
+DOC_TYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+DATE_UTC = 0x4461
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_UID = 0x73C5
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+CODEC_PRIVATE = 0x63A2
+LANGUAGE = 0x22B59C
+LANGUAGE_BCP47 = 0x22B59D
+FLAG_FORCED = 0x55AA
+DEFAULT_DURATION = 0x23E383
+BLOCK_ADDITION_MAPPING = 0x41E4
+BLOCK_ADD_ID_TYPE = 0x41E7
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+FLAG_INTERLACED = 0x9A
+COLOUR = 0x55B0
+BITS_PER_CHANNEL = 0x55B2
+TRANSFER = 0x55BA
+PRIMARIES = 0x55BB
+MASTERING_METADATA = 0x55D0
+AUDIO = 0xE1
+SAMPLING_FREQUENCY = 0xB5
+OUTPUT_SAMPLING_FREQUENCY = 0x78B5
+CHANNELS = 0x9F
+TAGS = 0x1254C367
+TAG = 0x7373
+TARGETS = 0x63C0
+TAG_TRACK_UID = 0x63C5
+SIMPLE_TAG = 0x67C8
+TAG_NAME = 0x45A3
+TAG_STRING = 0x4487
+CLUSTER = 0x1F43B675
+
+# Dolby-Vision-Konfiguration (BlockAddIDType bzw. MP4-Box)
+DOLBY_VISION_CONFIGS = {b'dvcC', b'dvvC'}
+
+class HeaderError(Exception):
+    """Die Datei kann nicht ohne MediaInfo dekodiert werden."""
+
+class HeaderTrack:
+    """
+    Nachbildung eines pymediainfo-Tracks: nicht gesetzte Attribute liefern None.
+    """
+    def __init__(self, track_type, **attributes):
+        self.track_type = track_type
+        self.__dict__.update({name: value for name, value in attributes.items() if value is not None})
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+class HeaderInfo:
+    """
+    Nachbildung des MediaInfo-Ergebnisses (Attribut tracks, General-Track zuerst).
+    """
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    @property
+    def complete(self):
+        """
+        True, wenn Dauer und alle Bitraten aus den Kopfdaten stammen. Ohne Statistik-Tags
+        (Matroska) kann nur MediaInfo die Bitraten durch Lesen der Datei bestimmen.
+        """
+        return all(track.duration is not None if track.track_type == 'General' else
+                   track.bit_rate is not None or track.track_type == 'Text'
+                   for track in self.tracks)
+
+def language_code(code):
+    """
+    Wandelt einen Sprachcode in die Schreibweise von MediaInfo um (ISO 639-1, 'und' = keine Angabe).
+    """
+    if not code or code == 'und':
+        return None
+    return LANGUAGE_CODES.get(code, code)
+
+def format_date(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def format_framerate(frames_per_second):
+    return f"{frames_per_second:.3f}"
+
+def sniff_encoder(data):
+    """
+    Sucht in Codec-Daten oder den ersten Frames nach der Kennung von x264/x265.
+    """
+    for signature, name in ENCODER_SIGNATURES:
+        if data.find(signature) >= 0:
+            return name
+    return None
+
+def codec_bit_depth(video_format, codec_private):
+    """
+    Liest die Farbtiefe aus der Decoder-Konfiguration (avcC, hvcC, av1C).
+    """
+    if not codec_private:
+        return None
+    if video_format == 'HEVC' and len(codec_private) > 17:
+        return (codec_private[17] & 0x07) + 8
+    if video_format == 'AV1' and len(codec_private) > 2:
+        if codec_private[2] & 0x40:
+            return 12 if codec_private[2] & 0x20 else 10
+        return 8
+    if video_format == 'AVC' and len(codec_private) > 5:
+        # avcC: SPS- und PPS-Listen überspringen; nur High-Profile tragen die Farbtiefe
+        profile = codec_private[1]
+        if profile not in (100, 110, 122, 244):
+            return 8
+        position = 6
+        for _ in range(codec_private[5] & 0x1F):
+            position += 2 + struct.unpack_from('>H', codec_private, position)[0]
+        count = codec_private[position]
+        position += 1
+        for _ in range(count):
+            position += 2 + struct.unpack_from('>H', codec_private, position)[0]
+        if position + 1 < len(codec_private):
+            return (codec_private[position + 1] & 0x07) + 8
+        return 8
+    return None
+
+def hdr_attributes(transfer, primaries, mastering, dolby_vision):
+    """
+    HDR-Angaben in der Form, in der MediaInfo sie meldet.
+    """
+    attributes = {
+        'transfer_characteristics': TRANSFER_CHARACTERISTICS.get(transfer),
+        'color_primaries': COLOR_PRIMARIES.get(primaries),
+    }
+    if dolby_vision:
+        attributes['hdr_format'] = 'Dolby Vision'
+    elif transfer == 16 and mastering:
+        attributes['hdr_format'] = 'SMPTE ST 2086'
+        attributes['hdr_format_compatibility'] = 'HDR10'
+    return attributes
+
+# --- Matroska -------------------------------------------------------------------------------------
+
+def read_element_id(data, position):
+    first = data[position]
+    length = 1
+    mask = 0x80
+    while length <= 4 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 4:
+        raise HeaderError(f"Ungültige Element-ID bei {position}")
+    return int.from_bytes(data[position:position + length], 'big'), position + length
+
+def read_element_size(data, position):
+    first = data[position]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise HeaderError(f"Ungültige Elementgröße bei {position}")
+    value = first & (mask - 1)
+    for byte in data[position + 1:position + length]:
+        value = (value << 8) | byte
+    # Alle Bits gesetzt: unbekannte Größe
+    if value == (1 << (7 * length)) - 1:
+        value = None
+    return value, position + length
+
+def iter_elements(data, start, end):
+    """
+    Liefert (id, datenanfang, datenende) der direkten Kindelemente zwischen start und end.
+    """
+    position = start
+    while position < end:
+        element_id, position = read_element_id(data, position)
+        size, position = read_element_size(data, position)
+        data_end = end if size is None else position + size
+        if data_end > end:
+            raise HeaderError(f"Element 0x{element_id:X} ragt über sein Elternelement hinaus")
+        yield element_id, position, data_end
+        position = data_end
+
+def children(data, start, end):
+    """
+    Kindelemente als Dictionary id -> Liste von (anfang, ende).
+    """
+    elements = {}
+    for element_id, data_start, data_end in iter_elements(data, start, end):
+        elements.setdefault(element_id, []).append((data_start, data_end))
+    return elements
+
+def read_uint(data, span):
+    return int.from_bytes(data[span[0]:span[1]], 'big')
+
+def read_float(data, span):
+    length = span[1] - span[0]
+    if length == 4:
+        return struct.unpack_from('>f', data, span[0])[0]
+    if length == 8:
+        return struct.unpack_from('>d', data, span[0])[0]
+    raise HeaderError(f"Ungültige Gleitkommalänge {length}")
+
+def read_string(data, span):
+    return bytes(data[span[0]:span[1]]).rstrip(b'\0').decode('utf-8', errors='replace')
+
+def first(elements, element_id, reader, data, default=None):
+    spans = elements.get(element_id)
+    return reader(data, spans[0]) if spans else default
+
+def locate_segment_children(data, segment_start, segment_end):
+    """
+    Findet Info, Tracks, Tags und den ersten Cluster eines Segments. Die Kindelemente
+    werden bis zum ersten Cluster der Reihe nach gelesen, fehlende über den SeekHead
+    angesprungen, ohne die Cluster selbst zu lesen.
+    """
+    found = {}
+    seek_positions = {}
+    for element_id, data_start, data_end in iter_elements(data, segment_start, segment_end):
+        if element_id == CLUSTER:
+            found.setdefault(CLUSTER, (data_start, data_end))
+            break
+        if element_id == SEEK_HEAD:
+            for seek_start, seek_end in children(data, data_start, data_end).get(SEEK, []):
+                seek = children(data, seek_start, seek_end)
+                if SEEK_ID in seek and SEEK_POSITION in seek:
+                    seek_id = read_uint(data, seek[SEEK_ID][0])
+                    seek_positions.setdefault(seek_id, segment_start + read_uint(data, seek[SEEK_POSITION][0]))
+        elif element_id in (INFO, TRACKS, TAGS):
+            found.setdefault(element_id, (data_start, data_end))
+
+    for element_id in (INFO, TRACKS, TAGS):
+        if element_id in found or element_id not in seek_positions:
+            continue
+        position = seek_positions[element_id]
+        if position >= segment_end:
+            continue
+        actual_id, data_start = read_element_id(data, position)
+        size, data_start = read_element_size(data, data_start)
+        if actual_id != element_id or size is None or data_start + size > segment_end:
+            raise HeaderError(f"SeekHead verweist auf ungültiges Element 0x{element_id:X}")
+        found[element_id] = (data_start, data_start + size)
+    return found
+
+def read_statistics_tags(data, span):
+    """
+    Liest die Bitraten (BPS) der Statistik-Tags von mkvmerge je TrackUID.
+    """
+    bitrates = {}
+    for tag_start, tag_end in children(data, *span).get(TAG, []):
+        tag = children(data, tag_start, tag_end)
+        track_uids = []
+        for targets_span in tag.get(TARGETS, []):
+            targets = children(data, *targets_span)
+            track_uids += [read_uint(data, uid_span) for uid_span in targets.get(TAG_TRACK_UID, [])]
+        for simple_span in tag.get(SIMPLE_TAG, []):
+            simple_tag = children(data, *simple_span)
+            if first(simple_tag, TAG_NAME, read_string, data) == 'BPS':
+                value = first(simple_tag, TAG_STRING, read_string, data)
+                if value and value.isdigit():
+                    for track_uid in track_uids:
+                        bitrates[track_uid] = int(value)
+    return bitrates
+
+def parse_matroska(data):
+    """
+    Dekodiert die Kopfdaten einer Matroska-Datei.
+    """
+    elements = iter_elements(data, 0, len(data))
+    element_id, header_start, header_end = next(elements)
+    if element_id != EBML:
+        raise HeaderError("Kein EBML-Header")
+    doc_type = first(children(data, header_start, header_end), DOC_TYPE, read_string, data, 'matroska')
+    container = {'matroska': 'Matroska', 'webm': 'WebM'}.get(doc_type)
+    if not container:
+        raise HeaderError(f"Unbekannter DocType {doc_type}")
+
+    for element_id, segment_start, segment_end in elements:
+        if element_id == SEGMENT:
+            break
+    else:
+        raise HeaderError("Kein Segment gefunden")
+
+    found = locate_segment_children(data, segment_start, segment_end)
+    if INFO not in found or TRACKS not in found:
+        raise HeaderError("Segment Info oder Tracks fehlen")
+
+    info = children(data, *found[INFO])
+    timecode_scale = first(info, TIMECODE_SCALE, read_uint, data, 1000000)
+    duration = first(info, DURATION, read_float, data)
+    date_utc = first(info, DATE_UTC, lambda d, s: int.from_bytes(d[s[0]:s[1]], 'big', signed=True), data)
+
+    general = HeaderTrack(
+        'General',
+        format=container,
+        duration=int(round(duration * timecode_scale / 1000000)) if duration else None,
+        encoded_date=format_date(MATROSKA_EPOCH + timedelta(microseconds=date_utc // 1000)) if date_utc else None,
+    )
+
+    bitrates = read_statistics_tags(data, found[TAGS]) if TAGS in found else {}
+    first_frames = b''
+    if CLUSTER in found:
+        cluster_start = found[CLUSTER][0]
+        first_frames = data[cluster_start:min(cluster_start + ENCODER_SNIFF_BYTES, len(data))]
+
+    tracks = [general]
+    for entry_span in children(data, *found[TRACKS]).get(TRACK_ENTRY, []):
+        entry = children(data, *entry_span)
+        track_type = first(entry, TRACK_TYPE, read_uint, data)
+        codec_id = first(entry, CODEC_ID, read_string, data)
+        if track_type not in (1, 2, 17):
+            continue
+        track_format = MATROSKA_FORMATS.get(codec_id)
+        if not track_format:
+            raise HeaderError(f"Unbekannte Codec-ID {codec_id}")
+
+        language = first(entry, LANGUAGE_BCP47, read_string, data) or \
+            language_code(first(entry, LANGUAGE, read_string, data, 'eng'))
+        bit_rate = bitrates.get(first(entry, TRACK_UID, read_uint, data))
+
+        if track_type == 1:
+            tracks.append(matroska_video_track(data, entry, codec_id, track_format, language, bit_rate, first_frames))
+        elif track_type == 2:
+            audio = children(data, *entry[AUDIO][0]) if AUDIO in entry else {}
+            sampling_rate = first(audio, OUTPUT_SAMPLING_FREQUENCY, read_float, data) or \
+                first(audio, SAMPLING_FREQUENCY, read_float, data, 8000.0)
+            tracks.append(HeaderTrack(
+                'Audio', codec_id=codec_id, format=track_format, language=language, bit_rate=bit_rate,
+                channel_s=first(audio, CHANNELS, read_uint, data, 1), sampling_rate=int(sampling_rate),
+            ))
+        else:
+            tracks.append(HeaderTrack(
+                'Text', codec_id=codec_id, format=track_format, language=language,
+                forced='Yes' if first(entry, FLAG_FORCED, read_uint, data, 0) else 'No',
+            ))
+    return HeaderInfo(tracks)
+
+def matroska_video_track(data, entry, codec_id, video_format, language, bit_rate, first_frames):
+    """
+    Erstellt den Video-Track aus einem Matroska-TrackEntry.
+    """
+    if VIDEO not in entry:
+        raise HeaderError("Video-Track ohne Video-Element")
+    video = children(data, *entry[VIDEO][0])
+    colour = children(data, *video[COLOUR][0]) if COLOUR in video else {}
+    codec_private = bytes(data[slice(*entry[CODEC_PRIVATE][0])]) if CODEC_PRIVATE in entry else b''
+    default_duration = first(entry, DEFAULT_DURATION, read_uint, data)
+    interlaced = first(video, FLAG_INTERLACED, read_uint, data)
+
+    dolby_vision = False
+    for mapping_span in entry.get(BLOCK_ADDITION_MAPPING, []):
+        mapping = children(data, *mapping_span)
+        add_id_type = first(mapping, BLOCK_ADD_ID_TYPE, read_uint, data, 0)
+        dolby_vision |= add_id_type.to_bytes(4, 'big') in DOLBY_VISION_CONFIGS
+
+    bit_depth = first(colour, BITS_PER_CHANNEL, read_uint, data) or codec_bit_depth(video_format, codec_private)
+    encoder = None
+    if video_format in ('AVC', 'HEVC'):
+        encoder = sniff_encoder(codec_private) or sniff_encoder(first_frames)
+
+    return HeaderTrack(
+        'Video', codec_id=codec_id, format=video_format, language=language, bit_rate=bit_rate,
+        width=first(video, PIXEL_WIDTH, read_uint, data), height=first(video, PIXEL_HEIGHT, read_uint, data),
+        frame_rate=format_framerate(1e9 / default_duration) if default_duration else None,
+        bit_depth=bit_depth,
+        color_space='YUV' if video_format in YUV_FORMATS else None,
+        scan_type={1: 'Interlaced', 2: 'Progressive'}.get(interlaced),
+        encoded_library_name=encoder,
+        **hdr_attributes(first(colour, TRANSFER, read_uint, data), first(colour, PRIMARIES, read_uint, data),
+                         MASTERING_METADATA in colour, dolby_vision),
+    )
+
+# --- MP4 ------------------------------------------------------------------------------------------
+
+def iter_boxes(data, start, end):
+    """
+    Liefert (typ, datenanfang, datenende) der Boxen zwischen start und end.
+    """
+    position = start
+    while position + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, position)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise HeaderError(f"Ungültige Box {box_type!r} bei {position}")
+        yield box_type.decode('latin-1'), position + header, position + size
+        position += size
+
+def boxes(data, start, end):
+    found = {}
+    for box_type, data_start, data_end in iter_boxes(data, start, end):
+        found.setdefault(box_type, []).append((data_start, data_end))
+    return found
+
+def read_full_box_version(data, start):
+    return data[start]
+
+def read_descriptor(data, position):
+    """
+    Liest Tag und Länge eines MPEG-4-Deskriptors (esds).
+    """
+    tag = data[position]
+    position += 1
+    length = 0
+    for _ in range(4):
+        byte = data[position]
+        position += 1
+        length = (length << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return tag, position, position + length
+
+def parse_esds(data, start, end):
+    """
+    Liefert (objectTypeIndication, Kanäle) aus einer esds-Box.
+    """
+    tag, position, descriptor_end = read_descriptor(data, start + 4)
+    if tag != 0x03:
+        return None, None
+    flags = data[position + 2]
+    position += 3
+    if flags & 0x80:
+        position += 2
+    if flags & 0x40:
+        position += 1 + data[position]
+    if flags & 0x20:
+        position += 2
+    tag, position, config_end = read_descriptor(data, position)
+    if tag != 0x04:
+        return None, None
+    object_type = data[position]
+    channels = None
+    if position + 13 < config_end:
+        tag, specific_start, _ = read_descriptor(data, position + 13)
+        if tag == 0x05:
+            config = int.from_bytes(data[specific_start:specific_start + 4], 'big')
+            frequency_index = (config >> 23) & 0x0F
+            # Bei explizit angegebener Abtastrate folgen 24 Bit Frequenz vor der Kanalkonfiguration
+            shift = 19 - (24 if frequency_index == 15 else 0)
+            if shift >= 0:
+                channels = AAC_CHANNELS.get((config >> shift) & 0x0F)
+    return object_type, channels
+
+def parse_sample_entry(data, handler, start, end):
+    """
+    Liest den ersten Eintrag der stsd-Box: Codec und codecspezifische Angaben.
+    """
+    entries = list(iter_boxes(data, start + 8, end))
+    if not entries:
+        raise HeaderError("stsd ohne Eintrag")
+    fourcc, entry_start, entry_end = entries[0]
+    details = {'codec_id': fourcc, 'format': MP4_FORMATS.get(fourcc)}
+
+    if handler == 'vide':
+        details['width'], details['height'] = struct.unpack_from('>HH', data, entry_start + 24)
+        sub_boxes = boxes(data, entry_start + 78, entry_end)
+        config_box = next((sub_boxes[name][0] for name in ('hvcC', 'avcC', 'av1C') if name in sub_boxes), None)
+        details['codec_private'] = bytes(data[slice(*config_box)]) if config_box else b''
+        details['dolby_vision'] = fourcc in ('dvh1', 'dvhe', 'dva1', 'dvav') or \
+            any(name.encode('latin-1') in DOLBY_VISION_CONFIGS for name in sub_boxes)
+        details['mastering'] = 'mdcv' in sub_boxes
+        details['transfer'] = details['primaries'] = None
+        if 'colr' in sub_boxes:
+            colr_start, colr_end = sub_boxes['colr'][0]
+            if bytes(data[colr_start:colr_start + 4]) == b'nclx' and colr_end - colr_start >= 10:
+                details['primaries'], details['transfer'] = struct.unpack_from('>HH', data, colr_start + 4)
+    elif handler == 'soun':
+        version = struct.unpack_from('>H', data, entry_start + 8)[0]
+        details['channels'] = struct.unpack_from('>H', data, entry_start + 16)[0]
+        details['sampling_rate'] = struct.unpack_from('>I', data, entry_start + 24)[0] >> 16
+        # QuickTime-Soundbeschreibungen Version 1/2 sind länger
+        children_start = entry_start + 28 + {0: 0, 1: 16, 2: 36}.get(version, 0)
+        sub_boxes = boxes(data, children_start, entry_end)
+        if fourcc == 'mp4a':
+            if 'esds' not in sub_boxes:
+                raise HeaderError("mp4a ohne esds")
+            object_type, channels = parse_esds(data, *sub_boxes['esds'][0])
+            details['format'] = MP4_AUDIO_OBJECT_TYPES.get(object_type)
+            details['channels'] = channels or details['channels']
+    else:
+        # tx3g: displayFlags 0x40000000 = alle Untertitel erzwungen
+        details['forced'] = fourcc == 'tx3g' and \
+            bool(struct.unpack_from('>I', data, entry_start + 8)[0] & 0x40000000)
+    return details
+
+def parse_mp4_track(data, trak_start, trak_end):
+    """
+    Dekodiert eine trak-Box. Gibt None für Spuren zurück, die MediaInfo nicht als
+    Video, Audio oder Text meldet.
+    """
+    trak = boxes(data, trak_start, trak_end)
+    tkhd_start = trak['tkhd'][0][0]
+    track_id = struct.unpack_from('>I', data, tkhd_start + (20 if data[tkhd_start] == 1 else 12))[0]
+    mdia = boxes(data, *trak['mdia'][0])
+    handler = bytes(data[mdia['hdlr'][0][0] + 8:mdia['hdlr'][0][0] + 12]).decode('latin-1')
+    if handler not in ('vide', 'soun', 'sbtl', 'text', 'subt'):
+        return None, track_id
+
+    mdhd_start = mdia['mdhd'][0][0]
+    if data[mdhd_start] == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, mdhd_start + 20)
+        packed_language = struct.unpack_from('>H', data, mdhd_start + 32)[0]
+    else:
+        timescale, duration = struct.unpack_from('>II', data, mdhd_start + 12)
+        packed_language = struct.unpack_from('>H', data, mdhd_start + 20)[0]
+    language = ''.join(chr(((packed_language >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+    if 'elng' in mdia:
+        language = read_string(data, (mdia['elng'][0][0] + 4, mdia['elng'][0][1])) or language
+    language = language_code(language) if len(language) == 3 else language
+
+    stbl = boxes(data, *boxes(data, *mdia['minf'][0])['stbl'][0])
+    details = parse_sample_entry(data, handler, *stbl['stsd'][0])
+    if not details['format']:
+        raise HeaderError(f"Unbekannter Codec {details['codec_id']}")
+
+    seconds = duration / timescale if timescale and duration else None
+    sample_count = stream_size = None
+    if 'stsz' in stbl:
+        stsz_start = stbl['stsz'][0][0]
+        sample_size, sample_count = struct.unpack_from('>II', data, stsz_start + 4)
+        if sample_size:
+            stream_size = sample_size * sample_count
+        else:
+            stream_size = sum(struct.unpack_from(f'>{sample_count}I', data, stsz_start + 12))
+    bit_rate = int(stream_size * 8 / seconds) if stream_size and seconds else None
+
+    if handler == 'vide':
+        first_frames = b''
+        for chunk_box, offset_format in (('stco', '>I'), ('co64', '>Q')):
+            if chunk_box in stbl and struct.unpack_from('>I', data, stbl[chunk_box][0][0] + 4)[0]:
+                offset = struct.unpack_from(offset_format, data, stbl[chunk_box][0][0] + 8)[0]
+                first_frames = data[offset:min(offset + ENCODER_SNIFF_BYTES, len(data))]
+                break
+        return HeaderTrack(
+            'Video', codec_id=details['codec_id'], format=details['format'], language=language,
+            bit_rate=bit_rate, width=details['width'], height=details['height'],
+            frame_rate=format_framerate(sample_count / seconds) if sample_count and seconds else None,
+            bit_depth=codec_bit_depth(details['format'], details['codec_private']),
+            color_space='YUV' if details['format'] in YUV_FORMATS else None,
+            encoded_library_name=sniff_encoder(details['codec_private']) or sniff_encoder(first_frames),
+            **hdr_attributes(details['transfer'], details['primaries'], details['mastering'], details['dolby_vision']),
+        ), track_id
+    if handler == 'soun':
+        return HeaderTrack(
+            'Audio', codec_id=details['codec_id'], format=details['format'], language=language,
+            bit_rate=bit_rate, channel_s=details['channels'], sampling_rate=details['sampling_rate'],
+        ), track_id
+    return HeaderTrack(
+        'Text', codec_id=details['codec_id'], format=details['format'], language=language,
+        forced='Yes' if details['forced'] else 'No',
+    ), track_id
+
+def parse_mp4(data):
+    """
+    Dekodiert die moov-Box einer MP4/QuickTime-Datei.
+    """
+    top_level = boxes(data, 0, len(data))
+    if 'moov' not in top_level:
+        raise HeaderError("Keine moov-Box")
+    moov = boxes(data, *top_level['moov'][0])
+    mvhd_start = moov['mvhd'][0][0]
+    if data[mvhd_start] == 1:
+        creation, _, timescale, duration = struct.unpack_from('>QQIQ', data, mvhd_start + 4)
+    else:
+        creation, _, timescale, duration = struct.unpack_from('>IIII', data, mvhd_start + 4)
+
+    # Kapitelspuren (tref/chap) meldet MediaInfo nicht als Textspur
+    chapter_tracks = set()
+    parsed_tracks = []
+    for trak_span in moov.get('trak', []):
+        trak = boxes(data, *trak_span)
+        if 'tref' in trak:
+            tref = boxes(data, *trak['tref'][0])
+            for chap_start, chap_end in tref.get('chap', []):
+                chapter_tracks.update(struct.unpack_from(f'>{(chap_end - chap_start) // 4}I', data, chap_start))
+        parsed_tracks.append(parse_mp4_track(data, *trak_span))
+
+    general = HeaderTrack(
+        'General',
+        format='MPEG-4',
+        duration=int(round(duration * 1000 / timescale)) if timescale and duration else None,
+        encoded_date=format_date(MP4_EPOCH + timedelta(seconds=creation)) if creation else None,
+    )
+    return HeaderInfo([general] + [track for track, track_id in parsed_tracks
+                                   if track is not None and track_id not in chapter_tracks])
+
+# --- Einstieg -------------------------------------------------------------------------------------
+
+def parse_media_headers(file_path):
+    """
+    Liest die Kopfdaten einer Matroska- oder MP4-Datei.
+    Gibt ein HeaderInfo-Objekt zurück oder None, wenn MediaInfo verwendet werden muss.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < 16:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:4] == b'\x1a\x45\xdf\xa3':
+                    return parse_matroska(data)
+                if data[4:8] in (b'ftyp', b'moov', b'free', b'wide', b'mdat', b'skip'):
+                    return parse_mp4(data)
+                return None
+    except (HeaderError, KeyError, IndexError, ValueError, OverflowError, struct.error, StopIteration) as e:
+        logging.debug(f"Kopfdaten von {file_path} nicht lesbar, verwende MediaInfo: {e}")
+        return None
+    except OSError as e:
+        logging.debug(f"Datei {file_path} kann nicht gelesen werden: {e}")
+        return None
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reihenfolge der Metadatenaktualisierung nach Priorität.
+
+Statt in ID-Reihenfolge über alle Episoden zu laufen, wird die Arbeit in Stufen
+eingeteilt, die nacheinander abgearbeitet werden:
+
+    new        kürzlich hinzugefügte Episoden (UPDATE_NEW_HOURS)
+    missing    Episoden mit fehlenden Feldern (container_format, aspect_ratio)
+    browsed    Episoden von Animes, die kürzlich im Dashboard angesehen wurden
+               (Tabelle anime_views, UPDATE_BROWSED_DAYS)
+    rest       alle übrigen
+
+Jede Episode gehört zur ersten Stufe, deren Bedingung sie erfüllt. Innerhalb einer
+Stufe wird nach ID geblättert (Keyset-Paginierung). Mit einem Budget (im Archiver
+UPDATE_BUDGET bzw. --update-budget) endet der Lauf nach so vielen Episoden; liegen geblieben ist dann
+nur Arbeit niedrigerer Priorität.
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+
+# Episoden, die seit so vielen Stunden in der Datenbank sind, gelten als neu
+UPDATE_NEW_HOURS = float(os.getenv('UPDATE_NEW_HOURS', '24'))
+# Animes, die innerhalb so vieler Tage im Dashboard angesehen wurden, werden bevorzugt
+UPDATE_BROWSED_DAYS = float(os.getenv('UPDATE_BROWSED_DAYS', '7'))
+
+# Aufrufe von Anime-Seiten im Dashboard (geschrieben vom Dashboard, gelesen vom Archiver)
+ANIME_VIEWS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS anime_views (
+        anime_id INT NOT NULL PRIMARY KEY,
+        view_count INT NOT NULL DEFAULT 0,
+        last_viewed_at DATETIME NOT NULL,
+        KEY idx_anime_views_last (last_viewed_at),
+        FOREIGN KEY (anime_id) REFERENCES animes(id) ON DELETE CASCADE
+    )
+"""
+
+MISSING_FIELDS_CONDITION = "(container_format IS NULL OR aspect_ratio IS NULL)"
+
+# (Name, Bedingung mit einem Platzhalter für den Zeitpunkt oder None, Zeitraum in Sekunden)
+PRIORITY_TIERS = [
+    ('new', "created_at >= %s", lambda: UPDATE_NEW_HOURS * 3600),
+    ('missing', MISSING_FIELDS_CONDITION, None),
+    ('browsed', "season_id IN (SELECT s.id FROM seasons s JOIN anime_views v ON v.anime_id = s.anime_id "
+                "WHERE v.last_viewed_at >= %s)", lambda: UPDATE_BROWSED_DAYS * 86400),
+    ('rest', None, None),
+]
+TIER_NAMES = [name for name, _, _ in PRIORITY_TIERS]
+
+def server_now(connection):
+    """
+    Liefert die aktuelle Zeit des Datenbankservers. created_at und last_viewed_at werden dort
+    mit CURRENT_TIMESTAMP (in MySQL gleichbedeutend mit NOW()) in der Zeitzone der Sitzung
+    gefüllt; die Uhr und Zeitzone dieses Rechners können davon abweichen.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        now = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    return datetime.fromisoformat(now) if isinstance(now, str) else now
+
+def _timestamp(seconds_ago, now):
+    return (now - timedelta(seconds=seconds_ago)).strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_position(position):
+    """
+    Wandelt eine Journal-Position in (Stufe, ID) um. Ältere Journale speichern nur die ID
+    aus der Zeit ohne Stufen; sie gilt für die erste Stufe.
+    """
+    if position is None:
+        return 0, 0
+    if isinstance(position, int):
+        return 0, position
+    return int(position[0]), int(position[1])
+
+class RefreshScheduler:
+    """
+    Liefert die zu aktualisierenden Episoden als (id, file_path, Stufe) in Prioritätsreihenfolge.
+
+    conditions und params schränken alle Stufen ein (z.B. Pfadfilter, metadata_mode = 'fast').
+    Seitenabfragen laufen unter lock, da sich der Aufrufer die Verbindung mit dem Schreiben teilt.
+    """
+    def __init__(self, connection, conditions=(), params=(), lock=None, page_size=1000,
+                 position=None, budget=0):
+        self.connection = connection
+        self.lock = lock
+        self.page_size = page_size
+        self.start_tier, self.start_id = parse_position(position)
+        # Höchstzahl der gelieferten Episoden (0 = unbegrenzt)
+        self.budget = budget
+        self.tiers = []
+        # Alle Stufen beziehen sich auf denselben Zeitpunkt des Servers
+        if lock:
+            with lock:
+                now = server_now(connection)
+        else:
+            now = server_now(connection)
+        earlier = []
+        for name, condition, period in PRIORITY_TIERS:
+            condition_params = [_timestamp(period(), now)] if period else []
+            # Episoden früherer Stufen ausschließen, damit jede genau einmal vorkommt
+            # (IS NOT TRUE statt NOT, damit NULL-Werte nicht aus allen Stufen herausfallen)
+            where = list(conditions) + [f"({previous}) IS NOT TRUE" for previous, _ in earlier]
+            where_params = list(params) + [value for _, values in earlier for value in values]
+            if condition:
+                where.append(condition)
+                where_params += condition_params
+                earlier.append((condition, condition_params))
+            self.tiers.append((name, " AND ".join(where + ["id > %s"]), where_params))
+        self.counts = {}
+
+    def _execute(self, query, params):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def count(self):
+        """
+        Zählt die ausstehenden Episoden je Stufe (ab der Startposition) und gibt die Anzahl
+        zurück, die in diesem Lauf verarbeitet wird (begrenzt durch das Budget).
+        """
+        for index, (name, where, params) in enumerate(self.tiers):
+            if index < self.start_tier:
+                self.counts[name] = 0
+                continue
+            after_id = self.start_id if index == self.start_tier else 0
+            self.counts[name] = self._execute(f"SELECT COUNT(*) FROM episodes WHERE {where}",
+                                              params + [after_id])[0][0]
+        total = sum(self.counts.values())
+        return min(total, self.budget) if self.budget > 0 else total
+
+    def log_plan(self):
+        planned = ", ".join(f"{name} {count}" for name, count in self.counts.items())
+        budget = f", Budget {self.budget}" if self.budget > 0 else ""
+        logging.info(f"Aktualisierung nach Priorität: {planned}{budget}")
+
+    def _pages(self, index, where, params, after_id):
+        query = f"SELECT id, file_path FROM episodes WHERE {where} ORDER BY id LIMIT %s"
+        while True:
+            if self.lock:
+                with self.lock:
+                    page = self._execute(query, params + [after_id, self.page_size])
+            else:
+                page = self._execute(query, params + [after_id, self.page_size])
+            for episode_id, file_path in page:
+                yield episode_id, file_path, index
+            if len(page) < self.page_size:
+                return
+            after_id = page[-1][0]
+
+    def __iter__(self):
+        delivered = 0
+        for index, (name, where, params) in enumerate(self.tiers):
+            if index < self.start_tier or (self.counts and not self.counts.get(name)):
+                continue
+            after_id = self.start_id if index == self.start_tier else 0
+            for episode in self._pages(index, where, params, after_id):
+                if 0 < self.budget <= delivered:
+                    logging.info(f"Budget von {self.budget} Episoden erreicht, "
+                                 f"Rest ab Stufe '{name}' folgt im nächsten Lauf.")
+                    return
+                delivered += 1
+                yield episode
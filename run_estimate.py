@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kostenschätzung für Archiver- und Aktualisierungsläufe (--estimate), ohne sie auszuführen.
+
+Der Aufrufer ermittelt die Arbeit des geplanten Laufs (Verzeichnissuche bzw. Arbeitsliste
+aus der Datenbank) und meldet jede zu analysierende Datei sowie die zu schreibenden Zeilen.
+Je Containertyp (Dateiendung) wird nur eine kleine Stichprobe tatsächlich analysiert;
+aus deren Laufzeit und gelesenen Bytes werden Dauer, Lesemenge und Schreibzugriffe des
+echten Laufs hochgerechnet. Die Stichprobe wird per Reservoir-Sampling gezogen, sodass
+auch bei sehr großen Mediatheken nur wenige Pfade im Speicher liegen.
+"""
+
+import os
+import math
+import time
+import random
+import logging
+from collections import Counter
+
+from run_metrics import read_io_counters, format_bytes, THREAD_IO_PATH
+
+# Analysierte Dateien je Containertyp
+ESTIMATE_SAMPLES = int(os.getenv('ESTIMATE_SAMPLES', '5'))
+
+def container_type(file_path):
+    extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+    return extension or '(ohne)'
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s" if hours else f"{minutes}m {seconds:02d}s"
+
+class RunEstimate:
+    """
+    Sammelt die Arbeit eines geplanten Laufs und rechnet sie anhand einer Stichprobe hoch.
+
+        estimate.add_file(pfad)           Datei, die analysiert werden müsste
+        estimate.add_cached()             Datei mit Treffer im Extraktions-Cache
+        estimate.add_fingerprint(pfad)    Datei, deren Inhalts-Fingerabdruck berechnet würde
+        estimate.add_rows('insert', n)    zu schreibende Zeilen (insert, update, delete)
+        estimate.sample(extract, fp)      Stichprobe je Containertyp (und für Fingerabdrücke) messen
+        estimate.project(...)             Hochrechnung als Dictionary
+    """
+    def __init__(self, description, samples_per_type=None, seed=1):
+        self.description = description
+        self.samples_per_type = ESTIMATE_SAMPLES if samples_per_type is None else samples_per_type
+        self._random = random.Random(seed)
+        self.files = Counter()
+        self.cached = 0
+        self.rows = Counter()
+        # Dauer der Verzeichnissuche bzw. der Abfrage der Arbeitsliste, wird im echten Lauf ebenso anfallen
+        self.walk_seconds = 0.0
+        # Containertyp -> Stichprobe (Pfade) bzw. Messungen [(sekunden, bytes, erfolgreich)]
+        self._reservoirs = {}
+        self.measurements = {}
+        # Fingerabdrücke (neue Dateien und Nachträge), unabhängig vom Extraktions-Cache
+        self.fingerprints = 0
+        self._fingerprint_reservoir = []
+        self.fingerprint_measurements = []
+
+    def add_file(self, file_path):
+        kind = container_type(file_path)
+        self.files[kind] += 1
+        self._keep_sample(self._reservoirs.setdefault(kind, []), self.files[kind], file_path)
+
+    def add_fingerprint(self, file_path):
+        self.fingerprints += 1
+        self._keep_sample(self._fingerprint_reservoir, self.fingerprints, file_path)
+
+    def _keep_sample(self, reservoir, count, file_path):
+        # Reservoir-Sampling: jede der count Dateien landet mit gleicher Wahrscheinlichkeit in der Stichprobe
+        if len(reservoir) < self.samples_per_type:
+            reservoir.append(file_path)
+        else:
+            index = self._random.randrange(count)
+            if index < self.samples_per_type:
+                reservoir[index] = file_path
+
+    def add_cached(self, count=1):
+        self.cached += count
+
+    def add_rows(self, kind, count=1):
+        self.rows[kind] += count
+
+    def sample(self, extract, fingerprint=None):
+        """
+        Analysiert die Stichprobe mit extract(pfad) und misst Laufzeit und gelesene Bytes;
+        mit fingerprint(pfad) ebenso die Stichprobe der Fingerabdrücke.
+        """
+        for kind, paths in sorted(self._reservoirs.items()):
+            measurements = self.measurements.setdefault(kind, [])
+            for file_path in paths:
+                measurements.append(_measure(extract, file_path))
+        if fingerprint is not None:
+            for file_path in self._fingerprint_reservoir:
+                self.fingerprint_measurements.append(_measure(fingerprint, file_path))
+
+    def project(self, workers=1, io_rate=0, batch_size=500, statements_per_batch=None):
+        """
+        Rechnet die Stichprobe auf den ganzen Lauf hoch.
+
+        workers: parallele Extraktions-Threads; io_rate: Lesebudget in Bytes/s (0 = unbegrenzt);
+        batch_size: Zeilen je Commit; statements_per_batch: Anweisungen je Stapel und Zeilenart
+        (z.B. 3 für Aktualisierungen über die Staging-Tabelle, Standard 1).
+        """
+        statements_per_batch = statements_per_batch or {}
+        types = {}
+        extract_seconds = 0.0
+        bytes_read = 0
+        for kind, count in sorted(self.files.items()):
+            measurements = self.measurements.get(kind, [])
+            seconds_per_file = sum(m[0] for m in measurements) / len(measurements) if measurements else 0.0
+            bytes_per_file = sum(m[1] for m in measurements) / len(measurements) if measurements else 0
+            types[kind] = {
+                'files': count,
+                'sampled': len(measurements),
+                'failed': sum(1 for m in measurements if not m[2]),
+                'seconds_per_file': round(seconds_per_file, 4),
+                'bytes_per_file': int(bytes_per_file),
+            }
+            extract_seconds += count * seconds_per_file
+            bytes_read += count * bytes_per_file
+
+        # Fingerabdrücke laufen ebenfalls in den Extraktions-Workern und zählen gegen das Lesebudget
+        measurements = self.fingerprint_measurements
+        fingerprint_seconds = sum(m[0] for m in measurements) / len(measurements) if measurements else 0.0
+        fingerprint_bytes = sum(m[1] for m in measurements) / len(measurements) if measurements else 0
+        extract_seconds += self.fingerprints * fingerprint_seconds
+        bytes_read += self.fingerprints * fingerprint_bytes
+
+        # Die Extraktion verteilt sich auf die Worker, ein Lesebudget kann sie weiter bremsen
+        extraction_wall = extract_seconds / max(1, workers)
+        if io_rate > 0:
+            extraction_wall = max(extraction_wall, bytes_read / io_rate)
+        total_rows = sum(self.rows.values())
+        statements = sum(math.ceil(count / batch_size) * statements_per_batch.get(kind, 1)
+                         for kind, count in self.rows.items())
+        return {
+            'description': self.description,
+            'files_to_extract': sum(self.files.values()),
+            'cached_files': self.cached,
+            'types': types,
+            'fingerprints': {
+                'files': self.fingerprints,
+                'sampled': len(measurements),
+                'seconds_per_file': round(fingerprint_seconds, 4),
+                'bytes_per_file': int(fingerprint_bytes),
+            },
+            'walk_seconds': round(self.walk_seconds, 3),
+            'extract_cpu_seconds': round(extract_seconds, 3),
+            'wall_seconds': round(self.walk_seconds + extraction_wall, 3),
+            'bytes_read': int(bytes_read),
+            'db_rows': dict(self.rows),
+            'db_statements': statements,
+            'db_commits': math.ceil(total_rows / batch_size) if total_rows else 0,
+        }
+
+def _measure(function, file_path):
+    """
+    Führt function(pfad) aus und gibt (sekunden, gelesene bytes, erfolgreich) zurück.
+    """
+    before = read_io_counters(THREAD_IO_PATH)
+    start = time.perf_counter()
+    try:
+        succeeded = bool(function(file_path))
+    except Exception as e:
+        logging.warning(f"Stichprobe {file_path} konnte nicht analysiert werden: {e}")
+        succeeded = False
+    seconds = time.perf_counter() - start
+    after = read_io_counters(THREAD_IO_PATH)
+    if before is not None and after is not None:
+        bytes_read = max(after['rchar'] - before['rchar'], after['read_bytes'] - before['read_bytes'])
+    else:
+        # Ohne Lesezähler die Dateigröße als Obergrenze
+        try:
+            bytes_read = os.path.getsize(file_path)
+        except OSError:
+            bytes_read = 0
+    return seconds, bytes_read, succeeded
+
+def log_projection(projection):
+    """
+    Protokolliert eine Hochrechnung aus RunEstimate.project.
+    """
+    logging.info(f"=== Schätzung: {projection['description']} ===")
+    logging.info(f"Zu analysieren: {projection['files_to_extract']} Dateien "
+                 f"({projection['cached_files']} weitere aus dem Extraktions-Cache)")
+    for kind, data in projection['types'].items():
+        failed = f", {data['failed']} fehlgeschlagen" if data['failed'] else ""
+        logging.info(f"  {kind:<6} {data['files']:>8} Dateien, Stichprobe {data['sampled']}{failed}: "
+                     f"{data['seconds_per_file'] * 1000:.0f} ms und {format_bytes(data['bytes_per_file'])} je Datei")
+    fingerprints = projection.get('fingerprints')
+    if fingerprints and fingerprints['files']:
+        logging.info(f"  Fingerabdrücke {fingerprints['files']:>8} Dateien, Stichprobe {fingerprints['sampled']}: "
+                     f"{fingerprints['seconds_per_file'] * 1000:.0f} ms und "
+                     f"{format_bytes(fingerprints['bytes_per_file'])} je Datei")
+    rows = ", ".join(f"{count} {kind}" for kind, count in sorted(projection['db_rows'].items())) or "keine"
+    logging.info(f"Voraussichtliche Dauer: {format_duration(projection['wall_seconds'])} "
+                 f"(davon Verzeichnissuche/Arbeitsliste {format_duration(projection['walk_seconds'])})")
+    logging.info(f"Voraussichtlich gelesen: {format_bytes(projection['bytes_read'])}")
+    logging.info(f"Datenbank: {rows} Zeilen in etwa {projection['db_statements']} Anweisungen "
+                 f"und {projection['db_commits']} Commits")
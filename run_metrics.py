@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Laufzeitmessung je Stufe des Archivers (Verzeichnissuche, stat, Extraktion,
+Datenbank-Schreibzugriffe, Commits) mit Latenz-Histogrammen und gelesenen Bytes.
+Am Ende eines Laufs wird eine Aufschlüsselung protokolliert und auf Wunsch ein
+JSON-Bericht geschrieben, der sich mit früheren Läufen vergleichen lässt.
+
+Die Histogramme haben feste, exponentiell wachsende Grenzen (0,1 ms bis ca. 14 min),
+damit Berichte verschiedener Läufe direkt vergleichbar sind.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+REPORT_VERSION = 1
+
+# Obergrenzen der Histogramm-Fächer in Sekunden, das letzte Fach ist nach oben offen
+BUCKET_BOUNDS = [0.0001 * 2 ** i for i in range(24)]
+
+# Lesezähler des aktuellen Threads (Linux); enthält auch Lesezugriffe von MediaInfo
+THREAD_IO_PATH = '/proc/thread-self/io'
+PROCESS_IO_PATH = '/proc/self/io'
+
+def read_io_counters(path):
+    """
+    Liest rchar (alle gelesenen Bytes) und read_bytes (vom Datenträger gelesen)
+    aus /proc. Gibt None zurück, wenn die Zähler nicht verfügbar sind.
+    """
+    try:
+        with open(path) as file:
+            counters = dict(line.split(': ') for line in file.read().splitlines())
+        return {'rchar': int(counters['rchar']), 'read_bytes': int(counters['read_bytes'])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+class LatencyHistogram:
+    """
+    Histogramm der Laufzeiten einer Stufe mit Summe, Minimum, Maximum und gelesenen Bytes.
+    """
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.bytes_read = 0
+
+    def add(self, seconds, bytes_read=0):
+        index = 0
+        while index < len(BUCKET_BOUNDS) and seconds > BUCKET_BOUNDS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.bytes_read += bytes_read
+
+    def percentile(self, fraction):
+        """
+        Schätzt ein Perzentil als Obergrenze des Fachs, in das es fällt (höchstens das Maximum).
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank and bucket:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        milliseconds = lambda value: round(value * 1000, 3) if value is not None else None
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 3),
+            'mean_ms': milliseconds(self.total / self.count) if self.count else None,
+            'min_ms': milliseconds(self.min),
+            'p50_ms': milliseconds(self.percentile(0.5)),
+            'p95_ms': milliseconds(self.percentile(0.95)),
+            'p99_ms': milliseconds(self.percentile(0.99)),
+            'max_ms': milliseconds(self.max),
+            'bytes_read': self.bytes_read,
+            # Fachobergrenze in ms -> Anzahl, nur belegte Fächer
+            'histogram': {
+                (f"{BUCKET_BOUNDS[index] * 1000:g}" if index < len(BUCKET_BOUNDS) else 'inf'): bucket
+                for index, bucket in enumerate(self.buckets) if bucket
+            },
+        }
+
+class RunMetrics:
+    """
+    Sammelt die Laufzeiten aller Stufen eines Laufs. Threadsicher, da Verzeichnissuche,
+    Extraktion und Datenbankzugriffe in verschiedenen Threads laufen.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._process_io = read_io_counters(PROCESS_IO_PATH)
+
+    def record(self, stage, seconds, bytes_read=0):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.add(seconds, bytes_read)
+
+    @contextmanager
+    def timed(self, stage, measure_bytes=False):
+        """
+        Misst die Laufzeit des Blocks; mit measure_bytes auch die in diesem Thread gelesenen Bytes.
+        """
+        io_before = read_io_counters(THREAD_IO_PATH) if measure_bytes else None
+        start = self.clock()
+        try:
+            yield
+        finally:
+            seconds = self.clock() - start
+            bytes_read = 0
+            if io_before:
+                io_after = read_io_counters(THREAD_IO_PATH)
+                bytes_read = io_after['rchar'] - io_before['rchar'] if io_after else 0
+            self.record(stage, seconds, bytes_read)
+
+    def process_io(self):
+        """
+        Seit Beginn des Laufs vom gesamten Prozess gelesene Bytes.
+        """
+        current = read_io_counters(PROCESS_IO_PATH)
+        if not current or not self._process_io:
+            return None
+        return {key: current[key] - self._process_io[key] for key in current}
+
+    def breakdown(self):
+        """
+        Zeilen der Aufschlüsselung je Stufe, nach Gesamtzeit absteigend.
+        """
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1].total, reverse=True)
+        wall = time.monotonic() - self._started
+        lines = [f"{'Stufe':<10} {'Anzahl':>8} {'Summe s':>9} {'Anteil':>7} {'Ø ms':>8} {'p95 ms':>8} "
+                 f"{'max ms':>9} {'gelesen':>10}"]
+        for stage, histogram in stages:
+            data = histogram.to_dict()
+            share = histogram.total / wall if wall > 0 else 0.0
+            lines.append(f"{stage:<10} {data['count']:>8} {data['total_s']:>9.1f} {share:>7.0%} "
+                         f"{data['mean_ms'] or 0:>8.1f} {data['p95_ms'] or 0:>8.1f} {data['max_ms']:>9.1f} "
+                         f"{format_bytes(histogram.bytes_read):>10}")
+        lines.append(f"Laufzeit: {wall:.1f} s (Stufen laufen parallel, Anteile können sich zu mehr als 100% addieren)")
+        return lines
+
+    def log_breakdown(self):
+        if not self.stages:
+            return
+        logging.info("\nLaufzeit je Stufe:")
+        for line in self.breakdown():
+            logging.info(line)
+
+    def report(self, **extra):
+        """
+        Maschinenlesbarer Bericht des Laufs; extra wird unverändert übernommen.
+        """
+        with self._lock:
+            stages = {stage: histogram.to_dict() for stage, histogram in sorted(self.stages.items())}
+        finished_at = time.time()
+        report = {
+            'report_version': REPORT_VERSION,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(finished_at)),
+            'duration_s': round(time.monotonic() - self._started, 3),
+            'stages': stages,
+            'process_io': self.process_io(),
+        }
+        report.update(extra)
+        return report
+
+    def write_report(self, path, **extra):
+        """
+        Schreibt den Bericht als JSON (atomar über eine temporäre Datei).
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(**extra), file, indent=2, ensure_ascii=False)
+        os.replace(temporary_path, path)
+        logging.info(f"Laufbericht geschrieben: {path}")
+
+# Messwerte des laufenden Prozesses
+METRICS = RunMetrics()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scan-Leases: Verteilt die Anime-Verzeichnisse unterhalb von MEDIA_PATH auf mehrere
+gleichzeitig laufende Archiver-Instanzen (--shard). Die Koordination läuft über die
+Tabelle scan_leases in der vorhandenen Datenbank, ein zusätzlicher Dienst ist nicht nötig.
+
+Ein Verzeichnis wird mit einem INSERT (neu) oder einem bedingten UPDATE (abgelaufen oder
+vor längerer Zeit abgeschlossen) beansprucht; die Datenbank stellt sicher, dass dabei
+genau eine Instanz gewinnt. Solange eine Instanz läuft, verlängert ein Heartbeat-Thread
+ihre Leases. Stürzt sie ab, laufen die Leases nach SCAN_LEASE_TTL Sekunden ab und
+werden von einer anderen Instanz übernommen.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+
+# Konfigurationsvariablen
+SCAN_NODE_ID = os.getenv('SCAN_NODE_ID', f"{socket.gethostname()}-{os.getpid()}")
+SCAN_LEASE_TTL = int(os.getenv('SCAN_LEASE_TTL', '120'))
+# Abgeschlossene Verzeichnisse werden erst nach dieser Zeit erneut vergeben (nächster Lauf)
+SCAN_LEASE_RESCAN_AFTER = int(os.getenv('SCAN_LEASE_RESCAN_AFTER', '3600'))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scan_leases (
+        directory_path VARCHAR(511) NOT NULL PRIMARY KEY,
+        node_id VARCHAR(100) NOT NULL,
+        claimed_at BIGINT NOT NULL,
+        heartbeat_at BIGINT NOT NULL,
+        expires_at BIGINT NOT NULL,
+        completed_at BIGINT NULL,
+        KEY idx_scan_leases_node (node_id)
+    )
+"""
+
+def placeholders(count):
+    return ', '.join(['%s'] * count)
+
+class LeaseManager:
+    """
+    Beansprucht, verlängert und beendet die Leases einer Archiver-Instanz.
+    Verwendet eine eigene Datenbankverbindung, deren Änderungen sofort festgeschrieben
+    werden, damit andere Instanzen sie sehen und keine Sperren offen bleiben.
+    Zugriffe aus Scan- und Heartbeat-Thread werden über eine Sperre serialisiert.
+    """
+    def __init__(self, connection, node_id=None, ttl=None, rescan_after=None, clock=time.time):
+        self.connection = connection
+        self.node_id = node_id or SCAN_NODE_ID
+        self.ttl = ttl or SCAN_LEASE_TTL
+        self.rescan_after = SCAN_LEASE_RESCAN_AFTER if rescan_after is None else rescan_after
+        self.clock = clock
+        # Beanspruchte, noch nicht abgeschlossene Verzeichnisse
+        self.held = set()
+        # In diesem Lauf abgeschlossene Verzeichnisse
+        self.completed = []
+        self._pending_completed = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _now(self):
+        return int(self.clock())
+
+    def _execute(self, query, params):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            rowcount = cursor.rowcount
+            self.connection.commit()
+            return rowcount
+        finally:
+            cursor.close()
+
+    def claim(self, directory_path):
+        """
+        Versucht, ein Verzeichnis zu beanspruchen. Gibt True zurück, wenn diese Instanz
+        es bearbeiten darf.
+        """
+        now = self._now()
+        with self._lock:
+            claimed = self._execute(
+                "INSERT IGNORE INTO scan_leases (directory_path, node_id, claimed_at, heartbeat_at, expires_at) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (directory_path, self.node_id, now, now, now + self.ttl)) > 0
+            if not claimed:
+                # Abgelaufen (Instanz abgestürzt) oder in einem früheren Lauf abgeschlossen
+                claimed = self._execute("""
+                    UPDATE scan_leases
+                    SET node_id = %s, claimed_at = %s, heartbeat_at = %s, expires_at = %s, completed_at = NULL
+                    WHERE directory_path = %s
+                      AND ((completed_at IS NULL AND expires_at < %s) OR completed_at < %s)
+                """, (self.node_id, now, now, now + self.ttl, directory_path, now, now - self.rescan_after)) > 0
+            if claimed:
+                self.held.add(directory_path)
+        if claimed:
+            logging.debug(f"Lease erhalten: {directory_path} ({self.node_id})")
+        return claimed
+
+    def complete(self, directory_path):
+        """
+        Merkt ein Verzeichnis als abgeschlossen vor; übernommen wird es mit flush,
+        sobald die zugehörigen Zeilen festgeschrieben sind.
+        """
+        self._pending_completed.append(directory_path)
+
+    def flush(self):
+        """
+        Schließt die vorgemerkten Leases ab.
+        """
+        with self._lock:
+            paths = self._pending_completed
+            self._pending_completed = []
+            if not paths:
+                return
+            now = self._now()
+            updated = self._execute(
+                f"UPDATE scan_leases SET completed_at = %s, heartbeat_at = %s, expires_at = %s "
+                f"WHERE node_id = %s AND directory_path IN ({placeholders(len(paths))})",
+                (now, now, now, self.node_id) + tuple(paths))
+            self.held.difference_update(paths)
+            self.completed.extend(paths)
+        if updated < len(paths):
+            logging.warning(f"{len(paths) - updated} Leases wurden vor dem Abschluss von einer anderen Instanz übernommen.")
+
+    def renew(self):
+        """
+        Verlängert alle gehaltenen Leases. Gibt die Anzahl verlorener Leases zurück.
+        """
+        with self._lock:
+            paths = sorted(self.held)
+            if not paths:
+                return 0
+            now = self._now()
+            renewed = self._execute(
+                f"UPDATE scan_leases SET heartbeat_at = %s, expires_at = %s "
+                f"WHERE node_id = %s AND completed_at IS NULL AND directory_path IN ({placeholders(len(paths))})",
+                (now, now + self.ttl, self.node_id) + tuple(paths))
+            if renewed < len(paths):
+                # Übernommene Leases nicht weiter verlängern oder freigeben
+                cursor = self.connection.cursor()
+                try:
+                    cursor.execute(
+                        f"SELECT directory_path FROM scan_leases "
+                        f"WHERE node_id = %s AND directory_path IN ({placeholders(len(paths))})",
+                        (self.node_id,) + tuple(paths))
+                    owned = {row[0] for row in cursor.fetchall()}
+                finally:
+                    cursor.close()
+                lost = sorted(self.held - owned)
+                self.held &= owned
+            else:
+                lost = []
+        if lost:
+            logging.error(f"{len(lost)} Leases von {self.node_id} sind abgelaufen und wurden übernommen "
+                          f"(Heartbeat zu spät?), z.B. {lost[0]}. Betroffene Animes werden eventuell "
+                          f"doppelt bearbeitet.")
+        return len(lost)
+
+    def release(self):
+        """
+        Gibt nicht abgeschlossene Leases sofort frei (z.B. nach Ablauf des Zeitbudgets),
+        damit andere Instanzen nicht auf den Ablauf warten müssen.
+        """
+        with self._lock:
+            paths = sorted(self.held)
+            if paths:
+                self._execute(
+                    f"UPDATE scan_leases SET expires_at = 0 "
+                    f"WHERE node_id = %s AND completed_at IS NULL AND directory_path IN ({placeholders(len(paths))})",
+                    (self.node_id,) + tuple(paths))
+                self.held.clear()
+        if paths:
+            logging.info(f"{len(paths)} nicht abgeschlossene Leases freigegeben.")
+
+    def start_heartbeat(self):
+        """
+        Startet den Heartbeat-Thread, der die Leases alle TTL/3 Sekunden verlängert.
+        """
+        def beat():
+            while not self._stop.wait(self.ttl / 3):
+                try:
+                    self.renew()
+                except Exception as e:
+                    logging.error(f"Heartbeat der Scan-Leases fehlgeschlagen: {e}")
+
+        self._heartbeat = threading.Thread(target=beat, name='lease-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def close(self):
+        """
+        Beendet den Heartbeat, gibt offene Leases frei und schließt die Verbindung.
+        """
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+        try:
+            self.release()
+        finally:
+            self.connection.close()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versionierte Schemamigrationen für die Archiver-Datenbank.
+
+Die Tabelle schema_version enthält eine Zeile je angewendeter Migration. Ist das Schema
+aktuell, kostet der Start genau eine Abfrage (SELECT MAX(version)). Ausstehende
+Migrationen werden zusammengefasst angewendet: zuerst die neuen Tabellen, danach alle
+neuen Spalten mit einem einzigen ALTER TABLE je Tabelle. Bereits vorhandene Spalten
+(ältere Datenbanken ohne schema_version, von Hand ergänzte Spalten) werden übersprungen,
+sodass sich jede Migration gefahrlos wiederholen lässt.
+
+Migrationen werden nur angehängt, nie nachträglich geändert. anime_archiver.py,
+update_db_structure.py und db_fix.py verwenden dieselbe Liste.
+"""
+
+import logging
+from collections import namedtuple, OrderedDict
+from mysql.connector import Error
+
+from scan_leases import SCHEMA as SCAN_LEASES_SCHEMA
+from refresh_scheduler import ANIME_VIEWS_SCHEMA
+
+# statements: Anweisungen in Reihenfolge (CREATE TABLE IF NOT EXISTS ...)
+# add_columns: {tabelle: [(spalte, typ), ...]} für bestehende Tabellen
+# add_indexes: {tabelle: [(index, spalte), ...]}, wird zusammen mit der neuen Spalte angelegt
+Migration = namedtuple('Migration', 'version description statements add_columns add_indexes', defaults=(None,))
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT NOT NULL PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Metadatenspalten, die ältere episodes-Tabellen noch nicht haben
+EPISODE_ADDED_COLUMNS = [
+    # Grundlegende Videometadaten
+    ("duration_ms", "BIGINT"),
+    ("video_format", "VARCHAR(50)"),
+    ("video_codec", "VARCHAR(50)"),
+    ("video_bitrate", "BIGINT"),
+    ("resolution_width", "INT"),
+    ("resolution_height", "INT"),
+    ("framerate", "FLOAT"),
+    ("audio_codec", "VARCHAR(50)"),
+    ("audio_channels", "INT"),
+    ("audio_bitrate", "BIGINT"),
+    ("audio_sample_rate", "INT"),
+    ("subtitles_language", "VARCHAR(255)"),
+    ("creation_time", "DATETIME"),
+
+    # Erweiterte Videometadaten
+    ("aspect_ratio", "VARCHAR(20)"),
+    ("color_depth", "VARCHAR(10)"),
+    ("hdr_format", "VARCHAR(30)"),
+    ("color_space", "VARCHAR(30)"),
+    ("scan_type", "VARCHAR(20)"),
+    ("encoder", "VARCHAR(100)"),
+
+    # Erweiterte Audiometadaten
+    ("audio_language", "VARCHAR(50)"),
+    ("audio_tracks_count", "INT"),
+    ("audio_languages", "VARCHAR(255)"),
+
+    # Erweiterte Untertitelmetadaten
+    ("subtitles_formats", "VARCHAR(255)"),
+    ("subtitles_count", "INT"),
+    ("forced_subtitles", "BOOLEAN"),
+
+    # Containerformat
+    ("container_format", "VARCHAR(50)"),
+
+    # Änderungszeit der Datei für inkrementelle Scans
+    ("file_mtime", "BIGINT"),
+
+    # Analysemodus der Metadaten, fast = nur Dateianfang gelesen
+    ("metadata_mode", "VARCHAR(10)"),
+]
+
+MIGRATIONS = [
+    Migration(1, "Grundschema: animes, seasons, episodes", [
+        """
+        CREATE TABLE IF NOT EXISTS animes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            directory_path VARCHAR(511) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_anime_name (name),
+            UNIQUE KEY unique_anime_path (directory_path)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seasons (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            anime_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            season_number INT,
+            directory_path VARCHAR(511) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (anime_id) REFERENCES animes(id),
+            UNIQUE KEY unique_season_path (directory_path)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS episodes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            season_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            episode_number INT,
+            file_path VARCHAR(511) NOT NULL,
+            file_size BIGINT,
+            file_extension VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (season_id) REFERENCES seasons(id),
+            UNIQUE KEY unique_episode_path (file_path)
+        )
+        """,
+    ], {}),
+    Migration(2, "Videometadaten-Spalten der Episoden", [], {'episodes': EPISODE_ADDED_COLUMNS}),
+    Migration(3, "Scan-Leases für den verteilten Scan (--shard)", [SCAN_LEASES_SCHEMA], {}),
+    Migration(4, "Aufrufe im Dashboard (anime_views)", [ANIME_VIEWS_SCHEMA], {}),
+    Migration(5, "Inhalts-Fingerabdruck der Episoden", [],
+              {'episodes': [("content_fingerprint", "CHAR(32)")]},
+              {'episodes': [("idx_episodes_content_fingerprint", "content_fingerprint")]}),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(cursor):
+    """
+    Gibt die Version des Schemas zurück, oder None, wenn es noch keine Tabelle schema_version gibt.
+    """
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except Error:
+        return None
+    return cursor.fetchall()[0][0] or 0
+
+def existing_columns(cursor, table):
+    """
+    Spaltennamen einer Tabelle (klein geschrieben), ohne eine Zeile zu lesen.
+    """
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    cursor.fetchall()
+    return {column[0].lower() for column in cursor.description}
+
+def _apply(cursor, pending):
+    for migration in pending:
+        for statement in migration.statements:
+            cursor.execute(statement)
+
+    # Neue Spalten aller ausstehenden Migrationen zu einem ALTER TABLE je Tabelle zusammenfassen
+    columns_by_table = OrderedDict()
+    indexes_by_column = {}
+    for migration in pending:
+        for table, columns in migration.add_columns.items():
+            columns_by_table.setdefault(table, []).extend(columns)
+        for table, indexes in (migration.add_indexes or {}).items():
+            for index_name, column_name in indexes:
+                indexes_by_column[(table, column_name.lower())] = index_name
+    for table, columns in columns_by_table.items():
+        present = existing_columns(cursor, table)
+        missing = []
+        for column_name, column_type in columns:
+            if column_name.lower() not in present:
+                missing.append((column_name, column_type))
+                present.add(column_name.lower())
+        if missing:
+            # Indizes nur für neu angelegte Spalten; bei vorhandener Spalte gilt der Index als vorhanden
+            clauses = [f"ADD COLUMN {column_name} {column_type}" for column_name, column_type in missing]
+            clauses += [f"ADD INDEX {indexes_by_column[(table, column_name.lower())]} ({column_name})"
+                        for column_name, _ in missing if (table, column_name.lower()) in indexes_by_column]
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+            logging.info(f"{len(missing)} Spalten zur Tabelle {table} hinzugefügt: "
+                         f"{', '.join(column_name for column_name, _ in missing)}")
+
+def migrate(connection, migrations=None, force=False):
+    """
+    Bringt das Schema auf den neuesten Stand und gibt die angewendeten Versionen zurück.
+    Mit force werden alle Migrationen erneut geprüft (vorhandene Tabellen und Spalten
+    werden übersprungen), z.B. nach Änderungen an der Datenbank von Hand.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    cursor = connection.cursor()
+    try:
+        version = current_version(cursor)
+        if version is None:
+            cursor.execute(SCHEMA_VERSION_TABLE)
+            version = 0
+        pending = [migration for migration in migrations if force or migration.version > version]
+        if not pending:
+            logging.debug(f"Datenbankschema aktuell (Version {version}).")
+            return []
+
+        try:
+            _apply(cursor, pending)
+        except Error:
+            # Ein gleichzeitig gestarteter Lauf (--shard) kann dieselben Migrationen eben angewendet haben
+            latest = max(migration.version for migration in migrations)
+            if (current_version(cursor) or 0) >= latest:
+                logging.info("Datenbankschema wurde gleichzeitig von einem anderen Lauf aktualisiert.")
+                return []
+            raise
+
+        cursor.executemany("INSERT IGNORE INTO schema_version (version, description) VALUES (%s, %s)",
+                           [(migration.version, migration.description) for migration in pending])
+        connection.commit()
+        applied = [migration.version for migration in pending]
+        logging.info(f"Datenbankschema von Version {version} auf {max(version, applied[-1])} aktualisiert.")
+        return applied
+    finally:
+        cursor.close()
@@ -11,6 +11,7 @@ from datetime import datetime
 from flask import Flask, render_template, jsonify, request, redirect, url_for
 from dotenv import load_dotenv
 import mysql.connector
+from content_fingerprint import find_duplicates
 
 # Umgebungsvariablen laden
 load_dotenv()
@@ -66,6 +67,27 @@ def execute_query(query, params=None, fetch_mode="all"):
         cursor.close()
         connection.close()
 
+def record_anime_view(anime_id):
+    """
+    Merkt den Aufruf einer Anime-Seite vor; der Archiver aktualisiert die Metadaten
+    kürzlich angesehener Animes bevorzugt. Fehler beeinträchtigen die Seite nicht.
+    """
+    try:
+        connection = get_db_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                "INSERT INTO anime_views (anime_id, view_count, last_viewed_at) VALUES (%s, 1, NOW()) "
+                "ON DUPLICATE KEY UPDATE view_count = view_count + 1, last_viewed_at = NOW()",
+                (anime_id,)
+            )
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+    except mysql.connector.Error as e:
+        logger.warning(f"Aufruf von Anime {anime_id} konnte nicht gespeichert werden: {e}")
+
 # Statistik-Funktionen
 def calculate_stats():
     """Berechnet erweiterte Statistiken für das Dashboard mit detaillierten Metadaten."""
@@ -456,6 +478,28 @@ def api_container():
         logger.error(f"Fehler beim Berechnen der Container-Statistiken: {str(e)}")
         return jsonify({'error': str(e), 'container_distribution': [{'container': 'Fehler', 'count': 0}]}), 500
 
+def load_duplicates(limit=100):
+    """Liefert Gruppen von Episoden mit gleichem Inhalts-Fingerabdruck."""
+    connection = get_db_connection()
+    try:
+        return find_duplicates(connection, limit)
+    finally:
+        connection.close()
+
+@app.route('/api/duplicates')
+def api_duplicates():
+    """API-Endpunkt für den Duplikatbericht (Episoden mit gleichem Inhalt)."""
+    try:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        groups = load_duplicates(limit)
+        return jsonify({
+            'groups': groups,
+            'wasted_bytes': sum(group['wasted_bytes'] for group in groups)
+        })
+    except Exception as e:
+        logger.error(f"Fehler beim Ermitteln der Duplikate: {str(e)}")
+        return jsonify({'error': str(e), 'groups': []}), 500
+
 @app.route('/api/stats/topanimes')
 def api_stats_topanimes():
     """API-Endpunkt für Top-Animes-Statistiken."""
@@ -628,7 +672,7 @@ class PrefixedLoader:
         self.original_loader = app.jinja_loader
     
     def get_source(self, environment, template):
-        if template == 'base.html' and request.endpoint in ['index', 'anime_list', 'search', 'filter_page', 'stats', 'anime_detail', 'season_detail', 'episode_detail']:
+        if template == 'base.html' and request.endpoint in ['index', 'anime_list', 'search', 'filter_page', 'stats', 'anime_detail', 'season_detail', 'episode_detail', 'duplicates']:
             try:
                 return self.original_loader.get_source(environment, 'simple_base.html')
             except Exception:
@@ -675,6 +719,7 @@ def anime_detail(anime_id):
     anime = execute_query("SELECT * FROM animes WHERE id = %s", (anime_id,), "one")
     if not anime:
         return render_template('errors/404.html'), 404
+    record_anime_view(anime_id)
     
     # Staffeln abrufen
     seasons = execute_query(
@@ -740,6 +785,17 @@ def stats():
     """Zeigt die Statistikseite an."""
     return render_template('stats.html')
 
+@app.route('/duplicates')
+def duplicates():
+    """Zeigt den Duplikatbericht an: Episoden mit gleichem Inhalt, größte Platzverschwendung zuerst."""
+    try:
+        groups = load_duplicates()
+    except mysql.connector.Error as e:
+        logger.error(f"Fehler beim Ermitteln der Duplikate: {str(e)}")
+        groups = []
+    wasted_bytes = sum(group['wasted_bytes'] for group in groups)
+    return render_template('duplicates.html', groups=groups, wasted_bytes=wasted_bytes)
+
 @app.errorhandler(404)
 def not_found_error(error):
     """Behandelt 404-Fehler."""
@@ -12,6 +12,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Import der Hauptanwendung
 from simple_dashboard import app as flask_app
+import anime_archiver
+from tests.media_tree import build_media_tree, fake_media_info
 
 @pytest.fixture
 def app():
@@ -56,3 +58,15 @@ def runner(app):
         FlaskCliRunner: Ein CLI-Test-Runner für die Flask-Anwendung.
     """
     return app.test_cli_runner()
+
+@pytest.fixture
+def media_tree(tmp_path, monkeypatch):
+    """
+    Synthetischer Medienbaum als MEDIA_PATH, MediaInfo wird durch fake_media_info ersetzt
+    und der Extraktions-Cache deaktiviert.
+    """
+    root = build_media_tree(tmp_path / "mediathek")
+    monkeypatch.setattr(anime_archiver, 'MEDIA_PATH', str(root))
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', fake_media_info)
+    monkeypatch.setattr(anime_archiver, 'EXTRACTION_CACHE_PATH', '')
+    return root
@@ -0,0 +1,54 @@
+"""
+Synthetischer Medienbaum und MediaInfo-Ersatz für die Tests des Archivers.
+"""
+import random
+import time
+
+EPISODE_ROWS = """
+    SELECT a.directory_path, s.directory_path, s.name, s.season_number,
+           e.name, e.episode_number, e.file_path, e.file_size, e.video_codec
+    FROM episodes e
+    JOIN seasons s ON s.id = e.season_id
+    JOIN animes a ON a.id = s.anime_id
+"""
+
+def build_media_tree(root):
+    """
+    Erstellt einen kleinen Medienbaum mit Staffelordnern, flachen Anime-Ordnern
+    und Unterordnern (Extras) innerhalb einer Staffel.
+    """
+    files = [
+        "Naruto/Staffel 1/Naruto E01.mkv",
+        "Naruto/Staffel 1/Naruto E02.mkv",
+        "Naruto/Staffel 1/Extras/Naruto E00.mp4",
+        "Naruto/Staffel 2/Naruto E03.mkv",
+        "Naruto/Staffel 2/info.nfo",
+        "One Piece/01 - Romance Dawn.mkv",
+        "One Piece/02 - The Great Swordsman.mkv",
+        "One Piece/cover.jpg",
+        "Bleach/Season 3/Bleach EP10.avi",
+        "Leerer Anime/Staffel 1/readme.txt",
+        "lose_datei.mkv",
+    ]
+    for relative_path in files:
+        file_path = root / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(b"\0" * (len(relative_path) * 10))
+    return root
+
+def fake_media_info(file_path, parse_mode=None):
+    """
+    Ersetzt MediaInfo: liefert pfadabhängige Metadaten mit zufälliger Verzögerung,
+    damit die parallelen Worker in wechselnder Reihenfolge fertig werden.
+    """
+    time.sleep(random.uniform(0, 0.01))
+    return {
+        'duration_ms': 1000, 'video_format': 'Matroska', 'video_codec': f"codec-{len(file_path)}",
+        'video_bitrate': None, 'resolution_width': 1920, 'resolution_height': 1080, 'framerate': 23.976,
+        'audio_codec': None, 'audio_channels': None, 'audio_bitrate': None,
+        'audio_sample_rate': None, 'subtitles_language': None, 'creation_time': None,
+        'aspect_ratio': '16:9', 'color_depth': None, 'hdr_format': None, 'color_space': None,
+        'scan_type': None, 'encoder': None, 'audio_language': None, 'audio_tracks_count': 0,
+        'audio_languages': None, 'subtitles_formats': None, 'subtitles_count': 0,
+        'forced_subtitles': False, 'container_format': 'Matroska', 'metadata_mode': parse_mode or 'full'
+    }
@@ -0,0 +1,205 @@
+"""
+SQLite-basierter Ersatz für eine mysql.connector-Verbindung.
+Damit lassen sich die Scan- und Update-Funktionen des Archivers ohne MySQL-Server testen.
+Es wird nur der SQL-Umfang übersetzt, den anime_archiver.py tatsächlich verwendet.
+"""
+import re
+import sqlite3
+
+from mysql.connector import Error
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS animes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(255) NOT NULL UNIQUE,
+        directory_path VARCHAR(511) NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS seasons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        anime_id INT NOT NULL REFERENCES animes(id),
+        name VARCHAR(255) NOT NULL,
+        season_number INT,
+        directory_path VARCHAR(511) NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS episodes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        season_id INT NOT NULL REFERENCES seasons(id),
+        name VARCHAR(255) NOT NULL,
+        episode_number INT,
+        file_path VARCHAR(511) NOT NULL UNIQUE,
+        file_size BIGINT,
+        file_mtime BIGINT,
+        file_extension VARCHAR(10),
+        duration_ms BIGINT,
+        video_format VARCHAR(50),
+        video_codec VARCHAR(50),
+        video_bitrate BIGINT,
+        resolution_width INT,
+        resolution_height INT,
+        framerate FLOAT,
+        aspect_ratio VARCHAR(20),
+        color_depth VARCHAR(10),
+        hdr_format VARCHAR(30),
+        color_space VARCHAR(30),
+        scan_type VARCHAR(20),
+        encoder VARCHAR(100),
+        audio_codec VARCHAR(50),
+        audio_channels INT,
+        audio_bitrate BIGINT,
+        audio_sample_rate INT,
+        audio_language VARCHAR(50),
+        audio_tracks_count INT,
+        audio_languages VARCHAR(255),
+        subtitles_language VARCHAR(255),
+        subtitles_formats VARCHAR(255),
+        subtitles_count INT,
+        forced_subtitles BOOLEAN,
+        container_format VARCHAR(50),
+        creation_time DATETIME,
+        metadata_mode VARCHAR(10),
+        content_fingerprint CHAR(32),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS scan_leases (
+        directory_path VARCHAR(511) NOT NULL PRIMARY KEY,
+        node_id VARCHAR(100) NOT NULL,
+        claimed_at BIGINT NOT NULL,
+        heartbeat_at BIGINT NOT NULL,
+        expires_at BIGINT NOT NULL,
+        completed_at BIGINT NULL
+    );
+    CREATE TABLE IF NOT EXISTS anime_views (
+        anime_id INTEGER NOT NULL PRIMARY KEY,
+        view_count INTEGER NOT NULL DEFAULT 0,
+        last_viewed_at DATETIME NOT NULL
+    );
+"""
+
+
+# UPDATE t AS a JOIN s AS b ON ... SET a.x = b.x (MySQL) -> UPDATE t AS a SET x = b.x FROM s AS b WHERE ...
+UPDATE_JOIN = re.compile(r'UPDATE (\w+) AS (\w+) JOIN (\w+) AS (\w+) ON (.+?) SET (.+)$', re.S)
+# ALTER TABLE t ADD COLUMN a X, ADD INDEX i (a) (MySQL) -> eine Anweisung je Spalte bzw. Index
+ALTER_ADD = re.compile(r'ALTER TABLE (\w+) (ADD .+)$', re.S)
+ADD_INDEX = re.compile(r'INDEX (\w+) \((.+)\)$')
+
+
+def translate(query):
+    """Übersetzt die vom Archiver verwendeten MySQL-Konstrukte nach SQLite."""
+    match = UPDATE_JOIN.match(query.strip())
+    if match:
+        table, alias, source, source_alias, condition, assignments = match.groups()
+        assignments = re.sub(rf'\b{alias}\.(\w+) =', r'\1 =', assignments)
+        query = f"UPDATE {table} AS {alias} SET {assignments} FROM {source} AS {source_alias} WHERE {condition}"
+    return query.replace('%s', '?').replace('INSERT IGNORE', 'INSERT OR IGNORE')
+
+
+class StandInCursor:
+    """Cursor mit der Schnittstelle von mysql.connector (dictionary, rowcount, lastrowid)."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.db.cursor()
+        self._dictionary = dictionary
+        self._is_select = False
+        self._fetched = 0
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._connection.statements += 1
+        self._connection.queries.append(' '.join(query.split()))
+        try:
+            alter = ALTER_ADD.match(query.strip())
+            if alter:
+                for clause in alter.group(2)[len('ADD '):].split(', ADD '):
+                    index = ADD_INDEX.match(clause)
+                    if index:
+                        self._cursor.execute(f"CREATE INDEX {index.group(1)} ON {alter.group(1)} ({index.group(2)})")
+                    else:
+                        self._cursor.execute(f"ALTER TABLE {alter.group(1)} ADD {clause}")
+            else:
+                self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.OperationalError as e:
+            raise Error(msg=str(e))
+        self._is_select = self._cursor.description is not None
+        self._fetched = 0
+        self.rowcount = -1 if self._is_select else self._cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        self._connection.statements += 1
+        self._connection.queries.append(' '.join(query.split()))
+        self._cursor.executemany(translate(query), [tuple(p) for p in seq_params])
+        self._is_select = False
+        self.rowcount = self._cursor.rowcount
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def _count(self, rows):
+        # mysql.connector zählt bei ungepufferten Cursorn die bisher gelesenen Zeilen
+        self._fetched += rows
+        self.rowcount = self._fetched
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return self._convert(row)
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self._count(len(rows))
+        return [self._convert(row) for row in rows]
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return [self._convert(row) for row in rows]
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """Verbindung mit der Schnittstelle von mysql.connector auf Basis einer SQLite-Datenbank."""
+
+    def __init__(self, path=':memory:', schema=SCHEMA):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(schema)
+        self.statements = 0
+        self.queries = []
+        self.commits = 0
+
+    def cursor(self, dictionary=False, buffered=False, prepared=False):
+        return StandInCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        self.commits += 1
+        self.db.commit()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+
+    def rows(self, query):
+        """Liefert das Ergebnis einer Abfrage als Menge von Tupeln (für Vergleiche in Tests)."""
+        return set(self.db.execute(query).fetchall())
@@ -0,0 +1,340 @@
+"""
+Test-Modul für den Verzeichnisscan des Archivers.
+Die Tests laufen gegen eine SQLite-Ersatzdatenbank und einen synthetischen Medienbaum.
+"""
+import random
+import time
+import pytest
+
+import anime_archiver
+from ingest_pipeline import run_pipeline
+from tests.media_tree import EPISODE_ROWS, fake_media_info
+from tests.sqlite_standin import StandInConnection
+
+def run_scan(root, workers):
+    """
+    Führt einen rekursiven Scan aus und gibt Datenbank und Statistik zurück.
+    """
+    for key in anime_archiver.STATS:
+        anime_archiver.STATS[key] = 0
+    connection = StandInConnection()
+    with anime_archiver.extraction_pool(workers) as executor:
+        context = anime_archiver.ScanContext(executor=executor)
+        anime_archiver.scan_directory_recursive(connection, str(root), context=context)
+    return connection, dict(anime_archiver.STATS)
+
+def test_parallel_scan_matches_serial_scan(media_tree):
+    """
+    Testet, ob der parallele Scan dieselben Zeilen und Statistiken liefert wie der serielle.
+    """
+    serial_db, serial_stats = run_scan(media_tree, workers=1)
+    parallel_db, parallel_stats = run_scan(media_tree, workers=4)
+
+    assert parallel_stats == serial_stats
+    for query in ["SELECT name, directory_path FROM animes",
+                  "SELECT name, season_number, directory_path FROM seasons",
+                  EPISODE_ROWS]:
+        assert parallel_db.rows(query) == serial_db.rows(query)
+
+    # Alle Videodateien innerhalb der Anime-Ordner wurden mit Metadaten erfasst
+    episodes = serial_db.rows(EPISODE_ROWS)
+    assert len(episodes) == 7
+    assert all(row[-1] is not None for row in episodes)
+
+def test_pipeline_keeps_order_and_bounds_queues():
+    """
+    Testet, ob die Pipeline trotz paralleler Extraktion in Quellreihenfolge schreibt
+    und die Quelle bei langsamer Persistenz nicht beliebig weit vorausläuft.
+    """
+    queue_size = 4
+    produced = []
+    persisted = []
+    max_ahead = 0
+
+    def source():
+        for item in range(60):
+            produced.append(item)
+            yield item
+
+    def slow_double(item):
+        time.sleep(random.uniform(0, 0.005))
+        return item * 2
+
+    def slow_persist(item, result):
+        nonlocal max_ahead
+        max_ahead = max(max_ahead, len(produced) - len(persisted))
+        time.sleep(0.001)
+        persisted.append((item, result))
+
+    with anime_archiver.extraction_pool(8) as executor:
+        progress = run_pipeline(source(), slow_double, slow_persist, executor=executor, queue_size=queue_size)
+
+    assert persisted == [(item, item * 2) for item in range(60)]
+    assert progress.discovered.count == progress.extracted.count == progress.persisted.count == 60
+    # Je Warteschlange, der gerade geschriebene Stapel und je ein Element in Quelle und Extraktion
+    assert max_ahead <= 3 * queue_size + 3
+
+def test_rescan_skips_unchanged_files(media_tree, monkeypatch):
+    """
+    Testet, ob ein erneuter Scan unveränderte Dateien nicht erneut analysiert
+    und geänderte Dateien mit neuen Metadaten aktualisiert.
+    """
+    connection, _ = run_scan(media_tree, workers=1)
+
+    extracted = []
+    def counting_media_info(file_path, parse_mode=None):
+        extracted.append(file_path)
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', counting_media_info)
+
+    # Eine Datei verändern
+    changed_file = media_tree / "Naruto" / "Staffel 2" / "Naruto E03.mkv"
+    changed_file.write_bytes(b"\0" * 4096)
+
+    for key in anime_archiver.STATS:
+        anime_archiver.STATS[key] = 0
+    context = anime_archiver.ScanContext(known_files=anime_archiver.load_known_files(connection))
+    anime_archiver.scan_directory_recursive(connection, str(media_tree), context=context)
+
+    assert extracted == [str(changed_file)]
+    assert anime_archiver.STATS['episodes'] == 0
+    assert anime_archiver.STATS['changed_files'] == 1
+    assert anime_archiver.STATS['unchanged_files'] == 6
+    assert connection.rows(f"SELECT file_size FROM episodes WHERE file_path = '{changed_file}'") == {(4096,)}
+
+def test_failed_extraction_keeps_metadata_of_changed_file(media_tree, monkeypatch):
+    """
+    Testet, ob eine fehlgeschlagene Extraktion einer geänderten Datei die vorhandenen
+    Metadaten nicht überschreibt und der nächste Scan es erneut versucht.
+    """
+    connection, _ = run_scan(media_tree, workers=1)
+    changed_file = media_tree / "Naruto" / "Staffel 2" / "Naruto E03.mkv"
+    before = connection.rows(f"SELECT file_size, video_codec FROM episodes WHERE file_path = '{changed_file}'")
+    changed_file.write_bytes(b"\0" * 4096)
+
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', lambda file_path, parse_mode=None: None)
+    context = anime_archiver.ScanContext(known_files=anime_archiver.load_known_files(connection))
+    anime_archiver.scan_directory_recursive(connection, str(media_tree), context=context)
+    assert connection.rows(f"SELECT file_size, video_codec FROM episodes WHERE file_path = '{changed_file}'") == before
+
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', fake_media_info)
+    context = anime_archiver.ScanContext(known_files=anime_archiver.load_known_files(connection))
+    anime_archiver.scan_directory_recursive(connection, str(media_tree), context=context)
+    assert connection.rows(f"SELECT file_size FROM episodes WHERE file_path = '{changed_file}'") == {(4096,)}
+
+def test_symlinked_directories_are_scanned_once(media_tree):
+    """
+    Testet, ob Symlink-Schleifen und doppelt verlinkte Verzeichnisse nur einmal durchsucht werden.
+    """
+    season = media_tree / "Naruto" / "Staffel 1"
+    (season / "Extras" / "zurueck").symlink_to(season, target_is_directory=True)
+    (media_tree / "Naruto" / "Staffel 1 (Link)").symlink_to(season, target_is_directory=True)
+
+    connection, _ = run_scan(media_tree, workers=1)
+
+    # Keine Episode wurde über einen der Links ein zweites Mal erfasst
+    assert len(connection.rows(EPISODE_ROWS)) == 7
+
+def test_scan_writes_are_batched(media_tree, monkeypatch):
+    """
+    Testet, ob der Scan Episoden gebündelt schreibt statt nach jeder Zeile zu committen.
+    """
+    monkeypatch.setattr(anime_archiver, 'DB_COMMIT_INTERVAL', 3600)
+    serial_db, serial_stats = run_scan(media_tree, workers=1)
+    assert serial_stats['episodes'] == 7
+
+    monkeypatch.setattr(anime_archiver, 'DB_BATCH_SIZE', 2)
+    small_batch_db, small_batch_stats = run_scan(media_tree, workers=1)
+    assert small_batch_stats == serial_stats
+    assert small_batch_db.rows(EPISODE_ROWS) == serial_db.rows(EPISODE_ROWS)
+
+    # Ein Commit am Ende statt eines Commits pro Anime, Staffel und Episode
+    assert serial_db.commits == 1
+    assert small_batch_db.commits > serial_db.commits
+
+def test_single_pass_scan_reads_each_directory_once(media_tree, monkeypatch):
+    """
+    Testet, ob scan_directory jedes Verzeichnis genau einmal liest und dieselben Zeilen
+    erzeugt wie der frühere Scan mit zusätzlichem os.listdir-Durchlauf.
+    """
+    directories = [str(path) for path in [media_tree, *media_tree.rglob("*")] if path.is_dir()]
+    listed = []
+    original_scandir = anime_archiver.os.scandir
+    def counting_scandir(path):
+        listed.append(str(path))
+        return original_scandir(path)
+    monkeypatch.setattr(anime_archiver.os, 'scandir', counting_scandir)
+    monkeypatch.setattr(anime_archiver.os, 'listdir', lambda path: pytest.fail(f"os.listdir({path})"))
+    for key in anime_archiver.STATS:
+        anime_archiver.STATS[key] = 0
+
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    monkeypatch.undo()
+
+    assert sorted(listed) == sorted(directories)
+
+    # Zeilen, die Rekursion und alte Methode gemeinsam erzeugt haben
+    root = str(media_tree)
+    assert connection.rows("SELECT name, directory_path FROM animes") == {
+        (name, f"{root}/{name}") for name in ["Naruto", "One Piece", "Bleach", "Leerer Anime"]
+    }
+    assert connection.rows("SELECT name, season_number, directory_path FROM seasons") == {
+        ("Staffel 1", 1, f"{root}/Naruto/Staffel 1"),
+        ("Staffel 2", 2, f"{root}/Naruto/Staffel 2"),
+        ("Staffel 1", 1, f"{root}/One Piece"),
+        ("Season 3", 3, f"{root}/Bleach/Season 3"),
+        ("Staffel 1", 1, f"{root}/Leerer Anime/Staffel 1"),
+    }
+    assert {row[6] for row in connection.rows(EPISODE_ROWS)} == {
+        f"{root}/{path}" for path in [
+            "Naruto/Staffel 1/Naruto E01.mkv", "Naruto/Staffel 1/Naruto E02.mkv",
+            "Naruto/Staffel 1/Extras/Naruto E00.mp4", "Naruto/Staffel 2/Naruto E03.mkv",
+            "One Piece/01 - Romance Dawn.mkv", "One Piece/02 - The Great Swordsman.mkv",
+            "Bleach/Season 3/Bleach EP10.avi",
+        ]
+    }
+    # info.nfo, cover.jpg und readme.txt
+    assert anime_archiver.STATS['skipped_files'] == 3
+
+def test_directory_ids_resolved_without_lookups(media_tree):
+    """
+    Testet, ob Anime- und Staffel-IDs ohne SELECT pro Verzeichnis aufgelöst werden
+    und ein erneuter Scan die vorab geladenen IDs verwendet.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    episodes = connection.rows(EPISODE_ROWS)
+
+    lookups = [query for query in connection.queries if query.startswith("SELECT id FROM")]
+    assert lookups == []
+    # Die Standard-Staffel von One Piece wird einmal je Verzeichnis angelegt, nicht je Datei
+    season_inserts = [query for query in connection.queries if query.startswith("INSERT IGNORE INTO seasons")]
+    assert len(season_inserts) == 5
+
+    # Zweiter Scan: nur die Vorab-Abfragen, keine INSERTs für bekannte Verzeichnisse
+    connection.queries.clear()
+    anime_archiver.scan_directory(connection, workers=1)
+    assert all(query.startswith("SELECT") for query in connection.queries)
+    assert len(connection.queries) == 3
+    assert connection.rows(EPISODE_ROWS) == episodes
+
+def test_reconcile_removes_vanished_files(media_tree, monkeypatch):
+    """
+    Testet, ob ein erneuter Scan Episoden gelöschter Dateien sowie leere Staffeln und Animes
+    entfernt, Dateien in unlesbaren Verzeichnissen aber behält.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+
+    (media_tree / "Naruto" / "Staffel 1" / "Naruto E02.mkv").unlink()
+    for path in (media_tree / "Bleach" / "Season 3").iterdir():
+        path.unlink()
+    (media_tree / "Bleach" / "Season 3").rmdir()
+    (media_tree / "Bleach").rmdir()
+    unreadable = str(media_tree / "One Piece")
+    (media_tree / "One Piece" / "01 - Romance Dawn.mkv").unlink()
+
+    original_list_directory = anime_archiver.list_directory
+    def failing_list_directory(path):
+        if path == unreadable:
+            raise PermissionError(13, "Permission denied", path)
+        return original_list_directory(path)
+    monkeypatch.setattr(anime_archiver, 'list_directory', failing_list_directory)
+    anime_archiver.STATS['removed_files'] = 0
+    anime_archiver.scan_directory(connection, workers=1)
+
+    root = str(media_tree)
+    assert anime_archiver.STATS['removed_files'] == 2
+    assert {row[6] for row in connection.rows(EPISODE_ROWS)} == {
+        f"{root}/{path}" for path in [
+            "Naruto/Staffel 1/Naruto E01.mkv", "Naruto/Staffel 1/Extras/Naruto E00.mp4",
+            "Naruto/Staffel 2/Naruto E03.mkv",
+            # Nicht lesbar: bleibt trotz gelöschter Datei erhalten
+            "One Piece/01 - Romance Dawn.mkv", "One Piece/02 - The Great Swordsman.mkv",
+        ]
+    }
+    assert connection.rows("SELECT name FROM animes") == {("Naruto",), ("One Piece",), ("Leerer Anime",)}
+    assert ("Season 3",) not in connection.rows("SELECT name FROM seasons")
+
+    # Nur DELETEs in Blöcken, kein Einzelzugriff je Zeile
+    deletes = [query for query in connection.queries if query.startswith("DELETE")]
+    assert len(deletes) == 3
+
+def test_reconcile_refuses_mass_deletion(media_tree, monkeypatch):
+    """
+    Testet, ob bei einem leeren Medienpfad (z.B. nicht eingehängte Freigabe) nichts gelöscht wird.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    episodes = connection.rows(EPISODE_ROWS)
+
+    monkeypatch.setattr(anime_archiver, 'list_directory', lambda path: ([], []))
+    anime_archiver.scan_directory(connection, workers=1)
+    assert connection.rows(EPISODE_ROWS) == episodes
+
+    # Ausdrücklich erzwungen (--force-reconcile) wird gelöscht
+    known_files = anime_archiver.load_known_files(connection)
+    context = anime_archiver.ScanContext(known_files=known_files)
+    assert anime_archiver.reconcile_deleted_files(connection, context, max_delete_ratio=1.0) == 7
+    assert connection.rows(EPISODE_ROWS) == set()
+
+def test_update_streams_keyset_pages(media_tree, monkeypatch):
+    """
+    Testet, ob die Metadatenaktualisierung die Episoden seitenweise nach ID abfragt
+    und Platzhalter im Pfadfilter nicht als LIKE-Muster wirken.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    monkeypatch.setattr(anime_archiver, 'UPDATE_PAGE_SIZE', 3)
+
+    connection.queries.clear()
+    assert anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=2) == 7
+    pages = [query for query in connection.queries if query.startswith("SELECT id, file_path")]
+    assert len(pages) == 3
+    assert all(query.endswith("ORDER BY id LIMIT %s") and "OFFSET" not in query for query in pages)
+
+    # "_" steht für genau ein beliebiges Zeichen, solange es nicht maskiert wird
+    assert anime_archiver.update_episodes_metadata(
+        connection, filter_path=f"{media_tree}/Narut_", reprocess_all=True, workers=1) == 0
+    assert anime_archiver.update_episodes_metadata(
+        connection, filter_path=f"{media_tree}/Naruto/", reprocess_all=True, workers=1) == 4
+
+def test_update_applies_batches_through_staging_table(media_tree, monkeypatch):
+    """
+    Testet, ob die Metadatenaktualisierung je Stapel ein UPDATE ... JOIN über die
+    Staging-Tabelle ausführt statt einem UPDATE pro Episode, mit gleichem Ergebnis.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    scanned_rows = connection.rows(EPISODE_ROWS)
+    connection.db.execute("UPDATE episodes SET duration_ms = NULL, video_codec = NULL, metadata_mode = NULL")
+    monkeypatch.setattr(anime_archiver, 'DB_BATCH_SIZE', 3)
+    monkeypatch.setattr(anime_archiver, 'DB_COMMIT_INTERVAL', 3600)
+
+    connection.queries.clear()
+    assert anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=1) == 7
+    assert connection.rows(EPISODE_ROWS) == scanned_rows
+
+    staged = anime_archiver.EPISODE_METADATA_STAGED
+    joins = [query for query in connection.queries if query.startswith("UPDATE episodes AS t JOIN")]
+    assert len(joins) == 3
+    assert connection.queries.count(staged.create_query) == 1
+    assert not any(query.startswith("UPDATE episodes SET") for query in connection.queries)
+
+def test_default_season_error_skips_only_flat_anime(media_tree, monkeypatch):
+    """
+    Testet, ob ein Datenbankfehler beim Anlegen der Standard-Staffel eines flachen
+    Anime-Ordners nur dessen Episoden überspringt und den Scan nicht abbricht.
+    """
+    original_ensure_season = anime_archiver.ensure_season
+    def failing_ensure_season(cursor, context, anime_id, season_name, season_number, directory_path):
+        if directory_path == str(media_tree / "One Piece"):
+            raise anime_archiver.Error("Lock wait timeout exceeded")
+        return original_ensure_season(cursor, context, anime_id, season_name, season_number, directory_path)
+    monkeypatch.setattr(anime_archiver, 'ensure_season', failing_ensure_season)
+
+    connection, _ = run_scan(media_tree, workers=2)
+    paths = {row[6] for row in connection.rows(EPISODE_ROWS)}
+    assert len(paths) == 5
+    assert not any("One Piece" in path for path in paths)
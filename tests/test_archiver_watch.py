@@ -0,0 +1,187 @@
+"""
+Test-Modul für den Überwachungsmodus (--watch) des Archivers.
+"""
+import os
+import time
+import threading
+import pytest
+
+import anime_archiver
+from tests.sqlite_standin import StandInConnection
+from tests.media_tree import EPISODE_ROWS, fake_media_info
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def watch_context(connection):
+    anime_ids, season_ids = anime_archiver.load_directory_ids(connection)
+    return anime_archiver.ScanContext(known_files=anime_archiver.load_known_files(connection),
+                                      anime_ids=anime_ids, season_ids=season_ids)
+
+def test_debouncer_waits_until_file_is_written(tmp_path):
+    """
+    Testet, ob Dateien erst gemeldet werden, wenn sie für die Wartezeit unverändert sind.
+    """
+    clock = FakeClock()
+    debouncer = anime_archiver.Debouncer(delay=10, clock=clock)
+    episode = tmp_path / "E01.mkv"
+    episode.write_bytes(b"\0" * 100)
+    debouncer.touch(str(episode))
+
+    clock.now = 5
+    assert debouncer.ready() == []
+
+    # Datei wächst noch: Wartezeit beginnt von vorn
+    episode.write_bytes(b"\0" * 200)
+    clock.now = 11
+    assert debouncer.ready() == []
+    clock.now = 22
+    assert debouncer.ready() == [str(episode)]
+    assert len(debouncer) == 0
+
+    # Gelöschte Dateien werden verworfen
+    debouncer.touch(str(episode))
+    episode.unlink()
+    clock.now = 40
+    assert debouncer.ready() == []
+    assert len(debouncer) == 0
+
+def test_ingest_paths_archives_only_affected_files(media_tree):
+    """
+    Testet, ob neue Dateien, Staffeln und Animes gezielt archiviert werden.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    context = watch_context(connection)
+
+    new_episode = media_tree / "Naruto" / "Staffel 2" / "Naruto E04.mkv"
+    new_episode.write_bytes(b"\0" * 100)
+    flat_episode = media_tree / "One Piece" / "03 - Morgan.mkv"
+    flat_episode.write_bytes(b"\0" * 100)
+    new_season = media_tree / "Bleach" / "Season 4"
+    new_season.mkdir()
+    (new_season / "Bleach EP11.mkv").write_bytes(b"\0" * 100)
+    new_anime = media_tree / "Mushishi"
+    (new_anime / "Staffel 1").mkdir(parents=True)
+    (new_anime / "Staffel 1" / "Mushishi 01.mkv").write_bytes(b"\0" * 100)
+
+    connection.queries.clear()
+    anime_archiver.ingest_paths(connection, [str(new_episode), str(flat_episode), str(new_season),
+                                             str(new_anime), str(media_tree / "One Piece" / "cover.jpg")], context)
+
+    episodes = {row[6]: row for row in connection.rows(EPISODE_ROWS)}
+    assert len(episodes) == 11
+    assert episodes[str(flat_episode)][1] == str(media_tree / "One Piece")
+    assert episodes[str(new_season / "Bleach EP11.mkv")][3] == 4
+    assert str(new_episode) in context.known_files
+
+    # Erneutes Ereignis für eine unveränderte Datei schreibt nichts
+    connection.queries.clear()
+    anime_archiver.ingest_paths(connection, [str(new_episode)], context)
+    assert not any(query.startswith(("INSERT", "UPDATE")) for query in connection.queries)
+
+def test_ingested_directory_files_are_known_and_extracted_in_pool(media_tree, monkeypatch):
+    """
+    Testet, ob Episoden eines neu erkannten Verzeichnisses danach als bekannt gelten,
+    ein weiteres Ereignis für sie nichts schreibt und die Extraktion im Pool läuft.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    new_anime = media_tree / "Mushishi" / "Staffel 1"
+    new_anime.mkdir(parents=True)
+    for number in (1, 2, 3):
+        (new_anime / f"Mushishi 0{number}.mkv").write_bytes(b"\0" * (100 + number))
+
+    threads = set()
+    def recording_media_info(file_path, parse_mode=None):
+        threads.add(threading.current_thread().name)
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', recording_media_info)
+
+    with anime_archiver.extraction_pool(2) as executor:
+        context = watch_context(connection)
+        context.executor = executor
+        anime_archiver.ingest_paths(connection, [str(media_tree / "Mushishi")], context)
+        assert all(name.startswith('mediainfo') for name in threads)
+        assert all(str(path) in context.known_files for path in new_anime.iterdir())
+
+        connection.queries.clear()
+        anime_archiver.ingest_paths(connection, [str(new_anime / "Mushishi 02.mkv")], context)
+        assert not any(query.startswith(("INSERT", "UPDATE")) for query in connection.queries)
+    assert len(connection.rows(EPISODE_ROWS)) == 10
+
+def test_ingest_backfills_mtime_and_ignores_vanished_files(media_tree, monkeypatch):
+    """
+    Testet, ob eine Episode ohne file_mtime nur die Änderungszeit nachgetragen bekommt,
+    statt erneut analysiert zu werden, und eine zwischenzeitlich verschwundene Datei
+    übersprungen wird.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    episode = media_tree / "Naruto" / "Staffel 1" / "Naruto E01.mkv"
+    connection.db.execute(f"UPDATE episodes SET file_mtime = NULL WHERE file_path = '{episode}'")
+    context = watch_context(connection)
+
+    extracted = []
+    monkeypatch.setattr(anime_archiver, 'extract_media_info',
+                        lambda file_path, parse_mode=None: extracted.append(file_path) or fake_media_info(file_path))
+    vanished = media_tree / "Naruto" / "Staffel 1" / "Naruto E09.mkv.part.mkv"
+    original_isfile = os.path.isfile
+    monkeypatch.setattr(anime_archiver.os.path, 'isfile', lambda path: path == str(vanished) or original_isfile(path))
+    anime_archiver.ingest_paths(connection, [str(episode), str(vanished)], context)
+
+    assert extracted == []
+    assert connection.rows(f"SELECT file_mtime FROM episodes WHERE file_path = '{episode}'") == {(int(episode.stat().st_mtime),)}
+    assert context.known_files[str(episode)][2] == int(episode.stat().st_mtime)
+
+def test_polling_watcher_reports_new_entries(tmp_path):
+    """
+    Testet den Polling-Ersatz: neue Dateien und Verzeichnisse werden über die
+    Änderungszeit der Verzeichnisse erkannt.
+    """
+    (tmp_path / "Naruto").mkdir()
+    watcher = anime_archiver.PollingWatcher(str(tmp_path), interval=0.01)
+    assert watcher.read_events(timeout=0.05) == set()
+
+    episode = tmp_path / "Naruto" / "Naruto E01.mkv"
+    episode.write_bytes(b"\0")
+    season = tmp_path / "Naruto" / "Staffel 2"
+    season.mkdir()
+    os.utime(tmp_path / "Naruto", ns=(0, 0))
+    time.sleep(0.02)
+    assert watcher.read_events(timeout=0.05) == {str(episode), str(season)}
+
+    # Das neue Verzeichnis wird ab jetzt ebenfalls überwacht
+    (season / "Naruto E02.mkv").write_bytes(b"\0")
+    os.utime(season, ns=(0, 0))
+    time.sleep(0.02)
+    assert watcher.read_events(timeout=0.05) == {str(season / "Naruto E02.mkv")}
+
+def test_inotify_watcher_reports_new_files(tmp_path):
+    """
+    Testet, ob inotify neue Verzeichnisse meldet und anschließend auch darin
+    angelegte Dateien erkennt.
+    """
+    try:
+        watcher = anime_archiver.InotifyWatcher(str(tmp_path))
+    except (OSError, AttributeError) as e:
+        pytest.skip(f"inotify nicht verfügbar: {e}")
+    try:
+        season = tmp_path / "Naruto" / "Staffel 1"
+        season.parent.mkdir()
+        assert str(season.parent) in watcher.read_events(timeout=1)
+        season.mkdir()
+        assert str(season) in watcher.read_events(timeout=1)
+        (season / "Naruto E01.mkv").write_bytes(b"\0")
+
+        paths = set()
+        deadline = time.monotonic() + 2
+        while str(season / "Naruto E01.mkv") not in paths and time.monotonic() < deadline:
+            paths |= watcher.read_events(timeout=0.2)
+        assert str(season / "Naruto E01.mkv") in paths
+    finally:
+        watcher.close()
@@ -0,0 +1,92 @@
+"""
+Test-Modul für Checkpoints, Zeitbudget (--max-duration) und Fortsetzen (--resume).
+"""
+import anime_archiver
+from tests.media_tree import EPISODE_ROWS, fake_media_info
+from tests.sqlite_standin import StandInConnection
+
+def exhaust_after(monkeypatch, checks):
+    """
+    Lässt das Zeitbudget nach der angegebenen Anzahl Prüfungen ablaufen.
+    """
+    calls = []
+    def budget_exhausted():
+        calls.append(1)
+        return len(calls) > checks
+    monkeypatch.setattr(anime_archiver, 'budget_exhausted', budget_exhausted)
+
+def test_interrupted_scan_resumes_after_completed_animes(media_tree, tmp_path, monkeypatch):
+    """
+    Testet, ob ein wegen des Zeitbudgets beendeter Scan abgeschlossene Animes im Journal
+    vermerkt, nichts löscht und beim Fortsetzen nur die übrigen Animes durchsucht.
+    """
+    reference = StandInConnection()
+    anime_archiver.scan_directory(reference, workers=1)
+
+    connection = StandInConnection()
+    journal = anime_archiver.CheckpointJournal(str(tmp_path / "checkpoint.json"), str(media_tree))
+    exhaust_after(monkeypatch, 8)
+    assert anime_archiver.scan_directory(connection, workers=1, journal=journal) is False
+    assert not any(query.startswith("DELETE") for query in connection.queries)
+    completed = set(journal.completed_animes)
+    assert completed and str(media_tree / "Naruto") not in completed
+    assert len(connection.rows(EPISODE_ROWS)) < 7
+
+    # Fortsetzen: abgeschlossene Animes werden nicht erneut gelesen
+    monkeypatch.setattr(anime_archiver, 'budget_exhausted', lambda: False)
+    resumed = anime_archiver.CheckpointJournal(journal.path, str(media_tree))
+    assert resumed.load()
+    assert resumed.completed_animes == completed
+    listed = []
+    original_list_directory = anime_archiver.list_directory
+    def counting_list_directory(path):
+        listed.append(path)
+        return original_list_directory(path)
+    monkeypatch.setattr(anime_archiver, 'list_directory', counting_list_directory)
+
+    assert anime_archiver.scan_directory(connection, workers=1, journal=resumed) is True
+    assert not completed & set(listed)
+    assert connection.rows(EPISODE_ROWS) == reference.rows(EPISODE_ROWS)
+    assert resumed.scan_complete
+
+def test_metadata_update_resumes_after_last_committed_episode(media_tree, tmp_path, monkeypatch):
+    """
+    Testet, ob die Metadatenaktualisierung nach Ablauf des Zeitbudgets bei der
+    zuletzt festgeschriebenen Episode fortgesetzt wird.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    episode_ids = sorted(row[0] for row in connection.rows("SELECT id FROM episodes"))
+
+    extracted = []
+    def counting_media_info(file_path, parse_mode=None):
+        extracted.append(file_path)
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', counting_media_info)
+
+    journal = anime_archiver.CheckpointJournal(str(tmp_path / "checkpoint.json"), str(media_tree))
+    exhaust_after(monkeypatch, 3)
+    anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=1, journal=journal)
+    assert len(extracted) == 3
+    assert journal.update_positions == {'metadata': [0, episode_ids[2]]}
+
+    monkeypatch.setattr(anime_archiver, 'budget_exhausted', lambda: False)
+    resumed = anime_archiver.CheckpointJournal(journal.path, str(media_tree))
+    assert resumed.load()
+    anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=1, journal=resumed)
+    assert len(extracted) == 7
+    assert len(set(extracted)) == 7
+    assert resumed.update_positions == {'metadata': [0, episode_ids[-1]]}
+
+def test_journal_of_other_media_path_is_ignored(tmp_path):
+    """
+    Testet, ob ein Checkpoint für einen anderen Medienpfad nicht übernommen wird.
+    """
+    journal = anime_archiver.CheckpointJournal(str(tmp_path / "checkpoint.json"), "/mnt/alt")
+    journal.complete_anime("/mnt/alt/Naruto")
+    journal.save()
+
+    assert anime_archiver.CheckpointJournal(journal.path, "/mnt/alt").load()
+    assert not anime_archiver.CheckpointJournal(journal.path, "/mnt/neu").load()
+    journal.remove()
+    assert not anime_archiver.CheckpointJournal(journal.path, "/mnt/alt").load()
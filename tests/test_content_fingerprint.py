@@ -0,0 +1,129 @@
+"""
+Test-Modul für den Inhalts-Fingerabdruck: Verschiebe- und Duplikaterkennung.
+"""
+import os
+import shutil
+import threading
+
+import anime_archiver
+from content_fingerprint import content_fingerprint, fingerprint_blocks, find_duplicates
+from tests.media_tree import fake_media_info
+from tests.sqlite_standin import StandInConnection
+
+def unique_contents(root):
+    """
+    Gibt jeder Videodatei des Medienbaums einen eigenen Inhalt (im Medienbaum bestehen
+    alle Dateien aus Nullbytes, gleich lange Dateien wären also Duplikate).
+    """
+    for index, path in enumerate(sorted(root.rglob('*.*'))):
+        path.write_bytes(bytes([index + 1]) * path.stat().st_size)
+
+def record_extractions(monkeypatch):
+    extracted = []
+    def recording_media_info(file_path, parse_mode=None):
+        extracted.append(os.path.basename(file_path))
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', recording_media_info)
+    return extracted
+
+def test_fingerprint_samples_start_middle_and_end(tmp_path):
+    """
+    Testet, ob Anfang, Ende und Blöcke aus der Mitte in den Fingerabdruck eingehen,
+    nicht aber Bytes zwischen den gelesenen Blöcken.
+    """
+    assert fingerprint_blocks(100, block_size=10, samples=3) == [(0, 10), (22, 10), (45, 10), (67, 10), (90, 10)]
+    assert fingerprint_blocks(50, block_size=10, samples=3) == [(0, 50)]
+
+    path = tmp_path / "episode.mkv"
+    data = bytearray(os.urandom(100))
+    path.write_bytes(bytes(data))
+    original = content_fingerprint(str(path), block_size=10, samples=3)
+
+    data[15] ^= 0xFF  # zwischen erstem Block und erstem Block aus der Mitte
+    path.write_bytes(bytes(data))
+    assert content_fingerprint(str(path), block_size=10, samples=3) == original
+
+    data[50] ^= 0xFF  # im mittleren Block
+    path.write_bytes(bytes(data))
+    assert content_fingerprint(str(path), block_size=10, samples=3) != original
+
+def test_moved_file_keeps_row_without_new_analysis(media_tree, monkeypatch):
+    """
+    Testet, ob eine verschobene und umbenannte Datei ihre Zeile mit den Metadaten behält,
+    statt erneut analysiert und neu eingefügt zu werden, und der Abgleich nichts löscht.
+    """
+    unique_contents(media_tree)
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    old_path = str(media_tree / "Naruto/Staffel 2/Naruto E03.mkv")
+    episode_id, codec = connection.rows(f"SELECT id, video_codec FROM episodes WHERE file_path = '{old_path}'").pop()
+
+    new_path = media_tree / "Naruto/Staffel 1/[Gruppe] Naruto E03 v2.mkv"
+    os.rename(old_path, new_path)
+    extracted = record_extractions(monkeypatch)
+    monkeypatch.setitem(anime_archiver.STATS, 'moved_files', 0)
+    anime_archiver.scan_directory(connection, workers=2)
+
+    assert extracted == []
+    assert anime_archiver.STATS['moved_files'] == 1
+    season_id = connection.rows(f"SELECT id FROM seasons WHERE directory_path = '{media_tree / 'Naruto/Staffel 1'}'").pop()[0]
+    assert connection.rows(f"SELECT id, season_id, name, episode_number, video_codec FROM episodes "
+                           f"WHERE file_path = '{new_path}'") == {(episode_id, season_id, new_path.name, 3, codec)}
+    assert len(connection.rows("SELECT id FROM episodes")) == 7
+
+def test_duplicates_and_fingerprint_backfill(media_tree, monkeypatch):
+    """
+    Testet, ob Kopien als Duplikatgruppe gemeldet werden und Episoden ohne Fingerabdruck
+    beim nächsten Scan ohne erneute Analyse nachgetragen werden.
+    """
+    unique_contents(media_tree)
+    shutil.copy(media_tree / "Naruto/Staffel 1/Naruto E01.mkv", media_tree / "Bleach/Season 3/Naruto E01.mkv")
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+
+    groups = find_duplicates(connection)
+    assert len(groups) == 1
+    assert groups[0]['copies'] == 2
+    assert groups[0]['wasted_bytes'] == groups[0]['file_size'] > 0
+    assert sorted(episode['anime_name'] for episode in groups[0]['episodes']) == ['Bleach', 'Naruto']
+
+    connection.db.execute("UPDATE episodes SET content_fingerprint = NULL")
+    extracted = record_extractions(monkeypatch)
+    monkeypatch.setitem(anime_archiver.STATS, 'fingerprinted_files', 0)
+    anime_archiver.scan_directory(connection, workers=2)
+
+    assert extracted == []
+    assert anime_archiver.STATS['fingerprinted_files'] == 8
+    assert connection.rows("SELECT COUNT(*) FROM episodes WHERE content_fingerprint IS NULL") == {(0,)}
+    assert len(find_duplicates(connection)) == 1
+
+def test_copies_of_moved_file_claim_old_row_once(media_tree, monkeypatch):
+    """
+    Testet, ob von zwei Kopien einer verschobenen Datei nur eine die alte Zeile übernimmt
+    und die andere in der Extraktionsstufe analysiert statt im Datenbank-Thread.
+    """
+    unique_contents(media_tree)
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    old_path = media_tree / "Naruto/Staffel 2/Naruto E03.mkv"
+    shutil.copy(old_path, media_tree / "Bleach/Season 3/Naruto E03.mkv")
+    os.rename(old_path, media_tree / "Naruto/Staffel 1/Naruto E03.mkv")
+
+    persist_thread = []
+    original_persist = anime_archiver.persist_scan_item
+    def recording_persist(cursor, context, item, result):
+        persist_thread.append(threading.get_ident())
+        return original_persist(cursor, context, item, result)
+    monkeypatch.setattr(anime_archiver, 'persist_scan_item', recording_persist)
+    threads = []
+    def recording_media_info(file_path, parse_mode=None):
+        threads.append(threading.get_ident())
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', recording_media_info)
+    monkeypatch.setitem(anime_archiver.STATS, 'moved_files', 0)
+    anime_archiver.scan_directory(connection, workers=4)
+
+    assert anime_archiver.STATS['moved_files'] == 1
+    assert len(threads) == 1 and threads[0] not in persist_thread
+    assert len(connection.rows("SELECT id FROM episodes")) == 8
+    assert connection.rows("SELECT COUNT(*) FROM episodes WHERE video_codec IS NULL") == {(0,)}
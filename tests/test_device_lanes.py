@@ -0,0 +1,81 @@
+"""
+Test-Modul für mehrere Medienverzeichnisse und die Extraktionsspuren je Gerät.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+import anime_archiver
+from device_lanes import DeviceLanes
+from ingest_pipeline import interleave
+from tests.sqlite_standin import StandInConnection
+
+def test_device_lanes_limit_readers_per_device_and_in_total():
+    """
+    Testet, ob je Gerät höchstens per_device und insgesamt höchstens max_workers Aufgaben
+    gleichzeitig laufen, verschiedene Geräte aber parallel gelesen werden.
+    """
+    lock = threading.Lock()
+    running = Counter()
+    peak = Counter()
+
+    def read(device, _):
+        with lock:
+            running[device] += 1
+            running['total'] += 1
+            for key in (device, 'total'):
+                peak[key] = max(peak[key], running[key])
+        time.sleep(0.02)
+        with lock:
+            running[device] -= 1
+            running['total'] -= 1
+        return device
+
+    lanes = DeviceLanes(lambda device, _: device, per_device=2, max_workers=3)
+    futures = [lanes.submit(read, device, index) for index in range(6) for device in ('sda', 'sdb')]
+    assert [future.result() for future in futures] == ['sda', 'sdb'] * 6
+    lanes.shutdown()
+
+    assert peak['sda'] <= 2 and peak['sdb'] <= 2
+    assert peak['total'] == 3
+    assert lanes.submitted == Counter({'sda': 6, 'sdb': 6})
+
+def test_interleave_alternates_sources():
+    """
+    Testet, ob die Quellen abwechselnd geliefert werden und erschöpfte Quellen ausscheiden.
+    """
+    assert list(interleave([[1, 2, 3], [4], [5, 6]])) == [1, 4, 5, 2, 6, 3]
+    assert list(interleave([])) == []
+
+def test_scan_archives_all_roots_and_keeps_missing_root(media_tree, monkeypatch, tmp_path):
+    """
+    Testet, ob alle Medienverzeichnisse aus MEDIA_PATH archiviert werden und der Abgleich
+    die Episoden eines fehlenden oder leer eingehängten Verzeichnisses nicht löscht.
+    """
+    second = tmp_path / "platte2"
+    for relative_path in ["Monster/Staffel 1/Monster E01.mkv", "Monster/Staffel 1/Monster E02.mkv"]:
+        (second / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (second / relative_path).write_bytes(b"\0" * len(relative_path))
+    monkeypatch.setattr(anime_archiver, 'MEDIA_PATH', f"{media_tree}{os.pathsep}{second}{os.pathsep}{media_tree}/")
+    assert anime_archiver.media_roots() == [str(media_tree), str(second)]
+    assert anime_archiver.containing_root(str(second / "Monster")) == str(second)
+
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=3)
+    assert len(connection.rows("SELECT id FROM episodes")) == 9
+    assert connection.rows(f"SELECT name FROM animes WHERE directory_path = '{second / 'Monster'}'") == {('Monster',)}
+
+    # Platte nicht eingehängt: Verzeichnis fehlt bzw. ist leer
+    second.rename(tmp_path / "ausgehängt")
+    anime_archiver.scan_directory(connection, workers=3)
+    second.mkdir()
+    anime_archiver.scan_directory(connection, workers=3)
+    assert len(connection.rows("SELECT id FROM episodes")) == 9
+
+    # Eine auf der anderen Platte gelöschte Datei wird weiterhin abgeglichen
+    second.rmdir()
+    (tmp_path / "ausgehängt").rename(second)
+    os.remove(media_tree / "Naruto/Staffel 1/Naruto E02.mkv")
+    anime_archiver.scan_directory(connection, workers=3)
+    assert len(connection.rows("SELECT id FROM episodes")) == 8
@@ -0,0 +1,92 @@
+"""
+Test-Modul für den Extraktions-Cache.
+"""
+import os
+from datetime import datetime
+
+import anime_archiver
+from extraction_cache import ExtractionCache
+from tests.media_tree import fake_media_info
+
+def test_cache_roundtrip_and_invalidation(tmp_path):
+    """
+    Testet, ob Einträge nur bei gleicher Datei, Größe, Änderungszeit und Version gelten.
+    """
+    episode = tmp_path / "E01.mkv"
+    episode.write_bytes(b"\0" * 100)
+    media_info = dict(fake_media_info(str(episode)), creation_time=datetime(2021, 1, 30, 15, 30, 45))
+
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), extractor_version=1)
+    assert cache.get(os.stat(episode)) is None
+    cache.put(str(episode), os.stat(episode), media_info)
+    assert cache.get(os.stat(episode)) == media_info
+    cache.close()
+
+    # Nach dem erneuten Öffnen mit neuer Extraktor-Version ungültig
+    assert ExtractionCache(str(tmp_path / "cache.sqlite"), extractor_version=2).get(os.stat(episode)) is None
+
+    # Nach einer Änderung der Datei ungültig
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), extractor_version=1)
+    os.utime(episode, ns=(0, 0))
+    assert cache.get(os.stat(episode)) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """
+    Testet die größenbasierte Verdrängung und das Aufräumen gelöschter Dateien.
+    """
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_mb=0.004)
+    episodes = []
+    for number in range(10):
+        episode = tmp_path / f"E{number:02d}.mkv"
+        episode.write_bytes(b"\0" * (number + 1))
+        episodes.append(episode)
+        cache.put(str(episode), os.stat(episode), fake_media_info(str(episode)))
+        # Die erste Episode wird immer wieder verwendet und bleibt erhalten
+        assert cache.get(os.stat(episodes[0])) is not None
+
+    stats = cache.statistics()
+    assert stats['size_bytes'] <= stats['max_bytes']
+    assert 0 < stats['entries'] < 10
+    assert cache.get(os.stat(episodes[1])) is None
+
+    episodes[0].unlink()
+    assert cache.prune(missing=True) == 1
+    assert cache.statistics()['entries'] == stats['entries'] - 1
+
+def test_cached_media_info_skips_mediainfo(tmp_path, monkeypatch):
+    """
+    Testet, ob der Archiver bei einem Cache-Treffer MediaInfo nicht aufruft.
+    """
+    extracted = []
+    def counting_media_info(file_path, parse_mode=None):
+        extracted.append(file_path)
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', counting_media_info)
+    monkeypatch.setattr(anime_archiver, 'EXTRACTION_CACHE_PATH', str(tmp_path / "cache.sqlite"))
+
+    episode = tmp_path / "E01.mkv"
+    episode.write_bytes(b"\0" * 100)
+    try:
+        first = anime_archiver.cached_media_info(str(episode))
+        second = anime_archiver.cached_media_info(str(episode), os.stat(episode))
+    finally:
+        anime_archiver.close_extraction_cache()
+
+    assert extracted == [str(episode)]
+    assert first == second
+
+def test_fast_results_do_not_satisfy_full_requests(tmp_path):
+    """
+    Testet, ob eine schnelle Analyse nur für den Modus fast wiederverwendet wird.
+    """
+    episode = tmp_path / "E01.ts"
+    episode.write_bytes(b"\0" * 100)
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+
+    cache.put(str(episode), os.stat(episode), fake_media_info(str(episode), 'fast'), 'fast')
+    assert cache.get(os.stat(episode), 'fast') is not None
+    assert cache.get(os.stat(episode), 'full') is None
+
+    cache.put(str(episode), os.stat(episode), fake_media_info(str(episode), 'full'), 'full')
+    assert cache.get(os.stat(episode), 'fast')['metadata_mode'] == 'full'
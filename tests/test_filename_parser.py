@@ -0,0 +1,47 @@
+"""
+Test-Modul für die Erkennung von Staffel- und Episodennummern in Dateinamen.
+Die Beispielnamen stehen in filename_corpus.tsv.
+"""
+import os
+
+import pytest
+
+import anime_archiver
+from filename_parser import parse_episode_name, parse_episode_names, parse_season_name
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'filename_corpus.tsv')
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as file:
+        for line in file:
+            if line.startswith('#') or not line.strip():
+                continue
+            name, *expected = line.rstrip('\n').split('\t')
+            yield name, tuple(int(value) if value else None for value in expected)
+
+@pytest.mark.parametrize('name,expected', list(load_corpus()))
+def test_corpus(name, expected):
+    """
+    Testet Staffel, Episode, Episodenbereich und Version für jeden Namen des Korpus.
+    """
+    parsed = parse_episode_name(name)
+    assert (parsed.season, parsed.episode, parsed.episode_end, parsed.version) == expected
+
+def test_batch_uses_common_title():
+    """
+    Testet, ob die Verzeichnisliste Zahlen im gemeinsamen Titel nicht als Episode wertet.
+    """
+    names = ["86 05.mkv", "86 06.mkv", "86 10.mkv"]
+    assert parse_episode_name(names[0]).episode == 86
+    assert [parsed.episode for parsed in parse_episode_names(names)] == [5, 6, 10]
+    # Unterschiedliche Episodennummern mit gleicher erster Ziffer gehören nicht zum Titel
+    assert [parsed.episode for parsed in parse_episode_names(["Titel 10.mkv", "Titel 11.mkv"])] == [10, 11]
+    assert [parsed.episode for parsed in parse_episode_names(["Naruto E01.mkv"])] == [1]
+
+@pytest.mark.parametrize('name,expected', [
+    ("Staffel 1", 1), ("Season 03", 3), ("S2", 2), ("2nd Season", 2), ("3", 3),
+    ("Staffel.4", 4), ("Extras", None), ("Specials", None),
+])
+def test_season_names(name, expected):
+    assert parse_season_name(name) == expected
+    assert anime_archiver.extract_season_number(name) == expected
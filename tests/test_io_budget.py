@@ -0,0 +1,104 @@
+"""
+Test-Modul für das Lesebudget der Metadatenextraktion (Token-Bucket und Dateilimit).
+"""
+import io
+import threading
+import time
+import pytest
+
+import anime_archiver
+from benchmarks.synthetic_tree import build_matroska
+from io_budget import IOBudget, ThrottledReader, MB
+from run_metrics import read_io_counters, THREAD_IO_PATH
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_token_bucket_throttles_to_rate():
+    """
+    Testet, ob der Bucket einen Stoß bis zur Burst-Größe durchlässt und danach auf
+    die eingestellte Rate bremst; der Durchsatz im Bericht entspricht dem Budget.
+    """
+    clock = FakeClock()
+    budget = IOBudget(rate=10 * MB, clock=clock, sleep=clock.sleep)
+    budget.consume(10 * MB)
+    assert clock.sleeps == []
+
+    reader = ThrottledReader(io.BytesIO(bytes(30 * MB)), budget)
+    while reader.read(MB):
+        pass
+    assert sum(clock.sleeps) == pytest.approx(3.0)
+
+    summary = budget.summary()
+    assert summary['bytes_read'] == 40 * MB
+    assert summary['achieved_mb_per_second'] == pytest.approx(40 / 3, rel=0.01)
+    assert summary['throttled_s'] == pytest.approx(3.0)
+
+    unlimited = IOBudget()
+    assert not unlimited.limited
+    unlimited.consume(100 * MB)
+    assert unlimited.bytes_read == 100 * MB
+
+def test_open_files_are_limited():
+    """
+    Testet, ob höchstens max_open_files Dateien gleichzeitig gelesen werden.
+    """
+    budget = IOBudget(max_open_files=2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def read_file():
+        with budget.reading():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=read_file) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert budget.files == 6
+
+@pytest.mark.skipif(read_io_counters(THREAD_IO_PATH) is None, reason="/proc/thread-self/io nicht verfügbar")
+def test_untracked_reads_are_charged_once(tmp_path, monkeypatch):
+    """
+    Testet, ob Lesezugriffe ohne ThrottledReader nachträglich abgebucht werden und
+    Lesezugriffe über ThrottledReader nicht doppelt zählen.
+    """
+    path = tmp_path / "episode.mkv"
+    path.write_bytes(bytes(2 * MB))
+    budget = IOBudget(rate=1000 * MB)
+
+    with budget.reading():
+        with open(path, 'rb') as file:
+            file.read()
+    assert 2 * MB <= budget.bytes_read < 2 * MB + 64 * 1024
+
+    with budget.reading() as counter:
+        with open(path, 'rb') as file:
+            reader = ThrottledReader(file, budget, counter)
+            while reader.read(256 * 1024):
+                pass
+    assert 4 * MB <= budget.bytes_read < 4 * MB + 128 * 1024
+
+    # Die Extraktion liest jede Datei innerhalb des Budgets
+    episode = tmp_path / "synthetisch.mkv"
+    episode.write_bytes(build_matroska(1440000, 1920, 1080, 4000000, 128000, 'jpn', padding=4096))
+    monkeypatch.setattr(anime_archiver, 'IO_BUDGET', budget)
+    assert anime_archiver.parse_media_file(str(episode), 'full').complete
+    assert budget.files == 3
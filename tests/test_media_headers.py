@@ -0,0 +1,221 @@
+"""
+Test-Modul für das Lesen der Matroska/MP4-Kopfdaten ohne MediaInfo.
+Die Testdateien werden aus den benötigten Elementen bzw. Boxen synthetisch erzeugt.
+"""
+import struct
+from datetime import datetime
+
+import pytest
+
+import anime_archiver
+import media_headers
+
+# --- Matroska -------------------------------------------------------------------------------------
+
+def element(element_id, *payload):
+    data = b''.join(payload)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + b'\x01' + len(data).to_bytes(7, 'big') + data
+
+def uint(element_id, value, length=None):
+    return element(element_id, value.to_bytes(length or max(1, (value.bit_length() + 7) // 8), 'big'))
+
+def text(element_id, value):
+    return element(element_id, value.encode())
+
+def bps_tag(track_uid, bitrate):
+    return element(media_headers.TAG,
+                   element(media_headers.TARGETS, uint(media_headers.TAG_TRACK_UID, track_uid)),
+                   element(media_headers.SIMPLE_TAG, text(media_headers.TAG_NAME, 'BPS'),
+                           text(media_headers.TAG_STRING, str(bitrate))))
+
+def build_matroska(with_statistics=True):
+    """
+    Matroska-Datei mit HEVC-Video (10 bit, HDR10), zwei Audiospuren und erzwungenen ASS-Untertiteln.
+    Die Tags stehen hinter dem ersten Cluster und sind nur über den SeekHead erreichbar.
+    """
+    hvcc = bytes(17) + bytes([0xFA]) + bytes(5)
+    info = element(media_headers.INFO,
+                   uint(media_headers.TIMECODE_SCALE, 1000000),
+                   element(media_headers.DURATION, struct.pack('>d', 1420000.0)),
+                   uint(media_headers.DATE_UTC, int((datetime(2021, 1, 30, 15, 30, 45) -
+                                                     media_headers.MATROSKA_EPOCH).total_seconds()) * 10**9, 8))
+    tracks = element(media_headers.TRACKS,
+                     element(media_headers.TRACK_ENTRY,
+                             uint(media_headers.TRACK_NUMBER, 1), uint(media_headers.TRACK_UID, 11),
+                             uint(media_headers.TRACK_TYPE, 1), text(media_headers.CODEC_ID, 'V_MPEGH/ISO/HEVC'),
+                             element(media_headers.CODEC_PRIVATE, hvcc), text(media_headers.LANGUAGE, 'jpn'),
+                             uint(media_headers.DEFAULT_DURATION, 41708333),
+                             element(media_headers.VIDEO,
+                                     uint(media_headers.PIXEL_WIDTH, 1920), uint(media_headers.PIXEL_HEIGHT, 1080),
+                                     uint(media_headers.FLAG_INTERLACED, 2),
+                                     element(media_headers.COLOUR,
+                                             uint(media_headers.TRANSFER, 16), uint(media_headers.PRIMARIES, 9),
+                                             element(media_headers.MASTERING_METADATA)))),
+                     element(media_headers.TRACK_ENTRY,
+                             uint(media_headers.TRACK_NUMBER, 2), uint(media_headers.TRACK_UID, 12),
+                             uint(media_headers.TRACK_TYPE, 2), text(media_headers.CODEC_ID, 'A_AAC'),
+                             text(media_headers.LANGUAGE, 'jpn'),
+                             element(media_headers.AUDIO,
+                                     element(media_headers.SAMPLING_FREQUENCY, struct.pack('>d', 48000.0)),
+                                     uint(media_headers.CHANNELS, 2))),
+                     element(media_headers.TRACK_ENTRY,
+                             uint(media_headers.TRACK_NUMBER, 3), uint(media_headers.TRACK_UID, 13),
+                             uint(media_headers.TRACK_TYPE, 2), text(media_headers.CODEC_ID, 'A_OPUS'),
+                             text(media_headers.LANGUAGE, 'ger'),
+                             element(media_headers.AUDIO, uint(media_headers.CHANNELS, 2))),
+                     element(media_headers.TRACK_ENTRY,
+                             uint(media_headers.TRACK_NUMBER, 4), uint(media_headers.TRACK_UID, 14),
+                             uint(media_headers.TRACK_TYPE, 17), text(media_headers.CODEC_ID, 'S_TEXT/ASS'),
+                             text(media_headers.LANGUAGE, 'ger'), uint(media_headers.FLAG_FORCED, 1)))
+    cluster = element(media_headers.CLUSTER, bytes(64), b'x265 (build 199) - 3.5+1:[Linux]', bytes(4096))
+    tags = element(media_headers.TAGS, bps_tag(11, 2500000), bps_tag(12, 128000), bps_tag(13, 96000))
+
+    def seek_head(position):
+        return element(media_headers.SEEK_HEAD,
+                       element(media_headers.SEEK, uint(media_headers.SEEK_ID, media_headers.TAGS),
+                               uint(media_headers.SEEK_POSITION, position, 8)))
+    tags_position = len(seek_head(0)) + len(info) + len(tracks) + len(cluster)
+    segment = element(media_headers.SEGMENT, seek_head(tags_position), info, tracks, cluster,
+                      tags if with_statistics else b'')
+    return element(media_headers.EBML, text(media_headers.DOC_TYPE, 'matroska')) + segment
+
+# --- MP4 ------------------------------------------------------------------------------------------
+
+def box(box_type, *payload):
+    data = b''.join(payload)
+    return struct.pack('>I4s', len(data) + 8, box_type.encode('latin-1')) + data
+
+def full_box(box_type, *payload, version=0):
+    return box(box_type, bytes([version, 0, 0, 0]), *payload)
+
+def packed_language(code):
+    return struct.pack('>H', sum((ord(char) - 0x60) << shift for char, shift in zip(code, (10, 5, 0))))
+
+def trak(track_id, handler, timescale, duration, language, sample_entry, sample_sizes, extra=b''):
+    sample_size, sample_count = sample_sizes if isinstance(sample_sizes, tuple) else (0, len(sample_sizes))
+    table = b'' if sample_size else struct.pack(f'>{sample_count}I', *sample_sizes)
+    stbl = box('stbl',
+               full_box('stsd', struct.pack('>I', 1), sample_entry),
+               full_box('stsz', struct.pack('>II', sample_size, sample_count), table),
+               full_box('stco', struct.pack('>II', 1, 16)))
+    return box('trak',
+               full_box('tkhd', struct.pack('>IIII', 0, 0, track_id, 0), bytes(64)),
+               extra,
+               box('mdia',
+                   full_box('mdhd', struct.pack('>IIII', 0, 0, timescale, duration), packed_language(language), bytes(2)),
+                   full_box('hdlr', bytes(4), handler.encode('latin-1'), bytes(12)),
+                   box('minf', stbl)))
+
+def build_mp4():
+    """
+    MP4-Datei (moov am Ende) mit AVC-Video (HLG), AAC 5.1, erzwungenen tx3g-Untertiteln und einer Kapitelspur.
+    """
+    sps = b'\x67\x64\x00\x28'
+    avcc = bytes([1, 100, 0, 40, 0xFF, 0xE1]) + struct.pack('>H', len(sps)) + sps + bytes([1, 0, 1, 0x68]) + \
+        bytes([0xFD, 0xFA, 0xFA, 0])
+    colr = box('colr', b'nclx', struct.pack('>HHHB', 9, 18, 9, 0))
+    visual = box('avc1', bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HH', 1920, 1080), bytes(50),
+                 box('avcC', avcc), colr)
+    decoder_config = bytes([0x40, 0x15]) + bytes(11) + bytes([0x05, 2, 0x11, 0xB0])
+    es_descriptor = struct.pack('>HB', 1, 0) + bytes([0x04, len(decoder_config)]) + decoder_config
+    esds = full_box('esds', bytes([0x03, len(es_descriptor)]), es_descriptor)
+    audio = box('mp4a', bytes(6), struct.pack('>H', 1), bytes(8), struct.pack('>HHHHI', 2, 16, 0, 0, 48000 << 16), esds)
+    subtitle = box('tx3g', bytes(6), struct.pack('>H', 1), struct.pack('>I', 0x40000000), bytes(30))
+    chapters = box('tx3g', bytes(6), struct.pack('>H', 1), bytes(34))
+
+    mvhd = full_box('mvhd', struct.pack('>IIII', int((datetime(2021, 1, 30, 15, 30, 45) -
+                                                      media_headers.MP4_EPOCH).total_seconds()), 0, 1000, 1421421),
+                    bytes(80))
+    moov = box('moov', mvhd,
+               trak(1, 'vide', 24000, 34080 * 1001, 'jpn', visual, (7500, 34080),
+                    extra=box('tref', box('chap', struct.pack('>I', 4)))),
+               trak(2, 'soun', 48000, 48000 * 1421, 'eng', audio, [1000] * 1000),
+               trak(3, 'sbtl', 1000, 1421421, 'ger', subtitle, [20, 20]),
+               trak(4, 'text', 1000, 1421421, 'eng', chapters, [10]))
+    return box('ftyp', b'isom', bytes(4), b'isomavc1') + box('mdat', b'x264 - core 164', bytes(4096)) + moov
+
+# --- Tests ----------------------------------------------------------------------------------------
+
+class FailingMediaInfo:
+    @staticmethod
+    def parse(*args, **kwargs):
+        pytest.fail("MediaInfo sollte nicht verwendet werden")
+
+def test_matroska_headers_fill_media_info(tmp_path, monkeypatch):
+    """
+    Testet, ob extract_media_info für Matroska ohne MediaInfo dieselben Felder füllt.
+    """
+    monkeypatch.setattr(anime_archiver, 'MediaInfo', FailingMediaInfo)
+    path = tmp_path / "Folge 01.mkv"
+    path.write_bytes(build_matroska())
+
+    info = anime_archiver.extract_media_info(str(path), 'full')
+
+    assert {key: info[key] for key in [
+        'duration_ms', 'container_format', 'video_codec', 'video_bitrate', 'resolution_width',
+        'resolution_height', 'framerate', 'aspect_ratio', 'color_depth', 'hdr_format', 'color_space',
+        'scan_type', 'encoder', 'audio_codec', 'audio_channels', 'audio_bitrate', 'audio_sample_rate',
+        'audio_language', 'audio_tracks_count', 'subtitles_language', 'subtitles_formats',
+        'subtitles_count', 'forced_subtitles', 'creation_time', 'metadata_mode']} == {
+        'duration_ms': 1420000, 'container_format': 'Matroska', 'video_codec': 'HEVC',
+        'video_bitrate': 2500000, 'resolution_width': 1920, 'resolution_height': 1080,
+        'framerate': 23.976, 'aspect_ratio': '16:9', 'color_depth': '10bit', 'hdr_format': 'HDR10',
+        'color_space': 'YUV', 'scan_type': 'Progressive', 'encoder': 'x265', 'audio_codec': 'AAC',
+        'audio_channels': 2, 'audio_bitrate': 128000, 'audio_sample_rate': 48000,
+        'audio_language': 'ja', 'audio_tracks_count': 2, 'subtitles_language': 'de',
+        'subtitles_formats': 'ASS', 'subtitles_count': 1, 'forced_subtitles': True,
+        'creation_time': datetime(2021, 1, 30, 15, 30, 45), 'metadata_mode': 'full',
+    }
+    assert set(info['audio_languages'].split(',')) == {'ja', 'de'}
+
+def test_mp4_headers_fill_media_info(tmp_path, monkeypatch):
+    """
+    Testet, ob extract_media_info für MP4 ohne MediaInfo dieselben Felder füllt
+    und Kapitelspuren nicht als Untertitel zählt.
+    """
+    monkeypatch.setattr(anime_archiver, 'MediaInfo', FailingMediaInfo)
+    path = tmp_path / "Folge 02.mp4"
+    path.write_bytes(build_mp4())
+
+    info = anime_archiver.extract_media_info(str(path), 'full')
+
+    assert {key: info[key] for key in [
+        'duration_ms', 'container_format', 'video_codec', 'video_bitrate', 'resolution_width',
+        'resolution_height', 'framerate', 'color_depth', 'hdr_format', 'color_space', 'encoder',
+        'audio_codec', 'audio_channels', 'audio_bitrate', 'audio_sample_rate', 'audio_language',
+        'subtitles_language', 'subtitles_formats', 'subtitles_count', 'forced_subtitles', 'creation_time']} == {
+        'duration_ms': 1421421, 'container_format': 'MPEG-4', 'video_codec': 'AVC',
+        'video_bitrate': int(7500 * 34080 * 8 / (34080 * 1001 / 24000)), 'resolution_width': 1920,
+        'resolution_height': 1080, 'framerate': 23.976, 'color_depth': '10bit', 'hdr_format': 'HLG',
+        'color_space': 'YUV', 'encoder': 'x264', 'audio_codec': 'AAC', 'audio_channels': 6,
+        'audio_bitrate': int(1000 * 1000 * 8 / 1421), 'audio_sample_rate': 48000, 'audio_language': 'en',
+        'subtitles_language': 'de', 'subtitles_formats': 'Timed Text', 'subtitles_count': 1,
+        'forced_subtitles': True, 'creation_time': datetime(2021, 1, 30, 15, 30, 45),
+    }
+
+def test_falls_back_to_mediainfo(tmp_path, monkeypatch):
+    """
+    Testet, ob beschädigte Dateien und (im Modus full) Matroska-Dateien ohne Bitraten
+    an MediaInfo übergeben werden, während der Modus fast die Kopfdaten verwendet.
+    """
+    parsed = []
+    class RecordingMediaInfo:
+        tracks = []
+        @classmethod
+        def parse(cls, file_path, **kwargs):
+            parsed.append(getattr(file_path, 'name', file_path))
+            return cls
+    monkeypatch.setattr(anime_archiver, 'MediaInfo', RecordingMediaInfo)
+
+    broken = tmp_path / "kaputt.mkv"
+    broken.write_bytes(build_matroska()[:200])
+    assert media_headers.parse_media_headers(str(broken)) is None
+    anime_archiver.extract_media_info(str(broken), 'full')
+    assert parsed == [str(broken)]
+
+    without_statistics = tmp_path / "ohne_bps.mkv"
+    without_statistics.write_bytes(build_matroska(with_statistics=False))
+    assert anime_archiver.extract_media_info(str(without_statistics), 'fast')['video_codec'] == 'HEVC'
+    assert len(parsed) == 1
+    anime_archiver.extract_media_info(str(without_statistics), 'full')
+    assert len(parsed) == 2
@@ -0,0 +1,54 @@
+"""
+Test-Modul für den schnellen Analysemodus (--parse-mode fast).
+"""
+import io
+
+import anime_archiver
+from tests.sqlite_standin import StandInConnection
+
+def test_capped_reader_stops_at_limit():
+    """
+    Testet, ob der Leser nach dem Limit das Dateiende meldet und die Bytes zählt.
+    """
+    reader = anime_archiver.CappedReader(io.BytesIO(b"x" * 1000), limit=300)
+    assert len(reader.read(256)) == 256
+    assert len(reader.read(256)) == 44
+    assert reader.read(256) == b''
+
+    # Sprünge (z.B. ans Dateiende für den Index) sind erlaubt, das Limit gilt weiter
+    reader.seek(900)
+    assert reader.tell() == 900
+    assert reader.read(10) == b''
+    assert reader.bytes_read == 300
+
+    unlimited = anime_archiver.CappedReader(io.BytesIO(b"x" * 1000))
+    assert len(unlimited.read()) == 1000
+    assert unlimited.bytes_read == 1000
+
+def test_full_pass_upgrades_only_approximated_fields(media_tree, monkeypatch):
+    """
+    Testet, ob eine vollständige Analyse nur die im Modus fast geschätzten Felder ersetzt.
+    """
+    def mode_dependent_media_info(file_path, parse_mode=None):
+        full = parse_mode == 'full'
+        return dict(anime_archiver.EMPTY_MEDIA_INFO, metadata_mode=parse_mode,
+                    duration_ms=1420000 if full else 1400000, subtitles_count=2 if full else 1,
+                    video_codec='HEVC', container_format='MPEG-TS', aspect_ratio='16:9',
+                    resolution_width=1920, resolution_height=1080)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', mode_dependent_media_info)
+    monkeypatch.setattr(anime_archiver, 'PARSE_MODE', 'fast')
+
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    assert connection.rows("SELECT DISTINCT metadata_mode, duration_ms, subtitles_count FROM episodes") == {
+        ('fast', 1400000, 1)}
+
+    # Eine Episode wurde inzwischen manuell korrigiert, der Codec darf nicht überschrieben werden
+    connection.db.execute("UPDATE episodes SET video_codec = 'AVC' WHERE id = 1")
+    monkeypatch.setattr(anime_archiver, 'PARSE_MODE', 'full')
+    assert anime_archiver.update_episodes_metadata(connection, upgrade_fast=True, workers=1) == 7
+
+    assert connection.rows("SELECT DISTINCT metadata_mode, duration_ms, subtitles_count FROM episodes") == {
+        ('full', 1420000, 2)}
+    assert connection.rows("SELECT video_codec FROM episodes WHERE id = 1") == {('AVC',)}
+    assert anime_archiver.update_episodes_metadata(connection, upgrade_fast=True, workers=1) == 0
@@ -0,0 +1,78 @@
+"""
+Test-Modul für die Reihenfolge der Metadatenaktualisierung nach Priorität.
+"""
+import anime_archiver
+import refresh_scheduler
+from tests.media_tree import fake_media_info
+from tests.sqlite_standin import StandInConnection
+
+def prioritized_library(media_tree):
+    """
+    Archiviert den Medienbaum und verteilt die Episoden auf die Stufen: eine neue Episode,
+    eine mit fehlenden Feldern, ein im Dashboard angesehener Anime, der Rest ist alt.
+    """
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    now = refresh_scheduler.server_now(connection)
+    old = refresh_scheduler._timestamp(10 * 86400, now)
+    connection.db.execute("UPDATE episodes SET created_at = ?", (old,))
+    connection.db.execute("UPDATE episodes SET created_at = ? WHERE name = 'Naruto E03.mkv'",
+                          (refresh_scheduler._timestamp(60, now),))
+    connection.db.execute("UPDATE episodes SET container_format = NULL WHERE name = '01 - Romance Dawn.mkv'")
+    connection.db.execute("INSERT INTO anime_views (anime_id, view_count, last_viewed_at) "
+                          "SELECT id, 3, ? FROM animes WHERE name = 'Bleach'", (refresh_scheduler._timestamp(3600, now),))
+    # Alte Aufrufe zählen nicht mehr
+    connection.db.execute("INSERT INTO anime_views (anime_id, view_count, last_viewed_at) "
+                          "SELECT id, 1, ? FROM animes WHERE name = 'Naruto'", (old,))
+    return connection
+
+def record_extractions(monkeypatch):
+    extracted = []
+    def recording_media_info(file_path, parse_mode=None):
+        extracted.append(file_path.rsplit('/', 1)[-1])
+        return fake_media_info(file_path, parse_mode)
+    monkeypatch.setattr(anime_archiver, 'extract_media_info', recording_media_info)
+    return extracted
+
+def test_refresh_runs_tiers_in_priority_order(media_tree, monkeypatch):
+    """
+    Testet, ob neue Episoden vor unvollständigen, diese vor angesehenen Animes und
+    diese vor dem Rest aktualisiert werden, und jede Episode genau einmal.
+    """
+    connection = prioritized_library(media_tree)
+    extracted = record_extractions(monkeypatch)
+    monkeypatch.setattr(anime_archiver, 'UPDATE_PAGE_SIZE', 2)
+
+    assert anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=1) == 7
+    assert extracted[:3] == ['Naruto E03.mkv', '01 - Romance Dawn.mkv', 'Bleach EP10.avi']
+    assert sorted(extracted) == sorted(row[0] for row in connection.rows("SELECT name FROM episodes"))
+
+def test_refresh_budget_keeps_most_valuable_work(media_tree, monkeypatch):
+    """
+    Testet, ob ein Budget den Lauf nach so vielen Episoden beendet, die wichtigsten zuerst.
+    """
+    connection = prioritized_library(media_tree)
+    extracted = record_extractions(monkeypatch)
+    monkeypatch.setattr(anime_archiver, 'UPDATE_BUDGET', 2)
+
+    assert anime_archiver.update_episodes_metadata(connection, reprocess_all=True, workers=1) == 2
+    assert extracted == ['Naruto E03.mkv', '01 - Romance Dawn.mkv']
+
+    # Ohne reprocess_all bleibt nur die unvollständige Episode übrig, sie ist inzwischen aktualisiert
+    assert anime_archiver.update_episodes_metadata(connection, workers=1) == 0
+
+def test_scheduler_resumes_in_later_tier(media_tree):
+    """
+    Testet, ob eine Journal-Position (Stufe, ID) frühere Stufen überspringt, und ob ältere
+    Journale mit reiner ID weiterhin gelesen werden.
+    """
+    connection = prioritized_library(media_tree)
+    bleach_id = connection.rows("SELECT id FROM episodes WHERE name = 'Bleach EP10.avi'").pop()[0]
+
+    scheduler = refresh_scheduler.RefreshScheduler(connection, position=[2, bleach_id])
+    assert scheduler.count() == 4
+    assert scheduler.counts == {'new': 0, 'missing': 0, 'browsed': 0, 'rest': 4}
+    assert {tier for _, _, tier in scheduler} == {3}
+
+    assert refresh_scheduler.parse_position(17) == (0, 17)
+    assert refresh_scheduler.parse_position(None) == (0, 0)
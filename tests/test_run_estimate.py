@@ -0,0 +1,115 @@
+"""
+Test-Modul für die Kostenschätzung von Archiver- und Aktualisierungsläufen (--estimate).
+"""
+import os
+import pytest
+
+import anime_archiver
+from content_fingerprint import content_fingerprint
+from run_estimate import RunEstimate
+from tests.sqlite_standin import StandInConnection
+
+def writes(connection):
+    return [query for query in connection.queries if query.split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+def test_estimate_counts_scan_and_update_work_without_writing(media_tree):
+    """
+    Testet, ob die Schätzung dieselbe Arbeit wie der echte Lauf ermittelt, je Containertyp
+    nur eine Stichprobe analysiert und nichts in die Datenbank schreibt.
+    """
+    connection = StandInConnection()
+    scan = RunEstimate("Scan", samples_per_type=2)
+    anime_archiver.estimate_scan(connection, scan)
+    assert dict(scan.files) == {'mkv': 5, 'mp4': 1, 'avi': 1}
+    # Animes, Staffeln einschließlich der Standard-Staffel von One Piece, Episoden
+    assert scan.rows == {'insert': 4 + 5 + 7}
+    assert scan.fingerprints == 7
+    assert writes(connection) == []
+
+    sampled = []
+    scan.sample(lambda file_path: sampled.append(file_path) or {'video_codec': 'h264'})
+    assert len(sampled) == 2 + 1 + 1
+    projection = scan.project(workers=2, batch_size=500)
+    assert projection['files_to_extract'] == 7
+    assert projection['db_commits'] == 1
+    assert {kind: data['sampled'] for kind, data in projection['types'].items()} == {'mkv': 2, 'mp4': 1, 'avi': 1}
+
+    # Nach dem echten Scan ist für den Scan nichts mehr zu tun, die Aktualisierung betrifft alle Episoden
+    anime_archiver.scan_directory(connection, workers=1)
+    connection.queries.clear()
+    rescan = RunEstimate("Scan")
+    anime_archiver.estimate_scan(connection, rescan)
+    assert sum(rescan.files.values()) == 0 and not rescan.rows
+    assert connection.rows("SELECT COUNT(*) FROM animes") == {(4,)}
+    assert connection.rows("SELECT COUNT(*) FROM seasons") == {(5,)}
+
+    # Episoden ohne Fingerabdruck: Nachträge kosten Lesezugriffe, aber keine Analyse
+    connection.db.execute("UPDATE episodes SET content_fingerprint = NULL")
+    connection.queries.clear()
+    backfill = RunEstimate("Scan")
+    anime_archiver.estimate_scan(connection, backfill)
+    assert sum(backfill.files.values()) == 0
+    assert backfill.fingerprints == 7 and backfill.rows == {'update': 7}
+    backfill.sample(lambda file_path: pytest.fail("keine Analyse"), fingerprint=content_fingerprint)
+    projection = backfill.project(workers=1)
+    assert projection['fingerprints']['sampled'] == 5
+    assert projection['bytes_read'] > 0
+    update = RunEstimate("Metadatenaktualisierung")
+    anime_archiver.estimate_update(connection, update, reprocess_all=True)
+    assert update.rows == {'update': 7}
+    assert anime_archiver.finish_estimate(update, workers=1)['types']['mkv']['sampled'] == 5
+    assert writes(connection) == []
+
+def test_projection_scales_samples_to_run():
+    """
+    Testet die Hochrechnung: Laufzeit je Datei mal Anzahl verteilt auf die Worker,
+    begrenzt durch das Lesebudget, und Anweisungen je Stapel.
+    """
+    estimate = RunEstimate("Test", samples_per_type=3)
+    for number in range(100):
+        estimate.add_file(f"/mediathek/Anime/E{number:03d}.mkv")
+    estimate.add_rows('update', 1200)
+    estimate.walk_seconds = 2.0
+    estimate.measurements['mkv'] = [(0.2, 1000000, True), (0.4, 3000000, True), (0.3, 2000000, False)]
+
+    projection = estimate.project(workers=4, batch_size=500, statements_per_batch={'update': 3})
+    assert projection['types']['mkv'] == {'files': 100, 'sampled': 3, 'failed': 1,
+                                          'seconds_per_file': 0.3, 'bytes_per_file': 2000000}
+    assert projection['extract_cpu_seconds'] == pytest.approx(30.0)
+    assert projection['wall_seconds'] == pytest.approx(2.0 + 30.0 / 4)
+    assert projection['bytes_read'] == 200000000
+    assert projection['db_statements'] == 3 * 3
+    assert projection['db_commits'] == 3
+
+    # Ein Lesebudget von 10 MB/s bremst stärker als die Worker
+    throttled = estimate.project(workers=4, io_rate=10 * 1024 * 1024, batch_size=500)
+    assert throttled['wall_seconds'] == pytest.approx(2.0 + 200000000 / (10 * 1024 * 1024), abs=0.001)
+
+def test_estimate_reads_extraction_cache_without_creating_it(media_tree, monkeypatch, tmp_path):
+    """
+    Testet, ob --estimate eine fehlende Cache-Datei nicht anlegt und eine vorhandene nur liest.
+    """
+    from extraction_cache import ExtractionCache
+    from tests.media_tree import fake_media_info
+
+    cache_path = tmp_path / "cache.sqlite"
+    monkeypatch.setattr(anime_archiver, 'EXTRACTION_CACHE_PATH', str(cache_path))
+    monkeypatch.setattr(anime_archiver, '_estimate_cache', False)
+    scan = RunEstimate("Scan")
+    anime_archiver.estimate_scan(StandInConnection(), scan)
+    assert scan.cached == 0
+    assert list(tmp_path.iterdir()) == [media_tree]
+
+    episode = media_tree / "Naruto/Staffel 1/Naruto E01.mkv"
+    cache = ExtractionCache(str(cache_path), extractor_version=anime_archiver.EXTRACTOR_VERSION)
+    cache.put(str(episode), os.stat(episode), fake_media_info(str(episode)))
+    cache.close()
+    before = cache_path.stat()
+
+    monkeypatch.setattr(anime_archiver, '_estimate_cache', False)
+    scan = RunEstimate("Scan")
+    anime_archiver.estimate_scan(StandInConnection(), scan)
+    anime_archiver._estimate_cache.close()
+    assert scan.cached == 1
+    # Die Cache-Datei selbst bleibt unverändert (WAL-Leser legen nur -shm/-wal an)
+    assert (cache_path.stat().st_size, cache_path.stat().st_mtime_ns) == (before.st_size, before.st_mtime_ns)
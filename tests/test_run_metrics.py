@@ -0,0 +1,49 @@
+"""
+Test-Modul für die Laufzeitmessung je Stufe und den JSON-Laufbericht.
+"""
+import json
+
+import anime_archiver
+import run_metrics
+from tests.sqlite_standin import StandInConnection
+
+def test_histogram_percentiles_and_buckets():
+    """
+    Testet Fachzuordnung, Perzentile und Summen des Latenz-Histogramms.
+    """
+    histogram = run_metrics.LatencyHistogram()
+    for _ in range(90):
+        histogram.add(0.00005)
+    for _ in range(10):
+        histogram.add(0.3, bytes_read=1000)
+
+    data = histogram.to_dict()
+    assert data['count'] == 100
+    assert data['bytes_read'] == 10000
+    assert data['histogram'] == {'0.1': 90, '409.6': 10}
+    assert data['p50_ms'] == 0.1
+    assert data['p95_ms'] == 300.0
+    assert data['max_ms'] == 300.0
+    assert abs(data['total_s'] - 3.005) < 0.001
+
+def test_scan_records_stages_and_writes_report(media_tree, tmp_path, monkeypatch):
+    """
+    Testet, ob ein Scan alle Stufen erfasst und der Bericht als JSON geschrieben wird.
+    """
+    metrics = run_metrics.RunMetrics()
+    monkeypatch.setattr(anime_archiver, 'METRICS', metrics)
+    anime_archiver.scan_directory(StandInConnection(), workers=2)
+
+    assert {'walk', 'stat', 'extract', 'db_write', 'commit'} <= set(metrics.stages)
+    assert metrics.stages['extract'].count == 7
+    assert metrics.stages['stat'].count == 7
+    assert len(metrics.breakdown()) == len(metrics.stages) + 2
+
+    report_path = tmp_path / "bericht.json"
+    anime_archiver.write_run_report(str(report_path))
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert report['report_version'] == run_metrics.REPORT_VERSION
+    assert report['stages']['extract']['count'] == 7
+    assert report['stats']['episodes'] == anime_archiver.STATS['episodes']
+    assert report['media_path'] == str(media_tree)
+    assert not (tmp_path / "bericht.json.tmp").exists()
@@ -0,0 +1,114 @@
+"""
+Test-Modul für den verteilten Scan mit Leases in der Datenbank (--shard).
+"""
+import time
+import multiprocessing
+
+import anime_archiver
+from scan_leases import LeaseManager
+from tests.media_tree import EPISODE_ROWS
+from tests.sqlite_standin import StandInConnection
+
+ANIMES = {"Naruto", "One Piece", "Bleach", "Leerer Anime"}
+
+def scan_as_node(node_id, lease_db, results):
+    """
+    Eine Archiver-Instanz: beansprucht Animes über die gemeinsame Lease-Tabelle und
+    meldet die selbst durchsuchten Anime-Verzeichnisse zurück. SQLite erlaubt nur einen
+    Schreiber, daher schreibt jede Instanz ihre Archivzeilen in eine eigene Datenbank.
+    """
+    leases = LeaseManager(StandInConnection(lease_db), node_id=node_id, ttl=60)
+    leases.start_heartbeat()
+    connection = StandInConnection()
+    try:
+        anime_archiver.scan_directory(connection, workers=2, leases=leases)
+    finally:
+        leases.close()
+    scanned = sorted(row[0] for row in connection.rows("SELECT directory_path FROM animes"))
+    results.put((node_id, scanned, sorted(leases.completed)))
+
+def test_parallel_nodes_split_animes_without_overlap(media_tree, tmp_path):
+    """
+    Testet, ob mehrere gleichzeitig laufende Prozesse jeden Anime genau einmal durchsuchen.
+    """
+    lease_db = str(tmp_path / "leases.sqlite")
+    StandInConnection(lease_db).close()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    nodes = [context.Process(target=scan_as_node, args=(f"knoten-{i}", lease_db, results)) for i in range(3)]
+    for node in nodes:
+        node.start()
+    reports = [results.get(timeout=60) for _ in nodes]
+    for node in nodes:
+        node.join(timeout=10)
+        assert node.exitcode == 0
+
+    scanned = [path for _, paths, _ in reports for path in paths]
+    completed = [path for _, _, paths in reports for path in paths]
+    expected = sorted(str(media_tree / name) for name in ANIMES)
+    assert sorted(scanned) == expected
+    assert sorted(completed) == expected
+
+    leases = StandInConnection(lease_db).rows("SELECT directory_path, node_id, completed_at IS NOT NULL FROM scan_leases")
+    assert {(path, True) for path, _, _ in leases} == {(path, True) for path in expected}
+    assert {path: node for path, node, _ in leases} == {path: node_id for node_id, paths, _ in reports for path in paths}
+
+def test_expired_lease_of_crashed_node_is_taken_over(media_tree):
+    """
+    Testet, ob abgelaufene Leases übernommen und gültige Leases anderer Instanzen
+    respektiert werden, ohne deren Episoden beim Abgleich zu löschen.
+    """
+    now = int(time.time())
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=1)
+    bleach = str(media_tree / "Bleach")
+    before = {row for row in connection.rows(EPISODE_ROWS) if row[0] == bleach}
+
+    # Bleach wird gerade von einer anderen Instanz bearbeitet, Naruto gehörte einer abgestürzten,
+    # One Piece wurde vor Kurzem abgeschlossen, "Leerer Anime" vor langer Zeit
+    (media_tree / "Bleach" / "Season 3" / "Bleach EP10.avi").unlink()
+    cursor = connection.cursor()
+    for name, node_id, expires_at, completed_at in (
+            ("Bleach", "lebendig", now + 60, None),
+            ("Naruto", "abgestuerzt", now - 1, None),
+            ("One Piece", "fertig", now - 10, now - 10),
+            ("Leerer Anime", "alt", now - 7200, now - 7200)):
+        cursor.execute("INSERT INTO scan_leases VALUES (%s, %s, %s, %s, %s, %s)",
+                       (str(media_tree / name), node_id, now - 300, now - 300, expires_at, completed_at))
+    connection.commit()
+
+    leases = LeaseManager(connection, node_id="neu", ttl=60, rescan_after=3600)
+    assert anime_archiver.scan_directory(connection, workers=1, leases=leases)
+    assert sorted(leases.completed) == sorted(str(media_tree / name) for name in ("Naruto", "Leerer Anime"))
+    # Die Datei von Bleach ist verschwunden, Bleach gehört aber einer anderen Instanz
+    assert {row for row in connection.rows(EPISODE_ROWS) if row[0] == bleach} == before
+    owners = dict(connection.rows("SELECT directory_path, node_id FROM scan_leases"))
+    assert owners[bleach] == "lebendig"
+    assert owners[str(media_tree / "Naruto")] == "neu"
+    assert owners[str(media_tree / "One Piece")] == "fertig"
+
+def test_lost_lease_is_reported_and_released_leases_can_be_claimed():
+    """
+    Testet Heartbeat-Verlängerung, Verlust eines Leases und die Freigabe beim Beenden.
+    """
+    clock = [1000]
+    connection = StandInConnection()
+    first = LeaseManager(connection, node_id="a", ttl=30, clock=lambda: clock[0])
+    second = LeaseManager(connection, node_id="b", ttl=30, clock=lambda: clock[0])
+    assert first.claim("/m/Naruto") and first.claim("/m/Bleach")
+    assert not second.claim("/m/Naruto")
+
+    clock[0] += 20
+    assert first.renew() == 0
+    clock[0] += 20
+    assert not second.claim("/m/Naruto")
+
+    # Heartbeat ausgefallen: Naruto läuft ab und wird übernommen
+    clock[0] += 40
+    assert second.claim("/m/Naruto")
+    assert first.renew() == 1
+    assert first.held == {"/m/Bleach"}
+
+    # Beim Beenden freigegebene Leases sind sofort wieder verfügbar
+    first.release()
+    assert second.claim("/m/Bleach")
@@ -0,0 +1,65 @@
+"""
+Test-Modul für die versionierten Schemamigrationen.
+"""
+import schema_migrations
+from schema_migrations import Migration, migrate
+from tests.sqlite_standin import StandInConnection
+
+# Datenbank aus der Zeit vor schema_version: episodes ohne Metadatenspalten, eine von Hand ergänzt
+LEGACY_SCHEMA = """
+    CREATE TABLE episodes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(255) NOT NULL,
+        duration_ms BIGINT
+    );
+    INSERT INTO episodes (name, duration_ms) VALUES ('Naruto E01.mkv', 1420000);
+"""
+
+# Portable Variante der echten Liste (ohne MySQL-spezifische Tabellenoptionen)
+MIGRATIONS = [
+    Migration(1, "episodes", ["CREATE TABLE IF NOT EXISTS episodes (id INTEGER PRIMARY KEY, name VARCHAR(255))"], {}),
+    Migration(2, "Videometadaten", [], {'episodes': [("duration_ms", "BIGINT"), ("video_codec", "VARCHAR(50)")]}),
+    Migration(3, "Aufrufe", ["CREATE TABLE IF NOT EXISTS anime_views (anime_id INTEGER PRIMARY KEY)"],
+              {'episodes': [("metadata_mode", "VARCHAR(10)")]}),
+]
+
+def test_pending_migrations_use_one_alter_per_table_and_current_schema_one_query():
+    """
+    Testet, ob eine alte Datenbank mit einem einzigen ALTER TABLE nachgezogen wird,
+    vorhandene Spalten übersprungen werden und ein aktuelles Schema nur eine Abfrage kostet.
+    """
+    connection = StandInConnection(schema=LEGACY_SCHEMA)
+
+    assert migrate(connection, MIGRATIONS) == [1, 2, 3]
+    alters = [query for query in connection.queries if query.startswith('ALTER')]
+    assert alters == ["ALTER TABLE episodes ADD COLUMN video_codec VARCHAR(50), ADD COLUMN metadata_mode VARCHAR(10)"]
+    assert connection.rows("SELECT name, duration_ms, video_codec FROM episodes") == {('Naruto E01.mkv', 1420000, None)}
+    assert connection.rows("SELECT version FROM schema_version") == {(1,), (2,), (3,)}
+
+    connection.queries.clear()
+    assert migrate(connection, MIGRATIONS) == []
+    assert connection.queries == ["SELECT MAX(version) FROM schema_version"]
+
+    # Eine neue Migration wird allein angewendet, force prüft alle erneut ohne Änderungen
+    later = MIGRATIONS + [Migration(4, "Fingerabdruck", [], {'episodes': [("fingerprint", "VARCHAR(64)")]})]
+    assert migrate(connection, later) == [4]
+    connection.queries.clear()
+    assert migrate(connection, later, force=True) == [1, 2, 3, 4]
+    assert not [query for query in connection.queries if query.startswith('ALTER')]
+
+def test_migration_list_covers_archiver_columns():
+    """
+    Testet, ob die Versionen aufsteigend sind und ein frisch migriertes Schema alle Spalten
+    enthält, die der Archiver beim Aktualisieren der Metadaten schreibt.
+    """
+    import anime_archiver
+
+    versions = [migration.version for migration in schema_migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert schema_migrations.LATEST_VERSION == versions[-1]
+
+    episodes = schema_migrations.MIGRATIONS[0].statements[2]
+    added = {name for migration in schema_migrations.MIGRATIONS
+             for name, _ in migration.add_columns.get('episodes', [])}
+    for column in anime_archiver.EPISODE_METADATA_COLUMNS:
+        assert f" {column} " in episodes or column in added
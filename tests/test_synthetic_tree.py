@@ -0,0 +1,31 @@
+"""
+Test-Modul für den synthetischen Medienbaum der Benchmarks.
+"""
+import anime_archiver
+import media_headers
+from benchmarks.synthetic_tree import generate_tree
+from tests.sqlite_standin import StandInConnection
+
+def test_generated_files_are_complete_and_scannable(tmp_path, monkeypatch):
+    """
+    Testet, ob die erzeugten Dateien ohne MediaInfo vollständig gelesen werden und
+    ein Scan alle Animes, Staffeln und Episoden anlegt.
+    """
+    root = tmp_path / "mediathek"
+    files = generate_tree(str(root), animes=3, seasons=2, episodes=4, mp4_ratio=0.5, seed=7)
+    assert len(files) == 24
+    assert {path.rsplit('.', 1)[1] for path in files} == {'mkv', 'mp4'}
+    assert generate_tree(str(tmp_path / "wiederholt"), animes=3, seasons=2, episodes=4, mp4_ratio=0.5, seed=7) == \
+        [path.replace(str(root), str(tmp_path / "wiederholt")) for path in files]
+
+    for file_path in files:
+        headers = media_headers.parse_media_headers(file_path)
+        assert headers is not None and headers.complete, file_path
+
+    monkeypatch.setattr(anime_archiver, 'MEDIA_PATH', str(root))
+    monkeypatch.setattr(anime_archiver, 'EXTRACTION_CACHE_PATH', '')
+    connection = StandInConnection()
+    anime_archiver.scan_directory(connection, workers=2)
+    assert len(connection.rows("SELECT id FROM animes")) == 3
+    assert len(connection.rows("SELECT id FROM seasons")) == 6
+    assert len(connection.rows("SELECT id FROM episodes WHERE video_codec = 'AVC' AND duration_ms > 0")) == 24
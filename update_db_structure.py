@@ -11,7 +11,9 @@ import logging
 import argparse
 import mysql.connector
 from mysql.connector import Error
-from anime_archiver import setup_database, update_episodes_metadata
+from anime_archiver import (setup_database, connect_database, update_episodes_metadata, estimate_update,
+                            finish_estimate, RunEstimate)
+from schema_migrations import migrate as migrate_schema
 from tqdm import tqdm
 from datetime import datetime
 
@@ -23,82 +25,12 @@ logging.basicConfig(level=logging.INFO, format=log_format,
 
 def update_db_structure(connection):
     """
-    Aktualisiert nur die Datenbankstruktur ohne Metadaten-Updates
+    Aktualisiert nur die Datenbankstruktur ohne Metadaten-Updates. Prüft dazu alle
+    Migrationen erneut, auch wenn schema_version bereits aktuell ist.
     """
-    cursor = connection.cursor(buffered=True)
-    tables_updated = False
-    
-    # Prüfen, ob die Episodes-Tabelle existiert
-    cursor.execute("SHOW TABLES LIKE 'episodes'")
-    episodes_exists = cursor.fetchone() is not None
-    
-    if not episodes_exists:
-        logging.error("Episodes-Tabelle existiert nicht! Führe zuerst anime_archiver.py aus.")
-        return False
-    
-    # Prüfen, welche Spalten schon existieren
-    cursor.execute("DESCRIBE episodes")
-    existing_columns = [row[0].lower() for row in cursor.fetchall()]
-    
-    # Liste der erwarteten Spalten und ihre Datentypen
-    # Basierend auf setup_database()-Funktion aus anime_archiver.py
-    expected_columns = [
-        # Grundlegende Videometadaten
-        ("duration_ms", "BIGINT"),
-        ("video_format", "VARCHAR(50)"),
-        ("video_codec", "VARCHAR(50)"),
-        ("video_bitrate", "BIGINT"),
-        ("resolution_width", "INT"),
-        ("resolution_height", "INT"),
-        ("framerate", "FLOAT"),
-        ("audio_codec", "VARCHAR(50)"),
-        ("audio_channels", "INT"),
-        ("audio_bitrate", "BIGINT"),
-        ("audio_sample_rate", "INT"),
-        ("subtitles_language", "VARCHAR(255)"),
-        ("creation_time", "DATETIME"),
-        
-        # Erweiterte Videometadaten
-        ("aspect_ratio", "VARCHAR(20)"),
-        ("color_depth", "VARCHAR(10)"),
-        ("hdr_format", "VARCHAR(30)"),
-        ("color_space", "VARCHAR(30)"),
-        ("scan_type", "VARCHAR(20)"),
-        ("encoder", "VARCHAR(100)"),
-        
-        # Erweiterte Audiometadaten
-        ("audio_language", "VARCHAR(50)"),
-        ("audio_tracks_count", "INT"),
-        ("audio_languages", "VARCHAR(255)"),
-        
-        # Erweiterte Untertitelmetadaten
-        ("subtitles_formats", "VARCHAR(255)"),
-        ("subtitles_count", "INT"),
-        ("forced_subtitles", "BOOLEAN"),
-        
-        # Containerformat
-        ("container_format", "VARCHAR(50)")
-    ]
-    
-    # Hinzufügen fehlender Spalten
-    added_columns = 0
-    for column_name, column_type in expected_columns:
-        if column_name.lower() not in existing_columns:
-            try:
-                cursor.execute(f"ALTER TABLE episodes ADD COLUMN {column_name} {column_type}")
-                added_columns += 1
-                logging.info(f"Spalte {column_name} ({column_type}) zur Episodes-Tabelle hinzugefügt.")
-                tables_updated = True
-            except Error as e:
-                logging.error(f"Fehler beim Hinzufügen der Spalte {column_name}: {e}")
-    
-    if added_columns > 0:
-        connection.commit()
-        logging.info(f"{added_columns} neue Spalten zur Episodes-Tabelle hinzugefügt.")
-    else:
-        logging.info("Alle erwarteten Spalten sind bereits vorhanden.")
-    
-    return tables_updated
+    applied = migrate_schema(connection, force=True)
+    logging.info(f"{len(applied)} Migrationen geprüft, Datenbankstruktur ist aktuell.")
+    return bool(applied)
 
 def get_episode_count(connection):
     """
@@ -128,7 +60,7 @@ def get_anime_list(connection):
         logging.error(f"Fehler beim Abrufen der Anime-Liste: {e}")
         return []
 
-def update_metadata_for_anime(connection, anime_id):
+def update_metadata_for_anime(connection, anime_id, workers=None):
     """
     Aktualisiert nur die Metadaten für einen bestimmten Anime
     """
@@ -153,7 +85,7 @@ def update_metadata_for_anime(connection, anime_id):
         logging.info(f"Aktualisiere Metadaten für Anime: {anime['name']} (Pfad: {anime_path})")
         
         # Metadaten für diesen Anime aktualisieren
-        count = update_episodes_metadata(connection, filter_path=anime_path, reprocess_all=True)
+        count = update_episodes_metadata(connection, filter_path=anime_path, reprocess_all=True, workers=workers)
         
         cursor.close()
         return count
@@ -161,6 +93,31 @@ def update_metadata_for_anime(connection, anime_id):
         logging.error(f"Fehler beim Aktualisieren der Metadaten für Anime {anime_id}: {e}")
         return 0
 
+def estimate_metadata_update(args):
+    """
+    Schätzt die Metadatenaktualisierung mit den angegebenen Optionen (--anime, --incomplete-only),
+    ohne die Datenbank zu verändern.
+    """
+    connection = connect_database()
+    try:
+        filter_path = None
+        if args.anime:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT directory_path FROM animes WHERE id = %s", (args.anime,))
+            anime = cursor.fetchone()
+            cursor.close()
+            if not anime:
+                logging.error(f"Anime mit ID {args.anime} nicht gefunden.")
+                return
+            filter_path = anime['directory_path']
+        
+        estimate = RunEstimate("Metadatenaktualisierung")
+        reprocess = bool(args.anime) or not args.incomplete_only
+        estimate_update(connection, estimate, filter_path=filter_path, reprocess_all=reprocess)
+        finish_estimate(estimate, workers=args.workers)
+    finally:
+        connection.close()
+
 def main():
     parser = argparse.ArgumentParser(description='Datenbankstruktur und Episoden-Metadaten aktualisieren')
     parser.add_argument('--structure-only', action='store_true', 
@@ -173,6 +130,10 @@ def main():
                       help='Liste aller verfügbaren Animes anzeigen')
     parser.add_argument('--incomplete-only', action='store_true', 
                       help='Nur Episoden mit fehlenden Metadaten aktualisieren')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Anzahl paralleler Threads für die Metadatenextraktion')
+    parser.add_argument('--estimate', action='store_true',
+                      help='Nichts aktualisieren, sondern Dauer, gelesene Bytes und Datenbankzugriffe schätzen')
     
     args = parser.parse_args()
     
@@ -180,6 +141,10 @@ def main():
     logging.info(f"Gestartet: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
+        if args.estimate:
+            estimate_metadata_update(args)
+            return
+        
         # Verbindung herstellen
         connection = setup_database()
         
@@ -201,7 +166,7 @@ def main():
         if not args.structure_only:
             if args.anime:
                 # Nur einen bestimmten Anime aktualisieren
-                count = update_metadata_for_anime(connection, args.anime)
+                count = update_metadata_for_anime(connection, args.anime, workers=args.workers)
                 logging.info(f"Metadaten-Aktualisierung abgeschlossen. {count} Episoden wurden verarbeitet.")
             else:
                 # Alle Metadaten aktualisieren
@@ -213,7 +178,8 @@ def main():
                 # Metadatenaktualisierung ausführen
                 count = update_episodes_metadata(
                     connection, 
-                    reprocess_all=reprocess
+                    reprocess_all=reprocess,
+                    workers=args.workers
                 )
                 
                 logging.info(f"Metadaten-Aktualisierung abgeschlossen. {count if count is not None else 'Unbekannte Anzahl'} Episoden verarbeitet.")